@@ -0,0 +1,84 @@
+"""
+Benchmark: polling requests and wall time of many concurrent solves, polled per captcha and in batches.
+
+The mock API of `utilities.mock_api` answers every captcha after a random delay. The same number
+of concurrent solves is run with `AsyncSolver`, which polls `res.php?action=get&id=...` once
+per captcha and interval, and with `BatchSolver`, which polls up to 100 captchas in one
+`res.php?action=get&ids=...` request.
+
+Usage:
+    python benchmarks/bench_batch_polling.py [--solves 500] [--interval 0.5] [--latency 2-6]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.async_pipeline import AsyncSolver
+from utilities.batch_solver import BatchSolver
+from utilities.mock_api import MockApi
+from utilities.solver_client import PooledTwoCaptcha
+
+
+# A tiny base64 image, sent as the captcha of every solve
+IMAGE = 'R0lGODlhAQABAAAAACw=' * 4
+
+
+def run_per_id(server, solves, interval):
+    solver = PooledTwoCaptcha('benchmark', server=server, pool_maxsize=32)
+
+    async def run():
+        async_solver = AsyncSolver(solver, polling_interval=interval)
+        return await asyncio.gather(*(async_solver.solve('normal', IMAGE)
+                                      for _ in range(solves)))
+
+    try:
+        return asyncio.run(run())
+    finally:
+        solver.api_client.close()
+
+
+def run_batched(server, solves, interval):
+    solver = PooledTwoCaptcha('benchmark', server=server, pool_maxsize=32)
+    try:
+        with BatchSolver(solver, polling_interval=interval) as batch:
+            futures = [batch.submit('normal', IMAGE) for _ in range(solves)]
+            return [future.result() for future in futures]
+    finally:
+        solver.api_client.close()
+
+
+def measure(func, api, solves, interval):
+    api.reset_stats()
+    started = time.perf_counter()
+    results = func(api.url, solves, interval)
+    elapsed = time.perf_counter() - started
+    assert all(result['code'] == f"answer{result['captchaId']}" for result in results)
+    return api.stats()['poll_requests'], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--solves', type=int, default=500)
+    parser.add_argument('--interval', type=float, default=0.5, help='seconds between polls of a captcha')
+    parser.add_argument('--latency', default='2-6', help='range of seconds until a captcha is solved, MIN-MAX')
+    args = parser.parse_args()
+
+    latency = tuple(map(float, args.latency.split('-')))
+    with MockApi(latency={'normal': latency}) as api:
+        per_id = measure(run_per_id, api, args.solves, args.interval)
+        batched = measure(run_batched, api, args.solves, args.interval)
+
+    print(f"solves={args.solves} interval={args.interval}s latency={args.latency}s")
+    print(f"poll per captcha : {per_id[0]:6} res.php requests   wall {per_id[1]:6.2f} s")
+    print(f"batched polling  : {batched[0]:6} res.php requests   wall {batched[1]:6.2f} s  "
+          f"({per_id[0] / batched[0]:.0f}x fewer requests)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark: WebDriver commands and time needed to click a grid of points on a captcha image.
+
+Compares the previous `clicks_on_coordinates` of examples/coordinates/coordinates.py
+(`location`, then one `move_by_offset(...).click().perform()` per point) with the current
+one, which sends all clicks as a single W3C pointer action sequence relative to the image.
+A local page records where the image was clicked, so both are also checked for accuracy.
+
+Requires Chrome. Usage:
+    python benchmarks/bench_coordinate_clicks.py [--grid 3] [--runs 5]
+"""
+import argparse
+import importlib.util
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.action_chains import ActionChains
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+
+EXAMPLE = PROJECT_ROOT / "examples" / "coordinates" / "coordinates.py"
+
+IMAGE_SIZE = 300
+IMAGE = ("data:image/svg+xml;utf8,<svg xmlns='http://www.w3.org/2000/svg' width='300' height='300'>"
+         "<rect width='300' height='300' fill='gray'/></svg>")
+PAGE = f"""data:text/html;charset=utf-8,
+<html><body style="margin:0">
+<div style="padding:120px 0 0 80px"><div class="widget">
+<img id="captcha" src="{IMAGE}" width="{IMAGE_SIZE}" height="{IMAGE_SIZE}">
+</div></div>
+<script>
+window.clicks = [];
+document.getElementById('captcha').addEventListener('click', (e) => window.clicks.push([e.offsetX, e.offsetY]));
+</script>
+</body></html>
+"""
+LOCATOR = "//div[@class='widget']//img"
+
+
+def load_example():
+    spec = importlib.util.spec_from_file_location("coordinates", EXAMPLE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def clicks_on_coordinates_per_point(browser, coordinates_list, img_locator_captcha, get_element):
+    """The previous implementation: one perform() per point."""
+    action = ActionChains(browser)
+    img_element = get_element(browser, img_locator_captcha)
+    location = img_element.location
+    for coord in coordinates_list:
+        x_offset = location['x'] + coord['x']
+        y_offset = location['y'] + coord['y']
+        action.move_by_offset(x_offset, y_offset).click().perform()
+        action.move_by_offset(-x_offset, -y_offset)
+
+
+class CommandCounter:
+    """Counts the WebDriver commands sent by the browser instance."""
+
+    def __init__(self, browser):
+        self.count = 0
+        self._execute = browser.execute
+        browser.execute = self._counting_execute
+
+    def _counting_execute(self, *args, **kwargs):
+        self.count += 1
+        return self._execute(*args, **kwargs)
+
+
+def measure(browser, counter, func, points, runs):
+    timings, commands, errors = [], [], []
+    for _ in range(runs):
+        browser.get(PAGE)
+        counter.count = 0
+        started = time.perf_counter()
+        func(points)
+        timings.append(time.perf_counter() - started)
+        commands.append(counter.count)
+
+        clicks = browser.execute_script("return window.clicks;")
+        if len(clicks) != len(points):
+            errors.append(float("inf"))
+        else:
+            errors.extend(max(abs(x - p['x']), abs(y - p['y'])) for (x, y), p in zip(clicks, points))
+    return timings, commands, errors
+
+
+def report(name, timings, commands, errors):
+    accuracy = "missed clicks" if float("inf") in errors else f"max error {max(errors)} px"
+    print(f"{name:28} commands {statistics.median(commands):4.0f}   "
+          f"median {statistics.median(timings) * 1000:7.0f} ms   {accuracy}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid", type=int, default=3, help="points per side of the clicked grid")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    example = load_example()
+    step = IMAGE_SIZE // (args.grid + 1)
+    points = [{'x': step * (i + 1), 'y': step * (j + 1)} for j in range(args.grid) for i in range(args.grid)]
+
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=800,800")
+
+    with webdriver.Chrome(service=Service(chromedriver_path()), options=options) as browser:
+        counter = CommandCounter(browser)
+        per_point = measure(browser, counter, lambda p: clicks_on_coordinates_per_point(
+            browser, p, LOCATOR, example.get_element), points, args.runs)
+        sequence = measure(browser, counter, lambda p: example.clicks_on_coordinates(
+            browser, p, LOCATOR), points, args.runs)
+
+    print(f"points={len(points)} runs={args.runs} (commands include locating the image)")
+    report("perform() per point", *per_point)
+    report("single action sequence", *sequence)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark: time to resolve the chromedriver path at browser start.
+
+Compares `ChromeDriverManager().install()`, which the examples used to call on every
+start, with `utilities.chromedriver.chromedriver_path()`. Every start is a fresh Python
+process, as when an example is run, so module imports and the version lookups are included.
+The first `chromedriver_path()` call fills the cache and is reported separately.
+
+Requires Chrome to be installed. Usage:
+    python benchmarks/bench_driver_startup.py [--runs 10]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+WEBDRIVER_MANAGER = "from webdriver_manager.chrome import ChromeDriverManager; ChromeDriverManager().install()"
+CACHED_RESOLVER = "from utilities.chromedriver import chromedriver_path; chromedriver_path()"
+
+
+def time_start(code):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def report(name, timings):
+    print(f"{name:32} median {statistics.median(timings) * 1000:8.0f} ms   "
+          f"max {max(timings) * 1000:8.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    first = time_start(CACHED_RESOLVER)
+    baseline = [time_start(WEBDRIVER_MANAGER) for _ in range(args.runs)]
+    cached = [time_start(CACHED_RESOLVER) for _ in range(args.runs)]
+    empty = [time_start("pass") for _ in range(args.runs)]
+
+    print(f"runs={args.runs}")
+    report("python startup (reference)", empty)
+    report("ChromeDriverManager().install()", baseline)
+    report("chromedriver_path()", cached)
+    print(f"{'chromedriver_path() first call':32} {first * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
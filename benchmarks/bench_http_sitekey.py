@@ -0,0 +1,77 @@
+"""
+Benchmark: time until the sitekey is known, over HTTP and in Chrome.
+
+Starts the local demo server and reads the sitekeys of the reCAPTCHA V2 and Cloudflare
+Turnstile pages with `fetch_sitekey()` (pooled session, streaming parser) and, unless
+--no-browser is given, the way the examples did before: start Chrome, open the page and
+read the `data-sitekey` attribute of the element. The Chrome time includes the browser
+start, which is what the HTTP path saves before the solve can be submitted.
+
+Requires Chrome for the browser path. Usage:
+    python benchmarks/bench_http_sitekey.py [--runs 20] [--browser-runs 3] [--no-browser]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import DemoServer
+from utilities.http_sitekey import fetch_sitekey
+
+PAGES = {
+    "recaptcha-v2": "g-recaptcha",
+    "cloudflare-turnstile": "cf-turnstile",
+}
+
+
+def measure_http(page_url, element_id, runs):
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        sitekey = fetch_sitekey(page_url, element_id=element_id)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), sitekey
+
+
+def measure_browser(page_url, element_id, runs):
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        with webdriver.Chrome(service=Service(chromedriver_path())) as browser:
+            browser.get(page_url)
+            sitekey = browser.find_element(By.ID, element_id).get_attribute("data-sitekey")
+            times.append(time.perf_counter() - started)
+    return statistics.median(times), sitekey
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="HTTP lookups per page")
+    parser.add_argument("--browser-runs", type=int, default=3, help="Chrome starts per page")
+    parser.add_argument("--no-browser", action="store_true", help="only measure the HTTP path")
+    args = parser.parse_args()
+
+    with DemoServer() as server:
+        print(f"runs={args.runs} browser_runs={args.browser_runs} server={server.base_url}")
+        for page, element_id in PAGES.items():
+            page_url = f"{server.base_url}/{page}"
+            seconds, sitekey = measure_http(page_url, element_id, args.runs)
+            print(f"{page}")
+            print(f"  http     {seconds * 1000:9.2f} ms   sitekey {sitekey}")
+            if not args.no_browser:
+                seconds, sitekey = measure_browser(page_url, element_id, args.browser_runs)
+                print(f"  browser  {seconds * 1000:9.2f} ms   sitekey {sitekey}")
+
+
+if __name__ == "__main__":
+    main()
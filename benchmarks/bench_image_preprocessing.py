@@ -0,0 +1,93 @@
+"""
+Benchmark: throughput of the captcha image preprocessing stage.
+
+Synthetic text captchas (noise, lines and a frame on a coloured background, like a
+screenshot of the captcha element) are generated with Pillow. They are processed one at a
+time with `preprocess_image` and in batches with `preprocess_images`. The script reports
+images per second and the payload size before and after, which is what is uploaded to 2Captcha.
+
+Usage:
+    python benchmarks/bench_image_preprocessing.py [--images 500] [--batch 100] [--size 200x70]
+"""
+import argparse
+import base64
+import io
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.image_preprocessing import preprocess_image, preprocess_images
+
+
+def make_captcha(width, height, rng):
+    """Builds a PNG screenshot-like captcha and returns it base64-encoded."""
+    background = tuple(rng.randint(200, 250) for _ in range(3))
+    image = Image.new("RGB", (width, height), background)
+    draw = ImageDraw.Draw(image)
+
+    # Frame of the captcha element
+    draw.rectangle([0, 0, width - 1, height - 1], outline=(120, 120, 120), width=2)
+
+    for _ in range(width * height // 40):
+        xy = (rng.randrange(width), rng.randrange(height))
+        draw.point(xy, fill=tuple(rng.randint(150, 230) for _ in range(3)))
+    for _ in range(3):
+        draw.line([(rng.randrange(width), rng.randrange(height)) for _ in range(2)],
+                  fill=tuple(rng.randint(120, 200) for _ in range(3)), width=1)
+
+    font = ImageFont.load_default(size=height // 2)
+    text = "".join(rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ23456789") for _ in range(5))
+    draw.text((width // 5, height // 5), text, fill=tuple(rng.randint(0, 80) for _ in range(3)), font=font)
+
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def throughput(func, images):
+    started = time.perf_counter()
+    results = func(images)
+    return len(images) / (time.perf_counter() - started), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--size", default="200x70", help="captcha size, WIDTHxHEIGHT")
+    args = parser.parse_args()
+
+    width, height = map(int, args.size.split("x"))
+    rng = random.Random(1)
+    images = [make_captcha(width, height, rng) for _ in range(args.images)]
+
+    def one_by_one(items):
+        return [preprocess_image(image) for image in items]
+
+    def batched(items):
+        results = []
+        for start in range(0, len(items), args.batch):
+            results.extend(preprocess_images(items[start:start + args.batch]))
+        return results
+
+    single_rate, processed = throughput(one_by_one, images)
+    batch_rate, _ = throughput(batched, images)
+
+    before = statistics.mean(len(image) for image in images)
+    after = statistics.mean(len(image) for image in processed)
+    print(f"images={args.images} size={width}x{height} batch={args.batch}")
+    print(f"one by one   {single_rate:8.0f} images/s")
+    print(f"batched      {batch_rate:8.0f} images/s")
+    print(f"payload      {before / 1024:6.1f} KB -> {after / 1024:.1f} KB base64 ({before / after:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: page-load time, transferred bytes and memory of the light launch profile.
+
+Opens the demo pages of the token-based flows (reCAPTCHA V2, Cloudflare Turnstile and
+MTCaptcha) in Chrome started as the examples start it by default (with a window, all
+resources loaded) and with `light_options()` (headless, images, fonts, stylesheets and media
+blocked outside the captcha provider domains). For every page the script reports the median
+load time from the Navigation Timing API, the bytes transferred by the page and the memory
+of the whole Chrome process tree after the loads. Memory is read from /proc (PSS), so it is
+only reported on Linux.
+
+Requires Chrome and, for the default profile, a display. Set DEMO_BASE_URL to measure the
+pages of the local demo server. Usage:
+    python benchmarks/bench_light_profile.py [--loads 5]
+"""
+import argparse
+import statistics
+import sys
+from pathlib import Path
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import demo_url
+from utilities.light_profile import light_options
+
+PAGES = {
+    "recaptcha": demo_url("https://2captcha.com/demo/recaptcha-v2"),
+    "turnstile": demo_url("https://2captcha.com/demo/cloudflare-turnstile"),
+    "mtcaptcha": demo_url("https://2captcha.com/demo/mtcaptcha"),
+}
+
+LOAD_STATS_SCRIPT = """
+const [navigation] = performance.getEntriesByType('navigation');
+const resources = performance.getEntriesByType('resource');
+return {
+    load: navigation.loadEventEnd - navigation.startTime,
+    bytes: navigation.transferSize + resources.reduce((total, entry) => total + entry.transferSize, 0),
+};
+"""
+
+
+def process_tree_memory(pid):
+    """Returns the PSS in bytes of a process and all its descendants, or None outside Linux."""
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return None
+    children = {}
+    for stat in proc.glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(stat.parent.name))
+
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            for line in (proc / str(current) / "smaps_rollup").read_text().splitlines():
+                if line.startswith("Pss:"):
+                    total += int(line.split()[1]) * 1024
+                    break
+        except OSError:
+            continue
+    return total
+
+
+def measure(captcha, page_url, light, loads):
+    options = light_options(captcha) if light else None
+    service = Service(chromedriver_path())
+    with webdriver.Chrome(service=service, options=options) as browser:
+        load_times, transferred = [], []
+        for _ in range(loads):
+            # about:blank in between, so every load is a full navigation
+            browser.get("about:blank")
+            browser.get(page_url)
+            stats = browser.execute_script(LOAD_STATS_SCRIPT)
+            load_times.append(stats["load"])
+            transferred.append(stats["bytes"])
+        memory = process_tree_memory(service.process.pid)
+    return statistics.median(load_times), statistics.median(transferred), memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loads", type=int, default=5, help="page loads per page and profile")
+    args = parser.parse_args()
+
+    print(f"loads={args.loads}")
+    for captcha, page_url in PAGES.items():
+        print(f"{captcha} ({page_url})")
+        for name, light in (("default", False), ("light", True)):
+            load, transferred, memory = measure(captcha, page_url, light, args.loads)
+            memory_text = f"{memory / 2 ** 20:7.0f} MB" if memory is not None else "    n/a"
+            print(f"  {name:8} load {load:7.0f} ms   transferred {transferred / 1024:8.1f} KB   "
+                  f"memory {memory_text}")
+
+
+if __name__ == "__main__":
+    main()
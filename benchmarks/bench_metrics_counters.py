@@ -0,0 +1,139 @@
+"""
+Benchmark: cost of metric updates from many threads, with per-thread counters and with a lock.
+
+Every thread increments a labelled counter and observes a histogram value, as the solve
+paths do for every request. The per-thread counters of `utilities.metrics` are compared
+with the same metrics storing their values in one dict guarded by a lock, the usual way to
+share counters between threads, once alone and once while another thread scrapes the
+metrics in a loop. With the lock, updates wait while a scrape formats the values; the
+per-thread counters never wait.
+
+Usage:
+    python benchmarks/bench_metrics_counters.py [--threads 16] [--updates 50000]
+"""
+import argparse
+import bisect
+import sys
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.metrics import Counter, Histogram, Registry
+
+
+class LockedCounter(Counter):
+    """`Counter` with one dict guarded by a lock, also held while the values are formatted."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _sample_lines(self):
+        with self._lock:
+            return [f"{self.name}{self._labels(key)} {value}" for key, value in self._values.items()]
+
+
+class LockedHistogram(Histogram):
+    """`Histogram` with one dict guarded by a lock, also held while the values are formatted."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def _sample_lines(self):
+        with self._lock:
+            lines = []
+            for key, counts in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{self._labels(key, [('le', str(bound))])} {cumulative}")
+            return lines
+
+
+def run(update, threads, updates, scrape=None):
+    """Returns the updates per second of `threads` threads, with `scrape` called in a loop meanwhile."""
+    done = threading.Event()
+
+    def work():
+        for i in range(updates):
+            update(i % 40)
+
+    def scraper():
+        while not done.is_set():
+            scrape()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    scraping = threading.Thread(target=scraper) if scrape else None
+    started = time.perf_counter()
+    if scraping:
+        scraping.start()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    if scraping:
+        scraping.join()
+    return threads * updates / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--updates", type=int, default=50000, help="updates per thread")
+    args = parser.parse_args()
+
+    registry = Registry()
+    counter = Counter("bench_solves_total", "Solves.", ("result",), registry=registry)
+    histogram = Histogram("bench_solve_seconds", "Solve time.", ("type",), registry=registry)
+    locked_registry = Registry()
+    locked_counter = LockedCounter("bench_solves_total", "Solves.", ("result",), registry=locked_registry)
+    locked_histogram = LockedHistogram("bench_solve_seconds", "Solve time.", ("type",), registry=locked_registry)
+
+    def sharded_update(value):
+        counter.inc(result="ok")
+        histogram.observe(value, type="recaptcha")
+
+    def locked_update(value):
+        locked_counter.inc(result="ok")
+        locked_histogram.observe(value, type="recaptcha")
+
+    sharded = run(sharded_update, args.threads, args.updates)
+    with_lock = run(locked_update, args.threads, args.updates)
+    sharded_scraped = run(sharded_update, args.threads, args.updates, registry.expose)
+    with_lock_scraped = run(locked_update, args.threads, args.updates, locked_registry.expose)
+
+    started = time.perf_counter()
+    registry.expose()
+    scrape = time.perf_counter() - started
+
+    print(f"threads={args.threads} updates={args.updates} per thread")
+    print(f"{'':20} {'updates/s':>12} {'while scraping':>16}")
+    print(f"{'per-thread counters':20} {sharded:12.0f} {sharded_scraped:16.0f}")
+    print(f"{'single lock':20} {with_lock:12.0f} {with_lock_scraped:16.0f}")
+    print(f"scrape of the registry: {scrape * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
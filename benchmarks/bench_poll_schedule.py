@@ -0,0 +1,81 @@
+"""
+Benchmark: polling requests and answer latency with fixed intervals and with the learned schedule.
+
+Solve times are drawn from synthetic distributions per captcha type (a few seconds for image
+captchas, 20-60 seconds for reCAPTCHA V2). A `PollSchedule` learns from `--train` solves of
+every type; then `--solves` new solves are replayed against it and against fixed intervals
+(the stock `TwoCaptcha` polls right after the submit and then every `pollingInterval` seconds).
+The script reports polls per solve and the mean delay between the answer being ready and
+being seen. No requests are sent, the polls are simulated.
+
+Usage:
+    python benchmarks/bench_poll_schedule.py [--train 200] [--solves 2000]
+"""
+import argparse
+import itertools
+import random
+import statistics
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.poll_schedule import PollSchedule
+
+# Solve time generators in seconds, by captcha type
+SOLVE_TIMES = {
+    "normal": lambda rng: rng.lognormvariate(1.6, 0.35),
+    "coordinates": lambda rng: rng.lognormvariate(2.3, 0.3),
+    "turnstile": lambda rng: rng.lognormvariate(2.0, 0.4),
+    "recaptcha": lambda rng: rng.uniform(20, 60),
+}
+
+
+def replay(delays, solve_time):
+    """Returns the number of polls and the delay after `solve_time` until the answer is seen."""
+    polled_at = 0.0
+    for polls in itertools.count(1):
+        polled_at += next(delays)
+        if polled_at >= solve_time:
+            return polls, polled_at - solve_time
+
+
+def fixed_interval(interval):
+    return lambda _: itertools.chain([0.0], itertools.repeat(interval))
+
+
+def measure(delays_for, captcha_type, solve_times):
+    results = [replay(delays_for(captcha_type), solve_time) for solve_time in solve_times]
+    return statistics.mean(polls for polls, _ in results), statistics.mean(delay for _, delay in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--train", type=int, default=200, help="observed solves per type before measuring")
+    parser.add_argument("--solves", type=int, default=2000, help="measured solves per type")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    schedule = PollSchedule(path=None, max_samples=args.train)
+    for captcha_type, solve_time in SOLVE_TIMES.items():
+        for _ in range(args.train):
+            schedule.record(captcha_type, solve_time(rng))
+
+    strategies = [
+        ("fixed 10 s (default)", fixed_interval(10)),
+        ("fixed 5 s", fixed_interval(5)),
+        ("learned schedule", schedule.delays),
+    ]
+    print(f"train={args.train} solves={args.solves} per type")
+    for captcha_type, solve_time in SOLVE_TIMES.items():
+        solve_times = [solve_time(rng) for _ in range(args.solves)]
+        print(f"{captcha_type} (median solve {statistics.median(solve_times):.1f} s)")
+        for name, delays_for in strategies:
+            polls, delay = measure(delays_for, captcha_type, solve_times)
+            print(f"  {name:22} polls/solve {polls:5.2f}   mean delay {delay:5.2f} s")
+
+
+if __name__ == "__main__":
+    main()
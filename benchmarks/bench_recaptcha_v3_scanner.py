@@ -0,0 +1,190 @@
+"""
+Benchmark: time to find the reCAPTCHA v3 parameters on pages with large inline scripts.
+
+Compares the previous script of examples/reCAPTCHA/recaptcha_v3_extended_js_script.py, which
+joins the text of all scripts and runs three global regular expressions over it, with the
+bounded scanner from `utilities.recaptcha_scanner`. Synthetic pages with 10KB to 20MB of
+inline JavaScript are served from localhost, with the `grecaptcha.execute` call placed:
+- "end": in a small script at the end of the page, after the large bundles;
+- "bundle": inside the last large bundle, after its code. The scanner has to read the
+  bundle, and when it gets there only after its byte budget (MAX_SCAN_BYTES) is used up,
+  e.g. with 20MB of bundles of equal size, the call is reported as NOT FOUND.
+Each timing is one `execute_script` round trip; the scanner's memory of already scanned
+scripts is cleared before every run.
+
+Requires Chrome. Usage:
+    python benchmarks/bench_recaptcha_v3_scanner.py [--runs 10] [--sizes 10000,1000000,20000000]
+        [--placements end,bundle]
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.recaptcha_scanner import MAX_SCAN_BYTES, recaptcha_v3_scan_script
+
+DEFAULT_SIZES = "10000,100000,1000000,5000000,20000000"
+
+PLACEMENTS = ("end", "bundle")
+
+# Largest inline script of a synthetic page, in characters
+BUNDLE_SIZE = 2000000
+
+SITEKEY = "6LfB5_IbAAAAAMCtsjEHEHKqcB9iQocwwxTiihJu"
+ACTION = "demo_action"
+
+PREVIOUS_SCAN_SCRIPT = """
+function findRecaptchaData() {
+    const results = [];
+
+    // Collecting the text of all scripts on the page
+    const scriptContents = Array.from(document.scripts)
+        .map(script => script.innerHTML || '')
+        .join('\\n');
+
+    // Regular expressions to find sitekey and action
+    const sitekeyPattern = /['"]sitekey['"]\\s*:\\s*['"]([^'"]+)['"]/gi;
+    const actionPattern = /['"]action['"]\\s*:\\s*['"]([^'"]+)['"]/gi;
+    const executePattern = /grecaptcha\\.execute\\s*\\(\\s*['"]([^'"]+)['"]\\s*,\\s*\\{[^}]*?\\baction\\b\\s*:\\s*['"]([^'"]+)['"][^}]*?\\}/gi;
+
+    let match;
+
+    // We are looking for sitekey and action in grecaptcha.execute
+    while ((match = executePattern.exec(scriptContents)) !== null) {
+        results.push({
+            sitekey: match[1],
+            action: match[2]
+        });
+    }
+
+    // We are looking for sitekey and action in separate code blocks
+    const sitekeys = [];
+    while ((match = sitekeyPattern.exec(scriptContents)) !== null) {
+        sitekeys.push(match[1]);
+    }
+
+    const actions = [];
+    while ((match = actionPattern.exec(scriptContents)) !== null) {
+        actions.push(match[1]);
+    }
+
+    // We connect the found sitekey and action
+    for (let i = 0; i < Math.min(sitekeys.length, actions.length); i++) {
+        results.push({
+            sitekey: sitekeys[i],
+            action: actions[i]
+        });
+    }
+
+    return results;
+}
+
+return findRecaptchaData();
+"""
+
+
+def make_page(size, placement):
+    """Builds a page with about `size` characters of inline JavaScript and the call at `placement`."""
+    chunk = 'function m%d(a){var o={"id":%d,"name":"item%d","tags":["x","y"]};return a+o.id;}\n'
+    bundles, bundle, bundle_size, total, n = [], [], 0, 0, 0
+    while total < size:
+        line = chunk % (n, n, n)
+        bundle.append(line)
+        bundle_size += len(line)
+        total += len(line)
+        n += 1
+        if bundle_size >= BUNDLE_SIZE:
+            bundles.append("".join(bundle))
+            bundle, bundle_size = [], 0
+    if bundle:
+        bundles.append("".join(bundle))
+
+    call = (f"if (window.grecaptcha) grecaptcha.ready(() => "
+            f"grecaptcha.execute('{SITEKEY}', {{action: '{ACTION}'}}));")
+    if placement == "bundle":
+        bundles[-1] += call
+        call = ""
+    else:
+        call = f"<script>{call}</script>"
+
+    scripts = "".join(f"<script>{bundle}</script>\n" for bundle in bundles)
+    return f"<!DOCTYPE html><html><head>{scripts}</head><body><p>page</p>{call}</body></html>"
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    pages = {}
+
+    def do_GET(self):
+        placement, size = self.path.strip("/").split("/")
+        key = (placement, int(size))
+        if key not in self.pages:
+            self.pages[key] = make_page(key[1], placement).encode("utf-8")
+        data = self.pages[key]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def measure(browser, script, runs):
+    timings, found = [], True
+    for _ in range(runs):
+        browser.execute_script("delete window.__recaptchaScanned;")
+        started = time.perf_counter()
+        result = browser.execute_script(script)
+        timings.append(time.perf_counter() - started)
+        found = found and bool(result) and result[0]["sitekey"] == SITEKEY
+    return timings, found
+
+
+def report(name, timings, found):
+    print(f"  {name:20} median {statistics.median(timings) * 1000:8.1f} ms   "
+          f"max {max(timings) * 1000:8.1f} ms   {'found' if found else 'NOT FOUND'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated inline JS sizes in characters")
+    parser.add_argument("--placements", default=",".join(PLACEMENTS),
+                        help="comma-separated positions of the call: end, bundle")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scanner = recaptcha_v3_scan_script()
+
+    options = Options()
+    options.add_argument("--headless=new")
+
+    try:
+        with webdriver.Chrome(service=Service(chromedriver_path()), options=options) as browser:
+            print(f"runs={args.runs} scanner budget={MAX_SCAN_BYTES / 1000:,.0f} KB")
+            for placement in args.placements.split(","):
+                for size in map(int, args.sizes.split(",")):
+                    browser.get(f"http://127.0.0.1:{server.server_port}/{placement}/{size}")
+                    print(f"inline JS {size / 1000:,.0f} KB, call at {placement}")
+                    report("join + global regex", *measure(browser, PREVIOUS_SCAN_SCRIPT, args.runs))
+                    report("bounded scanner", *measure(browser, scanner, args.runs))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark: throughput and latency of every solve path against the local mock API.
+
+The mock API of `utilities.mock_api` solves captchas after realistic solve times of every
+captcha type, scaled by `--time-scale`. For each captcha type the same number of solves is
+run at once through the three solve paths of the examples:
+
+- blocking: `solver.<method>()` in a thread per solve, as the single-page examples do,
+- async: `AsyncSolver.solve()` from asyncio, as `recaptcha_v2_async.py` did before batching,
+- batch: `BatchSolver`, which polls the answers of many captchas in one request.
+
+All paths poll on the same `PollSchedule`, trained on earlier solves of the same mock
+distributions. The script reports solves per second, p50/p95 latency and HTTP requests per
+solve. The seeded mock makes the numbers repeatable.
+
+Usage:
+    python benchmarks/bench_solve_paths.py [--solves 200] [--time-scale 0.01]
+"""
+import argparse
+import asyncio
+import base64
+import io
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.async_pipeline import AsyncSolver
+from utilities.batch_solver import BatchSolver
+from utilities.mock_api import MockApi, sample_latency
+from utilities.poll_schedule import PollSchedule
+from utilities.solver_client import PooledTwoCaptcha
+
+
+def make_image():
+    buffer = io.BytesIO()
+    Image.new("RGB", (200, 70), (230, 230, 230)).save(buffer, "PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+IMAGE = make_image()
+
+# The solver method and its arguments, by captcha type of the mock API
+SOLVES = {
+    "normal": ("normal", (IMAGE,), {}),
+    "text": ("text", ("If tomorrow is Saturday, what day is today?",), {}),
+    "coordinates": ("coordinates", (IMAGE,), {}),
+    "recaptcha": ("recaptcha", (), {"sitekey": "6Le-wvkSAAAAAPBMRTvw0Q4Muexq9bi0DJwx_mJ-", "url": "https://example.com"}),
+    "turnstile": ("turnstile", (), {"sitekey": "0x4AAAAAAAC3DHQFLr1GavRN", "url": "https://example.com"}),
+    "mtcaptcha": ("mtcaptcha", (), {"sitekey": "MTPublic-KzqLY1cKH", "url": "https://example.com"}),
+}
+
+
+def trained_schedule(api, time_scale, samples=200, seed=2):
+    """Returns a schedule trained on solve times drawn from the mock distributions."""
+    rng = random.Random(seed)
+    # The default intervals and request cost, on the time scale of the mock
+    schedule = PollSchedule(path=None, min_interval=time_scale, max_interval=10 * time_scale,
+                            request_cost=time_scale)
+    for captcha_type in SOLVES:
+        for _ in range(samples):
+            schedule.record(captcha_type, sample_latency(api.latency[captcha_type], rng) * time_scale)
+    return schedule
+
+
+def run_blocking(solver, method, args, kwargs, solves):
+    def solve(_):
+        started = time.perf_counter()
+        getattr(solver, method)(*args, **kwargs)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=solves) as executor:
+        return list(executor.map(solve, range(solves)))
+
+
+def run_async(solver, method, args, kwargs, solves):
+    async def run():
+        async_solver = AsyncSolver(solver, max_in_flight=solves)
+
+        async def solve():
+            started = time.perf_counter()
+            await async_solver.solve(method, *args, **kwargs)
+            return time.perf_counter() - started
+
+        return await asyncio.gather(*(solve() for _ in range(solves)))
+
+    return asyncio.run(run())
+
+
+def run_batch(solver, method, args, kwargs, solves):
+    with BatchSolver(solver) as batch:
+        submitted = []
+        for _ in range(solves):
+            submitted.append((time.perf_counter(), batch.submit(method, *args, **kwargs)))
+        latencies = []
+        for started, future in submitted:
+            future.result()
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+PATHS = {"blocking": run_blocking, "async": run_async, "batch": run_batch}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--solves", type=int, default=200, help="solves per captcha type and path")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="factor applied to the mock solve times")
+    parser.add_argument("--types", default=",".join(SOLVES), help="comma-separated captcha types")
+    args = parser.parse_args()
+
+    print(f"solves={args.solves} time_scale={args.time_scale}")
+    with MockApi(time_scale=args.time_scale) as api:
+        schedule = trained_schedule(api, args.time_scale)
+        solver = PooledTwoCaptcha("benchmark", server=api.url, schedule=schedule)
+        for captcha_type in args.types.split(","):
+            method, method_args, kwargs = SOLVES[captcha_type]
+            print(captcha_type)
+            for name, run in PATHS.items():
+                api.reset_stats()
+                started = time.perf_counter()
+                latencies = run(solver, method, method_args, kwargs, args.solves)
+                elapsed = time.perf_counter() - started
+                stats = api.stats()
+                requests = (stats["submitted"] + stats["poll_requests"]) / args.solves
+                quantiles = statistics.quantiles(latencies, n=20)
+                p50, p95 = quantiles[9], quantiles[18]
+                print(f"  {name:9} {args.solves / elapsed:7.1f} solves/s   p50 {p50 * 1000:6.0f} ms   "
+                      f"p95 {p95 * 1000:6.0f} ms   requests/solve {requests:5.2f}")
+        solver.api_client.close()
+
+
+if __name__ == "__main__":
+    main()
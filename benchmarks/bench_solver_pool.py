@@ -0,0 +1,74 @@
+"""
+Benchmark: requests per second of the 2Captcha API client with and without connection pooling.
+
+The mock API of `utilities.mock_api` is started on localhost and answers instantly. Every
+"solve" is one submit (in.php) plus one poll (res.php), the same request pair a solver sends
+for an already solved captcha. The baseline builds a new solver for every solve, as the
+examples did before `utilities.solver_client`; the pooled run shares one solver between all
+threads.
+
+Plain HTTP is used, so the numbers do not include TLS handshakes. Against the real API
+every new connection also pays a TLS handshake, which makes the gap larger.
+
+Usage:
+    python benchmarks/bench_solver_pool.py [--solves 2000] [--threads 16]
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.mock_api import MockApi
+from utilities.solver_client import PooledTwoCaptcha
+
+
+def solve_once(solver):
+    captcha_id = solver.send(method='post', textcaptcha='2+2')
+    return solver.get_result(captcha_id)
+
+
+def run(server, solves, threads, pooled):
+    shared = PooledTwoCaptcha('benchmark', server=server, pool_maxsize=threads) if pooled else None
+
+    def job(_):
+        if shared is not None:
+            return solve_once(shared)
+        solver = PooledTwoCaptcha('benchmark', server=server)
+        try:
+            return solve_once(solver)
+        finally:
+            solver.api_client.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(job, range(solves)))
+    elapsed = time.perf_counter() - started
+
+    if shared is not None:
+        shared.api_client.close()
+    # Two HTTP requests per solve
+    return solves * 2 / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--solves', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    with MockApi(latency={'text': 0}) as api:
+        baseline = run(api.url, args.solves, args.threads, pooled=False)
+        pooled = run(api.url, args.solves, args.threads, pooled=True)
+
+    print(f"solves={args.solves} threads={args.threads}")
+    print(f"new client per solve : {baseline:8.0f} req/s")
+    print(f"shared pooled client : {pooled:8.0f} req/s  ({pooled / baseline:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
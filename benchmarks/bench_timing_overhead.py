@@ -0,0 +1,67 @@
+"""
+Benchmark: overhead of the per-stage timing of `utilities.timing`.
+
+A no-op helper is called with and without the `@stage` decorator: outside of a job, inside
+a job without listeners and inside a job whose events are written to a JSON lines file.
+The script prints the cost per call in microseconds, to compare with the milliseconds to
+seconds a WebDriver call or a captcha solve takes.
+
+Usage:
+    python benchmarks/bench_timing_overhead.py [--calls 200000]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.timing import JsonlWriter, add_listener, remove_listener, stage, timed_job
+
+
+def helper():
+    pass
+
+
+@stage("extract")
+def timed_helper():
+    pass
+
+
+def per_call(func, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    baseline = per_call(helper, args.calls)
+    results = [("no job", per_call(timed_helper, args.calls))]
+    with timed_job("benchmark", verbose=False):
+        results.append(("job, no listeners", per_call(timed_helper, args.calls)))
+    with tempfile.TemporaryDirectory() as directory:
+        writer = JsonlWriter(Path(directory) / "timings.jsonl")
+        add_listener(writer)
+        try:
+            with timed_job("benchmark", verbose=False):
+                results.append(("job, JSON lines file", per_call(timed_helper, args.calls)))
+        finally:
+            remove_listener(writer)
+            writer.close()
+
+    print(f"calls={args.calls}")
+    print(f"{'plain call':22} {baseline:6.2f} us")
+    for name, cost in results:
+        print(f"{name:22} {cost:6.2f} us  (+{cost - baseline:.2f} us per stage)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: applying a token and waiting for the result, step by step and in one script.
+
+Opens the reCAPTCHA V2 page of the local demo server in Chrome and measures the time from
+having the token to having the success message, done the way the examples did it before
+(a script built per token, a click through WebDriver and a WebDriverWait for the message)
+and with `apply_token()` (one asynchronous script that also waits with a MutationObserver).
+The demo server accepts any non-empty answer, so no API key is needed.
+
+Requires Chrome. Usage:
+    python benchmarks/bench_token_apply.py [--runs 20] [--headless]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.wait import WebDriverWait
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import DemoServer
+from utilities.token_apply import apply_token
+
+SUBMIT_LOCATOR = "//button[@data-action='demo_action']"
+SUCCESS_LOCATOR = "//p[contains(@class,'successMessage')]"
+RESPONSE_SELECTOR = '[id="g-recaptcha-response"]'
+
+
+def step_by_step(browser, token):
+    browser.execute_script(f"""
+        document.querySelector('{RESPONSE_SELECTOR}').value = '{token}';
+    """)
+    WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, SUBMIT_LOCATOR))).click()
+    return WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, SUCCESS_LOCATOR))).text
+
+
+def one_script(browser, token):
+    return apply_token(browser, token, SUCCESS_LOCATOR, response_selector=RESPONSE_SELECTOR,
+                       submit_locator=SUBMIT_LOCATOR)
+
+
+def measure(browser, page_url, apply, runs):
+    times = []
+    for run in range(runs):
+        browser.get(page_url)
+        # The response field is added by the widget
+        WebDriverWait(browser, 30).until(EC.presence_of_element_located((By.CSS_SELECTOR, RESPONSE_SELECTOR)))
+        started = time.perf_counter()
+        apply(browser, f"token-{run}")
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), max(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="token applications per variant")
+    parser.add_argument("--headless", action="store_true", help="run Chrome without a window")
+    args = parser.parse_args()
+
+    options = Options()
+    if args.headless:
+        options.add_argument("--headless=new")
+
+    with DemoServer() as server, \
+            webdriver.Chrome(service=Service(chromedriver_path()), options=options) as browser:
+        page_url = f"{server.base_url}/recaptcha-v2"
+        print(f"runs={args.runs} page={page_url}")
+        for name, apply in (("step by step", step_by_step), ("one script", one_script)):
+            median, worst = measure(browser, page_url, apply, args.runs)
+            print(f"  {name:13} median {median * 1000:8.2f} ms   max {worst * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark: latency of intercepting the Cloudflare challenge parameters.
+
+Compares the previous implementation of `get_captcha_params` in
+examples/cloudflare/cloudflare_challenge_page.py (load, refresh, inject a polling script, sleep
+5 seconds, scan `get_log("browser")`) with the current one, which registers the render hook to
+run before the page scripts and waits for the console message as a WebDriver BiDi event.
+Both run in the same browser against the same page. The polling path runs first, because the
+registered hook stays active for every later page load.
+
+Requires Chrome. Usage:
+    python benchmarks/bench_turnstile_interception.py [--runs 20] [--url URL]
+"""
+import argparse
+import importlib.util
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+
+EXAMPLE = PROJECT_ROOT / "examples" / "cloudflare" / "cloudflare_challenge_page.py"
+
+
+def load_example():
+    spec = importlib.util.spec_from_file_location("cloudflare_challenge_page", EXAMPLE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# The previous interception script: polls for window.turnstile after it was injected
+POLLING_INTERCEPT_SCRIPT = """
+    const i = setInterval(() => {
+        if (window.turnstile) {
+            clearInterval(i)
+            window.turnstile.render = (a, b) => {
+                let params = {
+                    sitekey: b.sitekey,
+                    pageurl: window.location.href,
+                    data: b.cData,
+                    pagedata: b.chlPageData,
+                    action: b.action,
+                    userAgent: navigator.userAgent,
+                }
+                console.log('intercepted-params:' + JSON.stringify(params))
+                window.cfCallback = b.callback
+            }
+        }
+    }, 50)
+"""
+
+
+def get_captcha_params_polling(browser, url):
+    """The previous implementation: load, refresh, fixed sleep, then a scan of the whole log buffer."""
+    browser.get(url)
+    browser.refresh()
+    browser.execute_script(POLLING_INTERCEPT_SCRIPT)
+    time.sleep(5)
+    for log in browser.get_log("browser"):
+        if "intercepted-params:" in log['message']:
+            log_entry = log['message'].encode('utf-8').decode('unicode_escape')
+            match = re.search(r'intercepted-params:({.*?})', log_entry)
+            if match:
+                return json.loads(match.group(1))
+    return None
+
+
+def measure(func, runs):
+    timings, failures = [], 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        params = func()
+        timings.append(time.perf_counter() - started)
+        failures += params is None
+    return timings, failures
+
+
+def report(name, timings, failures):
+    cuts = statistics.quantiles(timings, n=100, method="inclusive")
+    print(f"{name:24} p50 {cuts[49] * 1000:7.0f} ms  p95 {cuts[94] * 1000:7.0f} ms  "
+          f"p99 {cuts[98] * 1000:7.0f} ms  failed {failures}/{len(timings)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--url", default=None, help="challenge page URL, the example's URL by default")
+    args = parser.parse_args()
+
+    example = load_example()
+    url = args.url or example.url
+
+    options = Options()
+    options.set_capability("goog:loggingPrefs", {"browser": "INFO"})
+    options.web_socket_url = True
+
+    with webdriver.Chrome(service=Service(chromedriver_path()), options=options) as browser:
+        polling = measure(lambda: get_captcha_params_polling(browser, url), args.runs)
+
+        example.install_intercept_script(browser, example.intercept_script)
+        events = measure(lambda: example.get_captcha_params(browser, url), args.runs)
+
+    print(f"url={url} runs={args.runs}")
+    report("refresh + sleep + log", *polling)
+    report("early hook + BiDi event", *events)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: element waits with WebDriverWait(browser, 30) and with the wait engine.
+
+Opens the text captcha page of the local demo server in Chrome and measures two cases:
+- "late element": a button added by the page after --delay ms; reported is the time from
+  the start of the wait to having the element, i.e. the delay plus the latency of the wait.
+- "rejected answer": an empty answer is sent, so the page shows the error message and the
+  success message never appears; reported is the time until the wait gives up. The waits
+  use --timeout seconds instead of 30, to keep the run short.
+
+The waits compared are the old `get_element()` body (`WebDriverWait` polling every 0.5
+seconds) and `WaitEngine` waiting in the page and polling every 50 ms.
+
+Requires Chrome. Usage:
+    python benchmarks/bench_waits.py [--runs 10] [--delay 150] [--timeout 5] [--headless]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.wait import WebDriverWait
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import DemoServer
+from utilities.waits import WaitEngine
+
+LATE_LOCATOR = "//button[@id='late']"
+SUCCESS_LOCATOR = "//p[contains(@class,'successMessage')]"
+
+ADD_LATE_BUTTON_SCRIPT = """
+setTimeout(() => {
+    const button = document.createElement('button');
+    button.id = 'late';
+    button.textContent = 'Late';
+    document.body.appendChild(button);
+}, arguments[0]);
+"""
+
+
+def webdriver_wait(timeout):
+    def get_element(browser, locator):
+        return WebDriverWait(browser, timeout).until(EC.element_to_be_clickable((By.XPATH, locator)))
+    return get_element
+
+
+def measure(browser, page_url, get_element, case, delay, runs):
+    times = []
+    for _ in range(runs):
+        browser.get(page_url)
+        if case == "late element":
+            browser.execute_script(ADD_LATE_BUTTON_SCRIPT, delay)
+            started = time.perf_counter()
+            get_element(browser, LATE_LOCATOR)
+        else:
+            browser.execute_script("verify('')")
+            started = time.perf_counter()
+            try:
+                get_element(browser, SUCCESS_LOCATOR)
+            except TimeoutException:
+                pass
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="waits per case and variant")
+    parser.add_argument("--delay", type=int, default=150, help="ms before the late element is added")
+    parser.add_argument("--timeout", type=float, default=5, help="timeout of the waits in seconds")
+    parser.add_argument("--headless", action="store_true", help="run Chrome without a window")
+    args = parser.parse_args()
+
+    options = Options()
+    if args.headless:
+        options.add_argument("--headless=new")
+
+    variants = {
+        "WebDriverWait 0.5s poll": webdriver_wait(args.timeout),
+        "WaitEngine in page": WaitEngine(timeout=args.timeout).get_element,
+        "WaitEngine 50ms poll": WaitEngine(timeout=args.timeout, event_driven=False).get_element,
+    }
+
+    with DemoServer() as server, \
+            webdriver.Chrome(service=Service(chromedriver_path()), options=options) as browser:
+        page_url = f"{server.base_url}/text"
+        print(f"runs={args.runs} delay={args.delay}ms timeout={args.timeout}s page={page_url}")
+        for case in ("late element", "rejected answer"):
+            print(case)
+            for name, get_element in variants.items():
+                median = measure(browser, page_url, get_element, case, args.delay, args.runs)
+                print(f"  {name:24} median {median * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
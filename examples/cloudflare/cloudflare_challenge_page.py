@@ -1,48 +1,72 @@
 import os
 import time
+import sys
+from pathlib import Path
 import json
-import re
 from selenium import webdriver
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from twocaptcha import TwoCaptcha
+
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.console_events import ConsoleMessageWaiter
+from utilities.demo_server import demo_url
+from utilities.solver_client import get_solver
+from utilities.timing import stage, timed_job
+from utilities.waits import wait_for_element
 
 
 # CONFIGURATION
 
-url = "https://2captcha.com/demo/cloudflare-turnstile-challenge"
+url = demo_url("https://2captcha.com/demo/cloudflare-turnstile-challenge")
+
+# Maximum time to wait for the intercepted parameters, in seconds
+params_timeout = 10
 
 
 """
 When a web page first loads, some JavaScript functions and objects (such as window.turnstile) may already be initialized
-and executed. If the interception script is launched too late, this may lead to the fact that the necessary parameters 
-will already be lost, or the script simply will not have time to intercept the right moment. Refreshing the page ensures
-that everything starts from scratch and you trigger the interception at the right time.
+and executed. If the interception script is launched too late, the necessary parameters will already be lost. The script
+is therefore registered with `Page.addScriptToEvaluateOnNewDocument`, so Chrome runs it in every new document before any
+script of the page. It traps the assignment of window.turnstile and replaces `turnstile.render` the moment the Turnstile
+object appears, so neither a page refresh nor polling for window.turnstile is needed.
 """
-intercept_script = """ 
-    console.clear = () => console.log('Console was cleared')
-    const i = setInterval(()=>{
-    if (window.turnstile)
-     console.log('success!!')
-     {clearInterval(i)
-         window.turnstile.render = (a,b) => {
-          let params = {
-                sitekey: b.sitekey,
+intercept_script = """
+    (() => {
+        const interceptRender = (container, options) => {
+            const params = {
+                sitekey: options.sitekey,
                 pageurl: window.location.href,
-                data: b.cData,
-                pagedata: b.chlPageData,
-                action: b.action,
+                data: options.cData,
+                pagedata: options.chlPageData,
+                action: options.action,
                 userAgent: navigator.userAgent,
-            }
-            console.log('intercepted-params:' + JSON.stringify(params))
-            window.cfCallback = b.callback
-            return        } 
-    }
-},50)    
+            };
+            window.cfCallback = options.callback;
+            console.log('intercepted-params:' + JSON.stringify(params));
+        };
+
+        let turnstile;
+        Object.defineProperty(window, 'turnstile', {
+            configurable: true,
+            get: () => turnstile,
+            set: (value) => {
+                turnstile = value;
+                if (value && typeof value === 'object') {
+                    // An accessor keeps the interceptor even if the Turnstile script assigns render later
+                    Object.defineProperty(value, 'render', {
+                        configurable: true,
+                        get: () => interceptRender,
+                        set: () => {},
+                    });
+                }
+            },
+        });
+    })();
 """
 
 # LOCATORS
@@ -58,38 +82,49 @@ def get_element(browser, locator):
 
     This helper can be copied and reused in other projects that use Selenium.
     """
-    return WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, locator)))
+    return wait_for_element(browser, locator)
 
 
 # ACTIONS
 
-def get_captcha_params(browser, script):
+def install_intercept_script(browser, script):
     """
-    Refreshes the page, injects a JavaScript script to intercept Turnstile parameters, and retrieves them.
+    Registers the interception script to run in every new document before the page's own scripts.
 
     Args:
         script (str): The JavaScript code to be injected.
+    """
+    browser.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": script})
+
+def get_captcha_params(browser, url, timeout=params_timeout):
+    """
+    Opens the page and retrieves the Turnstile parameters intercepted by the installed script.
+
+    The script prints the parameters to the console. The message is received through a
+    WebDriver BiDi console event as soon as it is logged, so there is no fixed wait.
+
+    Args:
+        url (str): The URL of the page with the challenge.
+        timeout (float): Maximum number of seconds to wait for the parameters.
 
     Returns:
-        dict: The intercepted Turnstile parameters as a dictionary.
+        dict: The intercepted Turnstile parameters as a dictionary, or None if they were not received in time.
     """
-    browser.refresh()  # Refresh the page to ensure the script is applied correctly
-
-    browser.execute_script(script)  # Inject the interception script
-
-    time.sleep(5)  # Allow some time for the script to execute
-
-    logs = browser.get_log("browser")  # Retrieve the browser logs
-    params = None
-    for log in logs:
-        if "intercepted-params:" in log['message']:
-            log_entry = log['message'].encode('utf-8').decode('unicode_escape')
-            match = re.search(r'intercepted-params:({.*?})', log_entry)
-            if match:
-                json_string = match.group(1)
-                params = json.loads(json_string)
-                break
-    print("Parameters received")
+    marker = "intercepted-params:"
+    started = time.perf_counter()
+
+    # Subscribe before loading the page, so the message cannot be logged before we listen
+    with ConsoleMessageWaiter(browser, marker) as waiter:
+        with stage("navigate"):
+            browser.get(url)
+        with stage("extract"):
+            message = waiter.wait(timeout)
+
+    if message is None:
+        return None
+
+    params = json.loads(message[len(marker):])
+    print(f"Parameters received in {time.perf_counter() - started:.2f}s")
     return params
 
 def solver_captcha(apikey, params):
@@ -103,7 +138,7 @@ def solver_captcha(apikey, params):
     Returns:
         str: The solved captcha token.
     """
-    solver = TwoCaptcha(apikey)
+    solver = get_solver(apikey)
     try:
         result = solver.turnstile(sitekey=params["sitekey"],
                                   url=params["pageurl"],
@@ -117,17 +152,22 @@ def solver_captcha(apikey, params):
         print(f"An error occurred: {e}")
         return None
 
+@stage("inject")
 def send_token_callback(browser, token):
     """
     Executes the callback function with the given token.
 
+    The token is passed as a script argument rather than written into the script source,
+    so it needs no escaping. On a real challenge page the callback reloads the page, which
+    would end a script waiting for the result, so the confirmation is a separate step.
+
     Args:
         token (str): The solved captcha token.
     """
-    script = f"cfCallback('{token}')"
-    browser.execute_script(script)
+    browser.execute_script("cfCallback(arguments[0])", token)
     print("The token is sent to the callback function")
 
+@stage("confirm")
 def final_message(browser, locator):
     """
     Retrieves and prints the final success message.
@@ -139,12 +179,13 @@ def final_message(browser, locator):
     print(message)
 
 
+@timed_job("turnstile-challenge")
 def main():
     """
     Runs the demo flow for solving Cloudflare Turnstile challenge using 2Captcha.
 
-    Helper functions (`get_captcha_params`, `solver_captcha`, `send_token_callback`, etc.)
-    are designed so they can be copied and reused independently.
+    Helper functions (`install_intercept_script`, `get_captcha_params`, `solver_captcha`,
+    `send_token_callback`, etc.) are designed so they can be copied and reused independently.
     """
     apikey = os.getenv("APIKEY_2CAPTCHA")
     if not apikey:
@@ -155,14 +196,15 @@ def main():
         "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
         "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
     )
-    # Set logging preferences to capture only console logs
-    chrome_options.set_capability("goog:loggingPrefs", {"browser": "INFO"})
+    # Enable WebDriver BiDi to receive console messages as events
+    chrome_options.web_socket_url = True
 
-    with webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options) as browser:
-        browser.get(url)
+    with webdriver.Chrome(service=Service(chromedriver_path()), options=chrome_options) as browser:
+        # The script must be registered before the page is loaded
+        install_intercept_script(browser, intercept_script)
         print("Started")
 
-        params = get_captcha_params(browser, intercept_script)
+        params = get_captcha_params(browser, url)
 
         if params:
             token = solver_captcha(apikey, params)
@@ -1,12 +1,25 @@
 import os
 import time
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from pathlib import Path
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from twocaptcha import TwoCaptcha
+
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import demo_url
+from utilities.http_sitekey import fetch_sitekey
+from utilities.light_profile import light_options
+from utilities.solver_client import get_solver
+from utilities.timing import stage, timed_job
+from utilities.token_apply import apply_token
+from utilities.waits import wait_for_element
 
 # Description: 
 # In this example, you will learn how to bypass the Cloudflare Turnstile CAPTCHA located on the page https://2captcha.com/demo/cloudflare-turnstile. This demonstration will guide you through the steps of interacting with and overcoming the CAPTCHA using specific techniques
@@ -14,13 +27,18 @@ from twocaptcha import TwoCaptcha
 
 # CONFIGURATION
 
-url = "https://2captcha.com/demo/cloudflare-turnstile"
+url = demo_url("https://2captcha.com/demo/cloudflare-turnstile")
 apikey = os.getenv('APIKEY_2CAPTCHA')
 
+# Set LIGHT_PROFILE=1 to run Chrome headless and block images, fonts and CSS outside the
+# captcha provider domains; the flow only needs the sitekey and the field for the token
+light_profile = os.getenv("LIGHT_PROFILE") == "1"
+
 
 # LOCATORS
 
 sitekey_locator = "//div[@id='cf-turnstile']"
+sitekey_element_id = "cf-turnstile"
 css_locator_for_input_send_token = 'input[name="cf-turnstile-response"]'
 submit_button_captcha_locator = "//button[@type='submit']"
 success_message_locator = "//p[contains(@class,'successMessage')]"
@@ -34,11 +52,12 @@ def get_element(browser, locator):
 
     This helper can be copied and reused in other projects that use Selenium.
     """
-    return WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, locator)))
+    return wait_for_element(browser, locator)
 
 
 # ACTIONS
 
+@stage("extract")
 def get_sitekey(browser, locator):
     """
     Extracts the sitekey from the specified element.
@@ -54,6 +73,22 @@ def get_sitekey(browser, locator):
     print(f"Sitekey received: {sitekey}")
     return sitekey
 
+@stage("extract")
+def get_sitekey_http(page_url, element_id):
+    """
+    Reads the sitekey from the HTML of the page over HTTP, without a browser.
+
+    Args:
+        page_url (str): The URL of the page.
+        element_id (str): The id of the element with the sitekey.
+    Returns:
+        str: The sitekey, or None if it is not in the HTML sent by the server.
+    """
+    sitekey = fetch_sitekey(page_url, element_id=element_id)
+    if sitekey:
+        print(f"Sitekey received over HTTP: {sitekey}")
+    return sitekey
+
 def solver_captcha(apikey, sitekey, url):
     """
     Solves the Claudflare Turnstile using the 2Captcha service.
@@ -65,7 +100,7 @@ def solver_captcha(apikey, sitekey, url):
     Returns:
         str: The solved captcha code.
     """
-    solver = TwoCaptcha(apikey)
+    solver = get_solver(apikey)
     try:
         result = solver.turnstile(sitekey=sitekey, url=url)
         print(f"Captcha solved")
@@ -74,74 +109,63 @@ def solver_captcha(apikey, sitekey, url):
         print(f"An error occurred: {e}")
         return None
 
-def send_token(browser, css_locator, captcha_token):
+def send_token_and_confirm(browser, css_locator, captcha_token, submit_locator, success_locator):
     """
-    Sends the captcha token to the Claudflare Turnstile response field.
+    Sends the captcha token to the Claudflare Turnstile response field, presses the Check button and
+    prints the success message, all in one call to the browser.
 
     Args:
+        browser (webdriver): The Selenium WebDriver instance.
         css_locator (str): The CSS locator for the input field.
         captcha_token (str): The solved captcha token.
+        submit_locator (str): The XPath locator of the check button.
+        success_locator (str): The XPath locator of the success message.
     """
-    script = f"""
-        var element = document.querySelector('{css_locator}');
-        if (element) {{
-            element.value = "{captcha_token}";
-        }}
-    """
-    browser.execute_script(script)
-    print("Token sent")
-
-def click_check_button(browser, locator):
-    """
-    Clicks the captcha check button.
-
-    Args:
-        locator (str): The XPath locator of the check button.
-    """
-    get_element(browser, locator).click()
-    print("Pressed the Check button")
-
-def final_message(browser, locator):
-    """
-    Retrieves and prints the final success message.
-
-    Args:
-        locator (str): The XPath locator of the success message.
-    """
-    message = get_element(browser, locator).text
+    message = apply_token(browser, captcha_token, success_locator, response_selector=css_locator,
+                          submit_locator=submit_locator)
+    print("Token sent and the Check button pressed")
     print(message)
 
 
+@timed_job("turnstile")
 def main():
     """
     Runs the demo flow for solving Cloudflare Turnstile using 2Captcha.
 
-    Helper functions (`get_sitekey`, `solver_captcha`, `send_token`, etc.)
+    Helper functions (`get_sitekey`, `solver_captcha`, `send_token_and_confirm`, etc.)
     are designed so they can be copied and reused independently.
     """
     apikey = os.getenv("APIKEY_2CAPTCHA")
     if not apikey:
         raise RuntimeError("Set APIKEY_2CAPTCHA environment variable")
 
-    with webdriver.Chrome(service=Service(ChromeDriverManager().install())) as browser:
-        browser.get(url)
-        print('Started')
+    options = light_options("turnstile") if light_profile else None
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # The sitekey is usually in the HTML of the page, so the captcha is solved while Chrome starts
+        sitekey = get_sitekey_http(url, sitekey_element_id)
+        solving = executor.submit(copy_context().run, solver_captcha, apikey, sitekey, url) if sitekey else None
 
-        sitekey = get_sitekey(browser, sitekey_locator)
+        with webdriver.Chrome(service=Service(chromedriver_path()), options=options) as browser:
+            with stage("navigate"):
+                browser.get(url)
+            print('Started')
 
-        token = solver_captcha(apikey, sitekey, url)
+            if solving is None:
+                sitekey = get_sitekey(browser, sitekey_locator)
+                solving = executor.submit(copy_context().run, solver_captcha, apikey, sitekey, url)
 
-        if token:
-            send_token(browser, css_locator_for_input_send_token, token)
-            click_check_button(browser, submit_button_captcha_locator)
-            final_message(browser, success_message_locator)
+            token = solving.result()
 
-            # Explicit pause to observe the result
-            time.sleep(5)
-            print("Finished")
-        else:
-            print("Failed to solve captcha")
+            if token:
+                send_token_and_confirm(browser, css_locator_for_input_send_token, token,
+                                       submit_button_captcha_locator, success_message_locator)
 
+                # Explicit pause to observe the result
+                time.sleep(5)
+                print("Finished")
+            else:
+                print("Failed to solve captcha")
 
 if __name__ == "__main__":
     main()
@@ -1,20 +1,44 @@
 import os
 import time
+import sys
+from pathlib import Path
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.common.actions.action_builder import ActionBuilder
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from twocaptcha import TwoCaptcha
+
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.answer_cache import AnswerCache, image_hash
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import demo_url
+from utilities.image_capture import capture_image
+from utilities.solver_client import get_solver
+from utilities.timing import stage, timed_job
+from utilities.waits import wait_for_element
 
 
 # CONFIGURATION
 
-url = "https://2captcha.com/demo/clickcaptcha"
+url = demo_url("https://2captcha.com/demo/clickcaptcha")
 apikey = os.getenv('APIKEY_2CAPTCHA')
 
+# Captured image: format ("image/jpeg", "image/webp" or "image/png"), quality from 0 to 1,
+# maximum width and height in pixels (None to keep the displayed size) and grayscale conversion
+image_format = "image/jpeg"
+image_quality = 0.9
+image_max_size = None
+image_grayscale = False
+
+# Duration of each pointer move between the clicks, in milliseconds
+pointer_move_duration = 50
+
 
 # LOCATORS
 
@@ -32,7 +56,7 @@ def get_element(browser, locator):
 
     This helper can be copied and reused in other projects that use Selenium.
     """
-    return WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, locator)))
+    return wait_for_element(browser, locator)
 
 
 # ACTIONS
@@ -47,7 +71,7 @@ def solver_captcha(image, apikey):
     Returns:
         str: Captcha solution code, if successful, otherwise None
     """
-    solver = TwoCaptcha(apikey)
+    solver = get_solver(apikey)
     try:
         result = solver.coordinates(image)
         print(f"Captcha solved. Coordinates received")
@@ -56,44 +80,44 @@ def solver_captcha(image, apikey):
         print(f"An error occurred: {e}")
         return None
 
-def get_image_canvas(browser, locator):
+@stage("capture")
+def get_image_canvas(browser, locator, image_format=image_format, quality=image_quality,
+                     max_size=image_max_size, grayscale=image_grayscale):
     """
     Gets the Base64 representation of an image displayed on a web page using canvas
 
+    The image is re-encoded in the page, so a smaller payload is transferred and uploaded.
+    When it is downscaled, the coordinates of the answer must be divided by the returned scale.
+
     Args:
         browser (webdriver): The Selenium WebDriver instance.
         locator (str): CSS selector for locating an image on a page.
+        image_format (str): Format of the captured image.
+        quality (float): Quality from 0 to 1 for JPEG and WebP.
+        max_size (int): Maximum width and height of the captured image. None to keep the displayed size.
+        grayscale (bool): Convert the image to grayscale.
     Returns:
-        str: Base64 image string.
+        tuple: Base64 image string and the scale of the captured image to the displayed one.
     """
 
     # Ensure the image element is present before executing JavaScript
-    WebDriverWait(browser, 30).until(
+    img_element = WebDriverWait(browser, 30).until(
         EC.presence_of_element_located((By.CSS_SELECTOR, locator))
     )
 
-    # JavaScript code to create a canvas, draw an image to the canvas and get its Base64 representation
-    canvas_script = """
-        function getBase64Image(imgElement) {
-            let canvas = document.createElement('canvas');
-            canvas.width = imgElement.width;
-            canvas.height = imgElement.height;
-            let ctx = canvas.getContext('2d');
-            ctx.drawImage(imgElement, 0, 0);
-            let base64Image = canvas.toDataURL();
-            return base64Image;
-        }
-        return getBase64Image(document.querySelector(arguments[0]));
-    """
-    base64_image = browser.execute_script(canvas_script, locator)
-    return base64_image
+    # The image is drawn to a canvas and encoded in the page, see utilities/image_capture.py
+    image = capture_image(browser, img_element, image_format, quality, max_size, grayscale)
+    print(f"Captcha image captured: {image.size / 1024:.1f} KB base64 "
+          f"({image_format}, {image.width}x{image.height}) in {image.elapsed * 1000:.0f} ms")
+    return image.data_url, image.scale
 
-def pars_coordinates(answer_to_captcha):
+def pars_coordinates(answer_to_captcha, scale=1.0):
     """
     Parses the coordinates from the captcha solution string.
 
     Args:
         answer_to_captcha (str): Captcha solution string containing coordinates.
+        scale (float): Scale of the image sent to the solver to the displayed image.
     Returns:
         list: List of dictionaries with 'x' and 'y' coordinates.
     """
@@ -106,45 +130,43 @@ def pars_coordinates(answer_to_captcha):
         # We split each pair of coordinates by a comma and then by the "=" sign.
         coords = pair.split(",")
         coord_dict = {
-            "x": int(coords[0].split("=")[1]),
-            "y": int(coords[1].split("=")[1])
+            "x": round(int(coords[0].split("=")[1]) / scale),
+            "y": round(int(coords[1].split("=")[1]) / scale)
         }
         coordinates_list.append(coord_dict)
 
     print("The received response is converted into a list of coordinates")
     return coordinates_list
 
-def clicks_on_coordinates(browser, coordinates_list, img_locator_captcha):
+@stage("inject")
+def clicks_on_coordinates(browser, coordinates_list, img_locator_captcha, duration=pointer_move_duration):
     """
-    Clicks on the specified coordinates within the image element using ActionChains.
+    Clicks on the specified coordinates within the image element.
+
+    All clicks are sent as one W3C pointer action sequence, so the browser receives them in a
+    single WebDriver command, whatever the number of points.
 
     Args:
         coordinates_list (list): List of dictionaries with 'x' and 'y' coordinates.
         img_locator_captcha (str): XPath locator of the image element.
+        duration (int): Duration of each pointer move in milliseconds.
     """
-    action = ActionChains(browser)
-
     img_element = get_element(browser, img_locator_captcha)
 
-    # Getting the initial coordinates of the image element
-    location = img_element.location
-    img_x = location['x']
-    img_y = location['y']
+    # Pointer moves relative to an element start from the centre of the element
+    rect = img_element.rect
+    center_x = rect['width'] / 2
+    center_y = rect['height'] / 2
 
+    actions = ActionBuilder(browser, duration=duration)
     for coord in coordinates_list:
-
-        # Calculate absolute coordinates on the page
-        x_offset = img_x + coord['x']
-        y_offset = img_y + coord['y']
-
-        # Click on the calculated coordinates
-        action.move_by_offset(x_offset, y_offset).click().perform()
-
-        # We return the cursor back so as not to move the next clicks
-        action.move_by_offset(-x_offset, -y_offset)
+        actions.pointer_action.move_to(img_element, round(coord['x'] - center_x), round(coord['y'] - center_y))
+        actions.pointer_action.click()
+    actions.perform()
 
     print('The coordinates are marked on the image')
 
+@stage("inject")
 def click_check_button(browser, locator):
     """
     Clicks the check button on a web page
@@ -155,6 +177,7 @@ def click_check_button(browser, locator):
     button.click()
     print("Pressed the Check button")
 
+@stage("confirm")
 def final_message(browser, locator):
     """
     Retrieves and prints the final success message.
@@ -166,6 +189,7 @@ def final_message(browser, locator):
     print(message)
 
 
+@timed_job("coordinates")
 def main():
     """
     Runs the demo flow for solving click-based captcha with coordinates via 2Captcha.
@@ -177,23 +201,40 @@ def main():
     if not apikey:
         raise RuntimeError("Set APIKEY_2CAPTCHA environment variable")
 
+    answer_cache = AnswerCache()
+
     # Automatically closes the browser after block execution completes
-    with webdriver.Chrome(service=Service(ChromeDriverManager().install())) as browser:
+    with webdriver.Chrome(service=Service(chromedriver_path())) as browser:
         # Go to page with captcha
-        browser.get(url)
+        with stage("navigate"):
+            browser.get(url)
         print("Started")
 
         # Getting captcha image in base64 format
-        image_base64 = get_image_canvas(browser, img_locator_captcha_for_get)
+        captured_at = time.perf_counter()
+        image_base64, scale = get_image_canvas(browser, img_locator_captcha_for_get)
 
-        # Solving captcha and receiving answer string with coordinates
-        answer_to_captcha = solver_captcha(image_base64, apikey)
+        # Answering a recycled captcha image from the cache, otherwise solving it
+        image_key = image_hash(image_base64)
+        answer_to_captcha = answer_cache.get('coordinates', image_key)
+        if answer_to_captcha:
+            print("Answer taken from the cache")
+        else:
+            answer_to_captcha = solver_captcha(image_base64, apikey)
+            if answer_to_captcha:
+                answer_cache.put('coordinates', image_key, answer_to_captcha)
+        print(f"Capture to answer: {time.perf_counter() - captured_at:.1f}s")
 
         if answer_to_captcha:
-            coordinates_list = pars_coordinates(answer_to_captcha)
+            coordinates_list = pars_coordinates(answer_to_captcha, scale)
             clicks_on_coordinates(browser, coordinates_list, img_locator_captcha_for_click)
             click_check_button(browser, submit_button_captcha_locator)
-            final_message(browser, success_message_locator)
+            try:
+                final_message(browser, success_message_locator)
+            except TimeoutException:
+                # The answer was rejected, the image is solved again next time
+                answer_cache.invalidate('coordinates', image_key)
+                raise
 
             # Explicit pause to observe the result
             time.sleep(5)
@@ -1,19 +1,41 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 import time
+import sys
+from pathlib import Path
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from twocaptcha import TwoCaptcha
+
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import demo_url
+from utilities.js_wait import wait_for_js
+from utilities.light_profile import light_options
+from utilities.param_cache import ParamCache
+from utilities.solver_client import get_solver
+from utilities.timing import stage, timed_job
+from utilities.token_apply import apply_token
+from utilities.waits import wait_for_element
 
 
 # CONFIGURATION
 
-url = "https://2captcha.com/demo/mtcaptcha"
+url = demo_url("https://2captcha.com/demo/mtcaptcha")
 apikey = os.getenv('APIKEY_2CAPTCHA')
 
+# Set LIGHT_PROFILE=1 to run Chrome headless and block images, fonts and CSS outside the
+# captcha provider domains; the flow only needs the sitekey and the field for the token
+light_profile = os.getenv("LIGHT_PROFILE") == "1"
+
+# Maximum time to wait for the MTCaptcha configuration, in seconds
+sitekey_timeout = 10
+
 
 # LOCATORS
 
@@ -30,24 +52,31 @@ def get_element(browser, locator):
 
     This helper can be copied and reused in other projects that use Selenium.
     """
-    return WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, locator)))
+    return wait_for_element(browser, locator)
 
 
 # ACTIONS
 
-def get_sitekey(browser):
+@stage("extract")
+def get_sitekey(browser, timeout=sitekey_timeout):
     """
     Retrieves the MTCaptcha sitekey from the webpage using JavaScript.
 
+    Waits in the page until the MTCaptcha configuration is available, instead of a fixed delay.
+
+    Args:
+        timeout (float): Maximum number of seconds to wait for the sitekey.
     Returns:
-        str: The sitekey for MTCaptcha.
+        str: The sitekey for MTCaptcha, or None if it was not found in time.
     """
-    time.sleep(3)  # Adding a delay to ensure the sitekey is loaded
-    sitekey = browser.execute_script("""
+    sitekey, elapsed = wait_for_js(browser, """
         return window.mtcaptchaConfig.sitekey || window.mtcaptcha.getConfiguration().sitekey;
-        """)
+        """, timeout)
 
-    print("Sitekey received")
+    if sitekey:
+        print(f"Sitekey received in {elapsed:.2f}s")
+    else:
+        print(f"Sitekey not found after {elapsed:.2f}s")
     return sitekey
 
 def solver_captcha(apikey, sitekey, url):
@@ -61,7 +90,7 @@ def solver_captcha(apikey, sitekey, url):
     Returns:
         str: The solved captcha code.
     """
-    solver = TwoCaptcha(apikey)
+    solver = get_solver(apikey)
     try:
         result = solver.mtcaptcha(sitekey=sitekey, url=url)
         print(f"Captcha solved")
@@ -70,70 +99,75 @@ def solver_captcha(apikey, sitekey, url):
         print(f"An error occurred: {e}")
         return None
 
-def send_token(browser, css_locator, captcha_token):
+def send_token_and_confirm(browser, css_locator, captcha_token, submit_locator, success_locator):
     """
-    Sends the captcha token to the MTCaptcha response field.
+    Sends the captcha token to the MTCaptcha response field, presses the Check button and
+    prints the success message, all in one call to the browser.
 
     Args:
+        browser (webdriver): The Selenium WebDriver instance.
         css_locator (str): The CSS locator for the input field.
         captcha_token (str): The solved captcha token.
+        submit_locator (str): The XPath locator of the check button.
+        success_locator (str): The XPath locator of the success message.
     """
-    script = f"""
-        var element = document.querySelector('{css_locator}');
-        if (element) {{
-            element.value = "{captcha_token}";
-        }}
-    """
-    browser.execute_script(script)
-    print("Token sent")
-
-def click_check_button(browser, locator):
-    """
-    Clicks the captcha check button.
-
-    Args:
-        locator (str): The XPath locator of the check button.
-    """
-    get_element(browser, locator).click()
-    print("Pressed the Check button")
-
-def final_message(browser, locator):
-    """
-    Retrieves and prints the final success message.
-
-    Args:
-        locator (str): The XPath locator of the success message.
-    """
-    message = get_element(browser, locator).text
+    message = apply_token(browser, captcha_token, success_locator, response_selector=css_locator,
+                          submit_locator=submit_locator)
+    print("Token sent and the Check button pressed")
     print(message)
 
 
+@timed_job("mtcaptcha")
 def main():
     """
     Runs the demo flow for solving MTCaptcha using 2Captcha.
 
-    Helper functions (`get_sitekey`, `solver_captcha`, `send_token`, etc.)
+    Helper functions (`get_sitekey`, `solver_captcha`, `send_token_and_confirm`, etc.)
     are designed so they can be copied and reused independently.
+
+    The sitekey is cached per page. On the next run the captcha is sent to 2Captcha
+    right away and solved while the page loads.
     """
     apikey = os.getenv("APIKEY_2CAPTCHA")
     if not apikey:
         raise RuntimeError("Set APIKEY_2CAPTCHA environment variable")
 
-    with webdriver.Chrome(service=Service(ChromeDriverManager().install())) as browser:
-        browser.get(url)
+    param_cache = ParamCache()
+
+    options = light_options("mtcaptcha") if light_profile else None
+
+    with webdriver.Chrome(service=Service(chromedriver_path()), options=options) as browser, \
+            ThreadPoolExecutor(max_workers=1) as executor:
+        params = param_cache.get('mtcaptcha', url)
+        if params:
+            # The sitekey is known, so the captcha is solved while the page loads
+            print("Sitekey taken from the cache")
+            solving = executor.submit(copy_context().run, solver_captcha, apikey, params['sitekey'], url)
+
+        with stage("navigate"):
+            browser.get(url)
         print("Started")
 
-        sitekey = get_sitekey(browser)
+        if not params:
+            sitekey = get_sitekey(browser)
+            if sitekey:
+                param_cache.set('mtcaptcha', url, {'sitekey': sitekey})
+            solving = executor.submit(copy_context().run, solver_captcha, apikey, sitekey, url)
 
-        token = solver_captcha(apikey, sitekey, url)
+        token = solving.result()
 
         if token:
-            send_token(browser, css_locator_for_input_send_token, token)
-            click_check_button(browser, submit_button_captcha_locator)
-            final_message(browser, success_message_locator)
+            try:
+                send_token_and_confirm(browser, css_locator_for_input_send_token, token,
+                                       submit_button_captcha_locator, success_message_locator)
+            except TimeoutException:
+                # The token was rejected, the sitekey is read again on the next run
+                param_cache.invalidate('mtcaptcha', url)
+                raise
             time.sleep(5)
             print("Finished")
         else:
+            param_cache.invalidate('mtcaptcha', url)
             print("Failed to solve captcha")
 
 
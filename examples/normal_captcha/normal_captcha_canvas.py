@@ -1,17 +1,38 @@
 import os
 import time
+import sys
+from pathlib import Path
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from twocaptcha import TwoCaptcha
+
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.answer_cache import AnswerCache, image_hash
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import demo_url
+from utilities.image_capture import capture_image
+from utilities.solver_client import get_solver
+from utilities.timing import stage, timed_job
+from utilities.waits import wait_for_element
 
 
 # CONFIGURATION
 
-url = "https://2captcha.com/demo/normal"
+url = demo_url("https://2captcha.com/demo/normal")
+
+# Captured image: format ("image/jpeg", "image/webp" or "image/png"), quality from 0 to 1,
+# maximum width and height in pixels (None to keep the displayed size) and grayscale conversion
+image_format = "image/jpeg"
+image_quality = 0.9
+image_max_size = None
+image_grayscale = False
 
 
 # LOCATORS
@@ -34,7 +55,7 @@ def get_element(browser, locator):
     Returns:
         WebElement: A web element that has become clickable
     """
-    return WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, locator)))
+    return wait_for_element(browser, locator)
 
 
 # ACTIONS
@@ -49,7 +70,7 @@ def solver_captcha(image, apikey):
     Returns:
         str: Captcha solution code, if successful, otherwise None
     """
-    solver = TwoCaptcha(apikey)
+    solver = get_solver(apikey)
     try:
         result = solver.normal(image)
         print(f"Captcha solved. Code: {result['code']}")
@@ -58,38 +79,37 @@ def solver_captcha(image, apikey):
         print(f"An error occurred: {e}")
         return None
 
-def get_image_canvas(browser, locator):
+@stage("capture")
+def get_image_canvas(browser, locator, image_format=image_format, quality=image_quality,
+                     max_size=image_max_size, grayscale=image_grayscale):
     """
     Gets the Base64 representation of an image displayed on a web page using canvas
 
+    The image is re-encoded in the page, so a smaller payload is transferred and uploaded.
+
     Args:
         browser (webdriver): The Selenium WebDriver instance.
         locator (str): CSS selector for locating an image on a page.
+        image_format (str): Format of the captured image.
+        quality (float): Quality from 0 to 1 for JPEG and WebP.
+        max_size (int): Maximum width and height of the captured image. None to keep the displayed size.
+        grayscale (bool): Convert the image to grayscale.
     Returns:
         str: Base64 image string
     """
 
     # Ensure the image element is present before executing JavaScript
-    WebDriverWait(browser, 30).until(
+    img_element = WebDriverWait(browser, 30).until(
         EC.presence_of_element_located((By.CSS_SELECTOR, locator))
     )
 
-    # JavaScript code to create a canvas, draw an image to the canvas and get its Base64 representation
-    canvas_script = """
-        function getBase64Image(imgElement) {
-            let canvas = document.createElement('canvas');
-            canvas.width = imgElement.width;
-            canvas.height = imgElement.height;
-            let ctx = canvas.getContext('2d');
-            ctx.drawImage(imgElement, 0, 0);
-            let base64Image = canvas.toDataURL();
-            return base64Image;
-        }
-        return getBase64Image(document.querySelector(arguments[0]));
-    """
-    base64_image = browser.execute_script(canvas_script, locator)
-    return base64_image
+    # The image is drawn to a canvas and encoded in the page, see utilities/image_capture.py
+    image = capture_image(browser, img_element, image_format, quality, max_size, grayscale)
+    print(f"Captcha image captured: {image.size / 1024:.1f} KB base64 "
+          f"({image_format}, {image.width}x{image.height}) in {image.elapsed * 1000:.0f} ms")
+    return image.data_url
 
+@stage("inject")
 def input_captcha_code(browser, locator, code):
     """
     Enters the captcha solution code into the input field on the web page
@@ -103,6 +123,7 @@ def input_captcha_code(browser, locator, code):
     input_field.send_keys(code)
     print("Entered the answer to the captcha")
 
+@stage("inject")
 def click_check_button(browser, locator):
     """
     Clicks the check button on a web page
@@ -115,6 +136,7 @@ def click_check_button(browser, locator):
     button.click()
     print("Pressed the Check button")
 
+@stage("confirm")
 def final_message(browser, locator):
     """
     Retrieves and prints the final success message.
@@ -127,6 +149,7 @@ def final_message(browser, locator):
     print(message)
 
 
+@timed_job("normal")
 def main():
     """
     Runs the demo flow for solving a normal image captcha using 2Captcha.
@@ -138,17 +161,29 @@ def main():
     if not apikey:
         raise RuntimeError("Set APIKEY_2CAPTCHA environment variable")
 
+    answer_cache = AnswerCache()
+
     # Automatically closes the browser after block execution completes
-    with webdriver.Chrome(service=Service(ChromeDriverManager().install())) as browser:
+    with webdriver.Chrome(service=Service(chromedriver_path())) as browser:
         # Go to page with captcha
-        browser.get(url)
+        with stage("navigate"):
+            browser.get(url)
         print("Started")
 
         # Getting captcha image in base64 format
+        captured_at = time.perf_counter()
         image_base64 = get_image_canvas(browser, img_locator)
 
-        # Solving captcha using 2Captcha
-        code = solver_captcha(image_base64, apikey)
+        # Answering a recycled captcha image from the cache, otherwise solving it
+        image_key = image_hash(image_base64)
+        code = answer_cache.get('normal', image_key)
+        if code:
+            print("Answer taken from the cache")
+        else:
+            code = solver_captcha(image_base64, apikey)
+            if code:
+                answer_cache.put('normal', image_key, code)
+        print(f"Capture to answer: {time.perf_counter() - captured_at:.1f}s")
 
         if code:
             # Entering captcha code
@@ -156,7 +191,12 @@ def main():
             # Pressing the test button
             click_check_button(browser, submit_button_captcha_locator)
             # Receiving and displaying a success message
-            final_message(browser, success_message_locator)
+            try:
+                final_message(browser, success_message_locator)
+            except TimeoutException:
+                # The answer was rejected, the image is solved again next time
+                answer_cache.invalidate('normal', image_key)
+                raise
 
             # Explicit pause to observe the result
             time.sleep(5)
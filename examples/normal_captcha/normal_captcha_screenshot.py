@@ -1,17 +1,27 @@
 import os
 import time
+import sys
+from pathlib import Path
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from twocaptcha import TwoCaptcha
+
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.answer_cache import AnswerCache, image_hash
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import demo_url
+from utilities.solver_client import get_solver
+from utilities.timing import stage, timed_job
+from utilities.waits import wait_for_element
 
 
 # CONFIGURATION
 
-url = "https://2captcha.com/demo/normal"
+url = demo_url("https://2captcha.com/demo/normal")
 
 
 # LOCATORS
@@ -30,7 +40,7 @@ def get_element(browser, locator):
 
     This helper can be copied and reused in other projects that use Selenium.
     """
-    return WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, locator)))
+    return wait_for_element(browser, locator)
 
 
 # ACTIONS
@@ -45,7 +55,7 @@ def solver_captcha(image, apikey):
     Returns:
         str: Captcha solution code, if successful, otherwise None
     """
-    solver = TwoCaptcha(apikey)
+    solver = get_solver(apikey)
     try:
         result = solver.normal(image)
         print(f"Captcha solved. Code: {result['code']}")
@@ -54,6 +64,7 @@ def solver_captcha(image, apikey):
         print(f"An error occurred: {e}")
         return None
 
+@stage("capture")
 def get_image_base64(browser, locator):
     """
     Captures a screenshot of the element specified by the locator and returns it as a base64-encoded string.
@@ -68,6 +79,7 @@ def get_image_base64(browser, locator):
     base64_image = image_element.screenshot_as_base64
     return base64_image
 
+@stage("inject")
 def input_captcha_code(browser, locator, code):
     """
     Enters the captcha solution code into the input field on the web page
@@ -80,6 +92,7 @@ def input_captcha_code(browser, locator, code):
     input_field.send_keys(code)
     print("Entered the answer to the captcha")
 
+@stage("inject")
 def click_check_button(browser, locator):
     """
     Clicks the check button on a web page
@@ -91,6 +104,7 @@ def click_check_button(browser, locator):
     button.click()
     print("Pressed the Check button")
 
+@stage("confirm")
 def final_message(browser, locator):
     """
     Retrieves and prints the final success message.
@@ -102,6 +116,7 @@ def final_message(browser, locator):
     print(message)
 
 
+@timed_job("normal")
 def main():
     """
     Runs the demo flow for solving a normal image captcha using 2Captcha.
@@ -113,17 +128,27 @@ def main():
     if not apikey:
         raise RuntimeError("Set APIKEY_2CAPTCHA environment variable")
 
+    answer_cache = AnswerCache()
+
     # Automatically closes the browser after block execution completes
-    with webdriver.Chrome(service=Service(ChromeDriverManager().install())) as browser:
+    with webdriver.Chrome(service=Service(chromedriver_path())) as browser:
         # Go to page with captcha
-        browser.get(url)
+        with stage("navigate"):
+            browser.get(url)
         print("Started")
 
         # Getting captcha image in base64 format
         image_base64 = get_image_base64(browser, img_locator)
 
-        # Solving captcha using 2Captcha
-        code = solver_captcha(image_base64, apikey)
+        # Answering a recycled captcha image from the cache, otherwise solving it
+        image_key = image_hash(image_base64)
+        code = answer_cache.get('normal', image_key)
+        if code:
+            print("Answer taken from the cache")
+        else:
+            code = solver_captcha(image_base64, apikey)
+            if code:
+                answer_cache.put('normal', image_key, code)
 
         if code:
             # Entering captcha code
@@ -131,7 +156,12 @@ def main():
             # Pressing the test button
             click_check_button(browser, submit_button_captcha_locator)
             # Receiving and displaying a success message
-            final_message(browser, success_message_locator)
+            try:
+                final_message(browser, success_message_locator)
+            except TimeoutException:
+                # The answer was rejected, the image is solved again next time
+                answer_cache.invalidate('normal', image_key)
+                raise
 
             # Explicit pause to observe the result
             time.sleep(5)
@@ -1,22 +1,41 @@
 import os
 import time
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from pathlib import Path
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from twocaptcha import TwoCaptcha
+
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import demo_url
+from utilities.http_sitekey import fetch_sitekey
+from utilities.light_profile import light_options
+from utilities.solver_client import get_solver
+from utilities.timing import stage, timed_job
+from utilities.token_apply import apply_token
+from utilities.waits import wait_for_element
 
 
 # CONFIGURATION
 
-url = "https://2captcha.com/demo/recaptcha-v2"
+url = demo_url("https://2captcha.com/demo/recaptcha-v2")
+
+# Set LIGHT_PROFILE=1 to run Chrome headless and block images, fonts and CSS outside the
+# captcha provider domains; the flow only needs the sitekey and the field for the token
+light_profile = os.getenv("LIGHT_PROFILE") == "1"
 
 
 # LOCATORS
 
 sitekey_locator = "//div[@id='g-recaptcha']"
+sitekey_element_id = "g-recaptcha"
+css_locator_for_input_send_token = '[id="g-recaptcha-response"]'
 submit_button_captcha_locator = "//button[@data-action='demo_action']"
 success_message_locator = "//p[contains(@class,'successMessage')]"
 
@@ -29,11 +48,12 @@ def get_element(browser, locator):
 
     This helper can be copied and reused in other projects that use Selenium.
     """
-    return WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, locator)))
+    return wait_for_element(browser, locator)
 
 
 # ACTIONS
 
+@stage("extract")
 def get_sitekey(browser, locator):
     """
     Extracts the sitekey from the specified element.
@@ -49,6 +69,22 @@ def get_sitekey(browser, locator):
     print(f"Sitekey received: {sitekey}")
     return sitekey
 
+@stage("extract")
+def get_sitekey_http(page_url, element_id):
+    """
+    Reads the sitekey from the HTML of the page over HTTP, without a browser.
+
+    Args:
+        page_url (str): The URL of the page.
+        element_id (str): The id of the element with the sitekey.
+    Returns:
+        str: The sitekey, or None if it is not in the HTML sent by the server.
+    """
+    sitekey = fetch_sitekey(page_url, element_id=element_id)
+    if sitekey:
+        print(f"Sitekey received over HTTP: {sitekey}")
+    return sitekey
+
 def solver_captcha(apikey, sitekey, url):
     """
     Solves the reCaptcha using the 2Captcha service.
@@ -60,7 +96,7 @@ def solver_captcha(apikey, sitekey, url):
     Returns:
         str: The solved captcha code.
     """
-    solver = TwoCaptcha(apikey)
+    solver = get_solver(apikey)
     try:
         result = solver.recaptcha(sitekey=sitekey, url=url)
         print(f"Captcha solved")
@@ -69,80 +105,66 @@ def solver_captcha(apikey, sitekey, url):
         print(f"An error occurred: {e}")
         return None
 
-def send_token(browser, captcha_token):
+def send_token_and_confirm(browser, css_locator, captcha_token, submit_locator, success_locator):
     """
-    Sends the captcha token to the reCaptcha response field.
+    Sends the captcha token to the reCaptcha response field, presses the Check button and
+    prints the success message, all in one call to the browser.
 
     Args:
         browser (webdriver): The Selenium WebDriver instance.
+        css_locator (str): The CSS locator for the input field.
         captcha_token (str): The solved captcha token.
-        """
-    script = f"""
-        document.querySelector('[id="g-recaptcha-response"]').innerText = '{captcha_token}';
-    """
-    browser.execute_script(script)
-    print("Token sent")
-
-def click_check_button(browser, locator):
+        submit_locator (str): The XPath locator of the check button.
+        success_locator (str): The XPath locator of the success message.
     """
-    Clicks the captcha check button.
-
-    Args:
-        browser (webdriver): The Selenium WebDriver instance.
-        locator (str): The XPath locator of the check button.
-    """
-    get_element(browser, locator).click()
-    print("Pressed the Check button")
-
-def final_message(browser, locator):
-    """
-    Retrieves and prints the final success message.
-
-    Args:
-        browser (webdriver): The Selenium WebDriver instance.
-        locator (str): The XPath locator of the success message.
-    """
-    message = get_element(browser, locator).text
+    message = apply_token(browser, captcha_token, success_locator, response_selector=css_locator,
+                          submit_locator=submit_locator)
+    print("Token sent and the Check button pressed")
     print(message)
 
+@timed_job("recaptcha-v2")
 def main():
     """
     Runs the full demo flow for solving reCaptcha v2 using 2Captcha.
 
-    The helper functions above (`get_sitekey`, `solver_captcha`, `send_token`, etc.)
+    The helper functions above (`get_sitekey`, `solver_captcha`, `send_token_and_confirm`, etc.)
     are designed so they can be copied and reused independently in other projects.
     """
     apikey = os.getenv("APIKEY_2CAPTCHA")
     if not apikey:
         raise RuntimeError("Set APIKEY_2CAPTCHA environment variable")
 
-    with webdriver.Chrome(service=Service(ChromeDriverManager().install())) as browser:
-        # Go to the specified URL
-        browser.get(url)
-        print('Started')
-
-        # Getting sitekey from the sitekey element
-        sitekey = get_sitekey(browser, sitekey_locator)
-
-        # Solving the captcha and receiving a token
-        token = solver_captcha(apikey, sitekey, url)
-
-        if token:
-            # Sending solved captcha token
-            send_token(browser, token)
-
-            # Pressing the Check button
-            click_check_button(browser, submit_button_captcha_locator)
-
-            # Receiving and displaying a success message
-            final_message(browser, success_message_locator)
-
-            # Explicit pause to observe the result before closing the browser
-            time.sleep(5)
-            print("Finished")
-        else:
-            print("Failed to solve captcha")
-
+    options = light_options("recaptcha") if light_profile else None
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # The sitekey is usually in the HTML of the page, so the captcha is solved while Chrome starts
+        sitekey = get_sitekey_http(url, sitekey_element_id)
+        solving = executor.submit(copy_context().run, solver_captcha, apikey, sitekey, url) if sitekey else None
+
+        with webdriver.Chrome(service=Service(chromedriver_path()), options=options) as browser:
+            # Go to the specified URL
+            with stage("navigate"):
+                browser.get(url)
+            print('Started')
+
+            if solving is None:
+                # Getting sitekey from the sitekey element, the page adds it with JavaScript
+                sitekey = get_sitekey(browser, sitekey_locator)
+                solving = executor.submit(copy_context().run, solver_captcha, apikey, sitekey, url)
+
+            # Receiving the token
+            token = solving.result()
+
+            if token:
+                # Sending solved captcha token, pressing the Check button and displaying a success message
+                send_token_and_confirm(browser, css_locator_for_input_send_token, token,
+                                       submit_button_captcha_locator, success_message_locator)
+
+                # Explicit pause to observe the result before closing the browser
+                time.sleep(5)
+                print("Finished")
+            else:
+                print("Failed to solve captcha")
 
 if __name__ == "__main__":
     main()
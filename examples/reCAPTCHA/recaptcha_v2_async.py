@@ -0,0 +1,111 @@
+import os
+import sys
+import asyncio
+from pathlib import Path
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.async_pipeline import checkout_session
+from utilities.batch_solver import BatchSolver
+from utilities.browser_pool import BrowserPool
+from utilities.chromedriver import chromedriver_path
+from utilities.metrics import serve_metrics
+from utilities.solver_client import get_solver
+from utilities.timing import timed_job
+from utilities.waits import wait_stats
+
+# Description:
+# Runs the reCAPTCHA V2 flow from recaptcha_v2.py in several browsers at once.
+# Browser actions are the helper functions of recaptcha_v2.py, run in a thread per browser,
+# while the captcha answers are polled by asyncio, so browsers and solves overlap.
+# The answers of all outstanding captchas are polled together in one request per interval.
+# The browsers are kept warm in a pool and reset between jobs instead of being restarted.
+
+from recaptcha_v2 import (url, sitekey_locator, css_locator_for_input_send_token, submit_button_captcha_locator,
+                          success_message_locator, get_sitekey, send_token_and_confirm)
+
+
+# CONFIGURATION
+
+browsers_count = 3
+jobs = [url] * 6
+
+
+# FLOW
+
+async def solve_page(session, solver, page_url):
+    """
+    Solves reCaptcha v2 on one page in the given browser session.
+
+    Args:
+        session (BrowserSession): The browser session to use.
+        solver (BatchSolver): The solver polling the answers in batches.
+        page_url (str): The URL of the page with the captcha.
+    """
+    await session.get(page_url)
+
+    sitekey = await session.run(get_sitekey, sitekey_locator)
+
+    # The browser thread is free while the answer is polled
+    result = await solver.solve_async('recaptcha', sitekey=sitekey, url=page_url)
+
+    await session.run(send_token_and_confirm, css_locator_for_input_send_token, result['code'],
+                      submit_button_captcha_locator, success_message_locator)
+
+
+async def run(apikey):
+    """
+    Starts the browser pool, solves all jobs and closes the browsers.
+    """
+    solver = BatchSolver(get_solver(apikey))
+
+    driver_path = chromedriver_path()
+    pool = BrowserPool(lambda: webdriver.Chrome(service=Service(driver_path)), size=browsers_count)
+    await asyncio.get_running_loop().run_in_executor(None, pool.warm)
+
+    async def run_job(page_url):
+        # Waits for a free browser; the pool size limits the number of concurrent jobs
+        async with checkout_session(pool) as session:
+            # Every task has its own job, the stages of concurrent jobs are kept apart
+            with timed_job("recaptcha-v2"):
+                await solve_page(session, solver, page_url)
+
+    try:
+        results = await asyncio.gather(*(run_job(page_url) for page_url in jobs), return_exceptions=True)
+    finally:
+        pool.close()
+        solver.close()
+
+    failed = [result for result in results if isinstance(result, Exception)]
+    print(f"Finished: {len(results) - len(failed)} solved, {len(failed)} failed")
+    for error in failed:
+        print(f"An error occurred: {error}")
+    print(f"Browser pool: {pool.metrics()}")
+    print(f"Batch solver: {solver.stats()}")
+    print(f"Element waits: {wait_stats()}")
+
+
+def main():
+    """
+    Runs the reCaptcha v2 demo flow in several browsers concurrently.
+    """
+    apikey = os.getenv("APIKEY_2CAPTCHA")
+    if not apikey:
+        raise RuntimeError("Set APIKEY_2CAPTCHA environment variable")
+
+    # Set METRICS_PORT to watch throughput, solve latency and pool usage while the jobs run
+    metrics_server = serve_metrics()
+    try:
+        asyncio.run(run(apikey))
+    finally:
+        if metrics_server:
+            metrics_server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,21 @@
 import os
 import time
+import sys
+from pathlib import Path
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from twocaptcha import TwoCaptcha
+
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import demo_url
+from utilities.solver_client import get_solver
+from utilities.timing import stage, timed_job
+from utilities.token_apply import apply_token
+from utilities.waits import wait_for_element
 
 # Description: 
 # The value of the `sitekey` parameter is extracted from the page code automaticly. 
@@ -16,9 +25,13 @@ from twocaptcha import TwoCaptcha
 
 # CONFIGURATION
 
-url = "https://2captcha.com/demo/recaptcha-v2-callback"
+url = demo_url("https://2captcha.com/demo/recaptcha-v2-callback")
 apikey = os.getenv('APIKEY_2CAPTCHA')
 
+# verifyDemoRecaptcha() it is JavaScript callback function on page with captcha.
+# callback function executing for apply token.
+callback_function = "verifyDemoRecaptcha"
+
 
 # LOCATORS
 
@@ -34,11 +47,12 @@ def get_element(browser, locator):
 
     This helper can be copied and reused in other projects that use Selenium.
     """
-    return WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, locator)))
+    return wait_for_element(browser, locator)
 
 
 # ACTIONS
 
+@stage("extract")
 def get_sitekey(browser, locator):
     """
     Extracts the sitekey from the specified element.
@@ -65,7 +79,7 @@ def solver_captcha(apikey, sitekey, url):
     Returns:
         str: The solved captcha code.
     """
-    solver = TwoCaptcha(apikey)
+    solver = get_solver(apikey)
     try:
         result = solver.recaptcha(sitekey=sitekey, url=url)
         print(f"Captcha solved")
@@ -74,38 +88,38 @@ def solver_captcha(apikey, sitekey, url):
         print(f"An error occurred: {e}")
         return None
 
-def send_token(browser, token):
-    # verifyDemoRecaptcha() it is JavaScript callback function on page with captcha.
-    # callback function executing for apply token.
-    script = f"verifyDemoRecaptcha('{token}');"
-    browser.execute_script(script)
-    print("The token is sent to the callback function")
-
-def final_message(browser, locator):
+def send_token_and_confirm(browser, callback_function, token, success_locator):
     """
-    Retrieves and prints the final success message.
+    Passes the token to the callback function of the page and prints the success message,
+    all in one call to the browser.
 
     Args:
-        locator (str): The XPath locator of the success message.
+        browser (webdriver): The Selenium WebDriver instance.
+        callback_function (str): The name of the callback function.
+        token (str): The solved captcha token.
+        success_locator (str): The XPath locator of the success message.
     """
-    message = get_element(browser, locator).text
+    message = apply_token(browser, token, success_locator, callback=callback_function)
+    print("The token is sent to the callback function")
     print(message)
 
 
+@timed_job("recaptcha-v2")
 def main():
     """
     Runs the demo flow for solving reCaptcha v2 with a callback using 2Captcha.
 
-    Helper functions (`get_sitekey`, `solver_captcha`, `send_token`, etc.)
+    Helper functions (`get_sitekey`, `solver_captcha`, `send_token_and_confirm`, etc.)
     are designed so they can be copied and reused independently.
     """
     apikey = os.getenv("APIKEY_2CAPTCHA")
     if not apikey:
         raise RuntimeError("Set APIKEY_2CAPTCHA environment variable")
 
-    with webdriver.Chrome(service=Service(ChromeDriverManager().install())) as browser:
+    with webdriver.Chrome(service=Service(chromedriver_path())) as browser:
         # Go to the specified URL
-        browser.get(url)
+        with stage("navigate"):
+            browser.get(url)
         print('Started')
 
         # Getting sitekey from the sitekey element
@@ -115,11 +129,8 @@ def main():
         token = solver_captcha(apikey, sitekey, url)
 
         if token:
-            # Sending solved captcha token to callback
-            send_token(browser, token)
-
-            # Receiving and displaying a success message
-            final_message(browser, success_message_locator)
+            # Sending solved captcha token to callback and displaying a success message
+            send_token_and_confirm(browser, callback_function, token, success_message_locator)
 
             # Explicit pause to observe the result
             time.sleep(5)
@@ -1,12 +1,26 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 import time
+import sys
+from pathlib import Path
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from twocaptcha import TwoCaptcha
+
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import demo_url
+from utilities.js_wait import wait_for_js
+from utilities.param_cache import ParamCache
+from utilities.solver_client import get_solver
+from utilities.timing import stage, timed_job
+from utilities.token_apply import apply_token
+from utilities.waits import wait_for_element
 
 # Description: 
 # Captcha parameters are determined automatically with the help of JavaScript script executed on the page.
@@ -14,7 +28,10 @@ from twocaptcha import TwoCaptcha
 
 # CONFIGURATION
 
-url = "https://2captcha.com/demo/recaptcha-v2-callback"
+url = demo_url("https://2captcha.com/demo/recaptcha-v2-callback")
+
+# Maximum time to wait for the captcha parameters, in seconds
+params_timeout = 10
 
 # JavaScript script to find reCAPTCHA clients and extract sitekey and callback function
 script = """
@@ -73,33 +90,35 @@ def get_element(browser, locator):
 
     This helper can be copied and reused in other projects that use Selenium.
     """
-    return WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, locator)))
+    return wait_for_element(browser, locator)
 
 
 # ACTIONS
 
-def get_captcha_params(browser, script):
+@stage("extract")
+def get_captcha_params(browser, script, timeout=params_timeout):
     """
     Executes the given JavaScript script to extract the captcha callback function name and sitekey.
 
+    The script is re-evaluated in the page until it finds the parameters, instead of retrying after fixed delays.
+
     Args:
         script (str): The JavaScript script to execute.
+        timeout (float): Maximum number of seconds to wait for the parameters.
     Returns:
-        tuple: A tuple containing the callback function name and the sitekey.
+        tuple: A tuple containing the callback function name and the sitekey,
+            or (None, None) if they were not found in time.
     """
-    retries = 0
-    while retries < 2:
-        try:
-            result = browser.execute_script(script)
-            if not result or not result[0]:
-                raise IndexError("Callback name is empty or null")
-            callback_function_name = result[0]['function']
-            sitekey = result[0]['sitekey']
-            print("Got the callback function name and site key")
-            return callback_function_name, sitekey
-        except (IndexError, KeyError, TypeError):
-            retries += 1
-            time.sleep(1)  # Wait a bit before retrying
+    result, elapsed = wait_for_js(browser, script, timeout)
+    try:
+        callback_function_name = result[0]['function']
+        sitekey = result[0]['sitekey']
+    except (IndexError, KeyError, TypeError):
+        print(f"Callback function name and site key not found after {elapsed:.2f}s")
+        return None, None
+
+    print(f"Got the callback function name and site key in {elapsed:.2f}s")
+    return callback_function_name, sitekey
 
 def solver_captcha(apikey, sitekey, url):
     """
@@ -112,7 +131,7 @@ def solver_captcha(apikey, sitekey, url):
     Returns:
         str: The solved captcha code.
     """
-    solver = TwoCaptcha(apikey)
+    solver = get_solver(apikey)
     try:
         result = solver.recaptcha(sitekey=sitekey, url=url)
         print(f"Captcha solved")
@@ -121,62 +140,78 @@ def solver_captcha(apikey, sitekey, url):
         print(f"An error occurred: {e}")
         return None
 
-def send_token_callback(browser, callback_function, token):
+def send_token_and_confirm(browser, callback_function, token, success_locator):
     """
-    Executes the callback function with the given token.
+    Passes the token to the callback function of the page and prints the success message,
+    all in one call to the browser.
 
     Args:
-        callback_function (str): The name of the callback function.
+        browser (webdriver): The Selenium WebDriver instance.
+        callback_function (str): The name or path of the callback function, e.g.
+            "___grecaptcha_cfg.clients['0']['X']['Y']['callback']".
         token (str): The solved captcha token.
+        success_locator (str): The XPath locator of the success message.
     """
-    script = f"{callback_function}('{token}')"
-    browser.execute_script(script)
+    message = apply_token(browser, token, success_locator, callback=callback_function)
     print("The token is sent to the callback function")
-
-def final_message(browser, locator):
-    """
-    Retrieves and prints the final success message.
-
-    Args:
-        locator (str): The XPath locator of the success message.
-    """
-    message = get_element(browser, locator).text
     print(message)
 
 
+@timed_job("recaptcha-v2")
 def main():
     """
     Runs the demo flow for solving reCaptcha v2 with a callback using
     automatic extraction of callback and sitekey.
 
-    Helper functions (`get_captcha_params`, `solver_captcha`, `send_token_callback`, etc.)
+    Helper functions (`get_captcha_params`, `solver_captcha`, `send_token_and_confirm`, etc.)
     are designed so they can be copied and reused independently.
+
+    The extracted parameters are cached per page. On the next run the captcha is sent
+    to 2Captcha right away and solved while the page loads.
     """
     apikey = os.getenv("APIKEY_2CAPTCHA")
     if not apikey:
         raise RuntimeError("Set APIKEY_2CAPTCHA environment variable")
 
-    with webdriver.Chrome(service=Service(ChromeDriverManager().install())) as browser:
-        browser.get(url)
+    param_cache = ParamCache()
+
+    with webdriver.Chrome(service=Service(chromedriver_path())) as browser, \
+            ThreadPoolExecutor(max_workers=1) as executor:
+        params = param_cache.get('recaptcha_v2_callback', url)
+        if params:
+            print("Got the callback function name and site key from the cache")
+            callback_function = params['callback']
+            solving = executor.submit(copy_context().run, solver_captcha, apikey, params['sitekey'], url)
+
+        with stage("navigate"):
+            browser.get(url)
         print("Started")
 
-        # Extracting callback function name and sitekey using the provided script
-        callback_function, sitekey = get_captcha_params(browser, script)
+        if not params:
+            # Extracting callback function name and sitekey using the provided script
+            callback_function, sitekey = get_captcha_params(browser, script)
+            if sitekey:
+                param_cache.set('recaptcha_v2_callback', url, {'sitekey': sitekey, 'callback': callback_function})
 
-        # Solving the captcha and receiving the token
-        token = solver_captcha(apikey, sitekey, url)
+            solving = executor.submit(copy_context().run, solver_captcha, apikey, sitekey, url)
 
-        if token:
-            # Sending the solved captcha token to the callback function
-            send_token_callback(browser, callback_function, token)
+        # Receiving the token
+        token = solving.result()
 
-            # Retrieving and printing the final success message
-            final_message(browser, success_message_locator)
+        if token:
+            # Sending the solved captcha token to the callback function and displaying a success message
+            try:
+                send_token_and_confirm(browser, callback_function, token, success_message_locator)
+            except TimeoutException:
+                # The token was rejected, the parameters are extracted again on the next run
+                param_cache.invalidate('recaptcha_v2_callback', url)
+                raise
 
             # Explicit pause to observe the result
             time.sleep(5)
             print("Finished")
         else:
+            param_cache.invalidate('recaptcha_v2_callback', url)
             print("Failed to solve captcha")
 
 
@@ -1,18 +1,27 @@
 import os
 import time
+import sys
+from pathlib import Path
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service
-from twocaptcha import TwoCaptcha
+
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import demo_url
 from utilities.proxy_extension import proxies
+from utilities.solver_client import get_solver
+from utilities.timing import stage, timed_job
+from utilities.token_apply import apply_token
+from utilities.waits import wait_for_element
 
 # CONFIGURATION
 
-url = "https://2captcha.com/demo/recaptcha-v2"
+url = demo_url("https://2captcha.com/demo/recaptcha-v2")
 proxy = {
     'type': 'HTTPS',
     'uri': 'username:password@ip:port',
@@ -22,6 +31,7 @@ proxy = {
 # LOCATORS
 
 sitekey_locator = "//div[@id='g-recaptcha']"
+css_locator_for_input_send_token = '[id="g-recaptcha-response"]'
 submit_button_captcha_locator = "//button[@data-action='demo_action']"
 success_message_locator = "//p[contains(@class,'successMessage')]"
 
@@ -34,7 +44,7 @@ def get_element(browser, locator):
 
     This helper can be copied and reused in other projects that use Selenium.
     """
-    return WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, locator)))
+    return wait_for_element(browser, locator)
 
 
 # ACTIONS
@@ -70,6 +80,7 @@ def setup_proxy(proxy):
     chrome_options.add_extension(proxies_extension)
     return chrome_options
 
+@stage("extract")
 def get_sitekey(browser, locator):
     """
     Extracts the sitekey from the specified element.
@@ -97,7 +108,7 @@ def solver_captcha(apikey, sitekey, url, proxy):
     Returns:
         str: The solved captcha code, or None if an error occurred.
     """
-    solver = TwoCaptcha(apikey)
+    solver = get_solver(apikey)
     try:
         result = solver.recaptcha(sitekey=sitekey, url=url, proxy=proxy)
         print(f"Captcha solved")
@@ -106,49 +117,31 @@ def solver_captcha(apikey, sitekey, url, proxy):
         print(f"An error occurred: {e}")
         return None
 
-def send_token(browser, captcha_token):
+def send_token_and_confirm(browser, css_locator, captcha_token, submit_locator, success_locator):
     """
-    Sends the captcha token to the reCaptcha response field.
+    Sends the captcha token to the reCaptcha response field, presses the Check button and
+    prints the success message, all in one call to the browser.
 
     Args:
         browser (webdriver): The Selenium WebDriver instance.
+        css_locator (str): The CSS locator for the input field.
         captcha_token (str): The solved captcha token.
-        """
-    script = f"""
-        document.querySelector('[id="g-recaptcha-response"]').innerText = '{captcha_token}';
-    """
-    browser.execute_script(script)
-    print("Token sent")
-
-def click_check_button(browser, locator):
-    """
-    Clicks the captcha check button.
-
-    Args:
-        browser (webdriver): The Selenium WebDriver instance.
-        locator (str): The XPath locator of the check button.
+        submit_locator (str): The XPath locator of the check button.
+        success_locator (str): The XPath locator of the success message.
     """
-    get_element(browser, locator).click()
-    print("Pressed the Check button")
-
-def final_message(browser, locator):
-    """
-    Retrieves and prints the final success message.
-
-    Args:
-        browser (webdriver): The Selenium WebDriver instance.
-        locator (str): The XPath locator of the success message.
-    """
-    message = get_element(browser, locator).text
+    message = apply_token(browser, captcha_token, success_locator, response_selector=css_locator,
+                          submit_locator=submit_locator)
+    print("Token sent and the Check button pressed")
     print(message)
 
 
+@timed_job("recaptcha-v2")
 def main():
     """
     Runs the full demo flow for solving reCaptcha v2 with a proxy using 2Captcha.
 
     Helper functions (`parse_proxy_uri`, `setup_proxy`, `get_sitekey`, `solver_captcha`,
-    `send_token`, etc.) are designed so they can be copied and reused independently.
+    `send_token_and_confirm`, etc.) are designed so they can be copied and reused independently.
     """
     apikey = os.getenv("APIKEY_2CAPTCHA")
     if not apikey:
@@ -157,9 +150,10 @@ def main():
     # Configure Chrome options with proxy settings
     chrome_options = setup_proxy(proxy)
 
-    with webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options) as browser:
+    with webdriver.Chrome(service=Service(chromedriver_path()), options=chrome_options) as browser:
         # Go to the specified URL
-        browser.get(url)
+        with stage("navigate"):
+            browser.get(url)
         print('Started')
 
         # Getting sitekey from the sitekey element
@@ -169,14 +163,9 @@ def main():
         token = solver_captcha(apikey, sitekey, url, proxy)
 
         if token:
-            # Sending solved captcha token
-            send_token(browser, token)
-
-            # Pressing the Check button
-            click_check_button(browser, submit_button_captcha_locator)
-
-            # Receiving and displaying a success message
-            final_message(browser, success_message_locator)
+            # Sending solved captcha token, pressing the Check button and displaying a success message
+            send_token_and_confirm(browser, css_locator_for_input_send_token, token,
+                                   submit_button_captcha_locator, success_message_locator)
 
             # Pause to observe the result before closing the browser
             time.sleep(5)
@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+from pathlib import Path
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.solver_client import get_solver
+from utilities.timing import stage, timed_job
+from utilities.token_pool import TokenPool
+
+# Description:
+# Runs the reCAPTCHA V2 flow from recaptcha_v2.py several times in a row, taking the tokens
+# from a pool of pre-solved tokens. After the first run the tokens are solved in the background
+# while the previous page is processed, so the token is usually ready when it is needed.
+# The same pool works for Cloudflare Turnstile ("turnstile") and MTCaptcha ("mtcaptcha").
+
+from recaptcha_v2 import (url, sitekey_locator, css_locator_for_input_send_token, submit_button_captcha_locator,
+                          success_message_locator, get_sitekey, send_token_and_confirm)
+
+
+# CONFIGURATION
+
+runs = 5
+
+
+def main():
+    """
+    Solves reCaptcha v2 on the demo page several times using pre-solved tokens.
+    """
+    apikey = os.getenv("APIKEY_2CAPTCHA")
+    if not apikey:
+        raise RuntimeError("Set APIKEY_2CAPTCHA environment variable")
+
+    pool = TokenPool(get_solver(apikey))
+
+    with webdriver.Chrome(service=Service(chromedriver_path())) as browser:
+        try:
+            for run in range(runs):
+                with timed_job("recaptcha-v2"):
+                    with stage("navigate"):
+                        browser.get(url)
+                    print(f"Started run {run + 1}")
+
+                    sitekey = get_sitekey(browser, sitekey_locator)
+
+                    # Takes a ready token, or waits for the one being solved
+                    started = time.monotonic()
+                    with stage("poll"):
+                        token = pool.get('recaptcha', sitekey, url)
+                    print(f"Token received from the pool in {time.monotonic() - started:.1f}s")
+
+                    send_token_and_confirm(browser, css_locator_for_input_send_token, token,
+                                           submit_button_captcha_locator, success_message_locator)
+        finally:
+            pool.close()
+
+    print("Finished")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,40 @@
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 import os
-import time
-from twocaptcha import TwoCaptcha
+import sys
+from pathlib import Path
 
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
 
-# CONFIGURATION
-
-url = "https://2captcha.com/demo/recaptcha-v3"
-apikey = os.getenv('APIKEY_2CAPTCHA')
-
-script = """
-function findRecaptchaData() {
-    const results = [];
-
-    // Collecting the text of all scripts on the page
-    const scriptContents = Array.from(document.scripts)
-        .map(script => script.innerHTML || '')
-        .join('\\n');
-
-    // Regular expressions to find sitekey and action
-    const sitekeyPattern = /['"]sitekey['"]\\s*:\\s*['"]([^'"]+)['"]/gi;
-    const actionPattern = /['"]action['"]\\s*:\\s*['"]([^'"]+)['"]/gi;
-    const executePattern = /grecaptcha\\.execute\\s*\\(\\s*['"]([^'"]+)['"]\\s*,\\s*\\{[^}]*?\\baction\\b\\s*:\\s*['"]([^'"]+)['"][^}]*?\\}/gi;
+from utilities.demo_server import demo_url
+from utilities.js_wait import wait_for_js
+from utilities.recaptcha_scanner import recaptcha_v3_scan_script
+from utilities.solver_client import get_solver
+from utilities.timing import stage, timed_job
+from utilities.token_apply import apply_token
+from utilities.waits import wait_for_element
 
-    let match;
 
-    // We are looking for sitekey and action in grecaptcha.execute
-    while ((match = executePattern.exec(scriptContents)) !== null) {
-        results.push({
-            sitekey: match[1],
-            action: match[2]
-        });
-    }
+# CONFIGURATION
 
-    // We are looking for sitekey and action in separate code blocks
-    const sitekeys = [];
-    while ((match = sitekeyPattern.exec(scriptContents)) !== null) {
-        sitekeys.push(match[1]);
-    }
+url = demo_url("https://2captcha.com/demo/recaptcha-v3")
+apikey = os.getenv('APIKEY_2CAPTCHA')
 
-    const actions = [];
-    while ((match = actionPattern.exec(scriptContents)) !== null) {
-        actions.push(match[1]);
-    }
+# Maximum time to wait for the captcha parameters, in seconds
+params_timeout = 10
 
-    // We connect the found sitekey and action
-    for (let i = 0; i < Math.min(sitekeys.length, actions.length); i++) {
-        results.push({
-            sitekey: sitekeys[i],
-            action: actions[i]
-        });
-    }
+# JavaScript function of the page that receives the reCaptcha token
+callback_function = "verifyRecaptcha"
 
-    return results;
-}
+# Maximum number of characters of inline script text scanned per check
+max_scan_bytes = 4 * 1024 * 1024
 
-return findRecaptchaData();
-"""
+# The scanner looks for grecaptcha.execute('<sitekey>', {action: '<action>'}) calls and for
+# separate "sitekey" and "action" entries, visiting inline scripts one by one and stopping at
+# the first match, see utilities/recaptcha_scanner.py
+script = recaptcha_v3_scan_script(max_scan_bytes)
 
 
 # LOCATORS
@@ -72,37 +47,35 @@ success_message_locator = "//p[contains(@class,'successMessage')]"
 
 def get_element(locator):
     """Waits for an element to be clickable and returns it"""
-    return WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, locator)))
+    return wait_for_element(browser, locator)
 
 
 # ACTIONS
 
-def get_captcha_params(script):
+@stage("extract")
+def get_captcha_params(script, timeout=params_timeout):
     """
     Executes the JavaScript to get reCaptcha parameters from the page.
 
+    The script is re-evaluated in the page until it finds the parameters, instead of retrying after fixed delays.
+
     Args:
         script (str): The JavaScript code to execute.
+        timeout (float): Maximum number of seconds to wait for the parameters.
 
     Returns:
-        tuple: The sitekey and action parameters.
+        tuple: The sitekey and action parameters, or (None, None) if they were not found in time.
     """
-    retries = 0
-    while retries < 2:
-        try:
-            result = browser.execute_script(script)
-            if not result or not result[0]:
-                raise IndexError("No reCaptcha parameters found")
-            sitekey = result[0]['sitekey']
-            action = result[0]['action']
-            print('Parameters sitekey and action received')
-            return sitekey, action
-        except (IndexError, KeyError, TypeError) as e:
-            retries += 1
-            time.sleep(1)  # Wait a bit before retrying
-
-    print('No reCaptcha parameters found after retries')
-    return None, None
+    result, elapsed = wait_for_js(browser, script, timeout)
+    try:
+        sitekey = result[0]['sitekey']
+        action = result[0]['action']
+    except (IndexError, KeyError, TypeError):
+        print(f'No reCaptcha parameters found after {elapsed:.2f}s')
+        return None, None
+
+    print(f'Parameters sitekey and action received in {elapsed:.2f}s')
+    return sitekey, action
 
 def solver_captcha(apikey, sitekey, url, action):
     """
@@ -115,7 +88,7 @@ def solver_captcha(apikey, sitekey, url, action):
     Returns:
         str: The solved captcha code.
     """
-    solver = TwoCaptcha(apikey)
+    solver = get_solver(apikey)
     try:
         result = solver.recaptcha(sitekey=sitekey, url=url, action=action, version='V3')
         print(f"Captcha solved")
@@ -124,42 +97,27 @@ def solver_captcha(apikey, sitekey, url, action):
         print(f"An error occurred: {e}")
         return None
 
-def send_token(token):
+def send_token_and_confirm(token, callback, submit_locator, success_locator):
     """
-    Sends the solved reCaptcha token to the page.
+    Passes the solved reCaptcha token to the callback of the page, presses the Check button
+    and prints the success message, all in one call to the browser.
 
     Args:
         token (str): The solved captcha token.
+        callback (str): The name of the callback function that receives the token.
+        submit_locator (str): The XPath locator of the check button.
+        success_locator (str): The XPath locator of the success message.
     """
-    script = f"window.verifyRecaptcha('{token}')"
-    browser.execute_script(script)
-    print('The token is sent')
-
-def click_check_button(locator):
-    """
-    Clicks the captcha check button.
-
-    Args:
-        locator (str): The XPath locator of the check button.
-    """
-    get_element(locator).click()
-    print("Pressed the Check button")
-
-def final_message(locator):
-    """
-    Retrieves and prints the final success message.
-
-    Args:
-        locator (str): The XPath locator of the success message.
-    """
-    message = get_element(locator).text
+    message = apply_token(browser, token, success_locator, callback=callback, submit_locator=submit_locator)
+    print("The token is sent and the Check button pressed")
     print(message)
 
 
 # MAIN LOGIC
 
-with webdriver.Chrome() as browser:
-    browser.get(url)
+with webdriver.Chrome() as browser, timed_job("recaptcha-v3"):
+    with stage("navigate"):
+        browser.get(url)
     print("Started")
 
     # Get captcha parameters
@@ -169,14 +127,8 @@ with webdriver.Chrome() as browser:
     token = solver_captcha(apikey, sitekey, url, action)
 
     if token:
-        # Send the token
-        send_token(token)
-
-        # Click the check button
-        click_check_button(submit_button_captcha_locator)
-
-        # Get the final success message
-        final_message(success_message_locator)
+        # Send the token, click the check button and get the final success message
+        send_token_and_confirm(token, callback_function, submit_button_captcha_locator, success_message_locator)
 
         browser.implicitly_wait(5)
         print("Finished")
@@ -1,20 +1,36 @@
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service
 import os
-import time
-from twocaptcha import TwoCaptcha
+import sys
+from pathlib import Path
+
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import demo_url
+from utilities.js_wait import wait_for_js
 from utilities.proxy_extension import proxies
+from utilities.solver_client import get_solver
+from utilities.timing import stage, timed_job
+from utilities.token_apply import apply_token
+from utilities.waits import wait_for_element
 
 
 # CONFIGURATION
 
-url = "https://2captcha.com/demo/recaptcha-v3"
+url = demo_url("https://2captcha.com/demo/recaptcha-v3")
 apikey = os.getenv('APIKEY_2CAPTCHA')
+
+# Maximum time to wait for the captcha parameters, in seconds
+params_timeout = 10
+
+# JavaScript function of the page that receives the reCaptcha token
+callback_function = "verifyRecaptcha"
+
 proxy = {'type': 'HTTPS',
          'uri': 'username:password@ip:port'}
 
@@ -55,7 +71,7 @@ success_message_locator = "//p[contains(@class,'successMessage')]"
 
 def get_element(locator):
     """Waits for an element to be clickable and returns it"""
-    return WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, locator)))
+    return wait_for_element(browser, locator)
 
 
 # ACTIONS
@@ -91,32 +107,30 @@ def setup_proxy(proxy):
     chrome_options.add_extension(proxies_extension)
     return chrome_options
 
-def get_captcha_params(script):
+@stage("extract")
+def get_captcha_params(script, timeout=params_timeout):
     """
     Executes the JavaScript to get reCaptcha parameters from the page.
 
+    The script is re-evaluated in the page until it finds the parameters, instead of retrying after fixed delays.
+
     Args:
         script (str): The JavaScript code to execute.
+        timeout (float): Maximum number of seconds to wait for the parameters.
 
     Returns:
-        tuple: The sitekey and action parameters.
+        tuple: The sitekey and action parameters, or (None, None) if they were not found in time.
     """
-    retries = 0
-    while retries < 2:
-        try:
-            result = browser.execute_script(script)
-            if not result or not result[0]:
-                raise IndexError("No reCaptcha parameters found")
-            sitekey = result[0]['sitekey']
-            action = result[0]['action']
-            print('Parameters sitekey and action received')
-            return sitekey, action
-        except (IndexError, KeyError, TypeError) as e:
-            retries += 1
-            time.sleep(1)  # Wait a bit before retrying
-
-    print('No reCaptcha parameters found after retries')
-    return None, None
+    result, elapsed = wait_for_js(browser, script, timeout)
+    try:
+        sitekey = result[0]['sitekey']
+        action = result[0]['action']
+    except (IndexError, KeyError, TypeError):
+        print(f'No reCaptcha parameters found after {elapsed:.2f}s')
+        return None, None
+
+    print(f'Parameters sitekey and action received in {elapsed:.2f}s')
+    return sitekey, action
 
 def solver_captcha(apikey, sitekey, url, action, proxy):
     """
@@ -129,7 +143,7 @@ def solver_captcha(apikey, sitekey, url, action, proxy):
     Returns:
         str: The solved captcha code.
     """
-    solver = TwoCaptcha(apikey)
+    solver = get_solver(apikey)
     try:
         result = solver.recaptcha(sitekey=sitekey, url=url, action=action, version='V3', proxy=proxy)
         print(f"Captcha solved")
@@ -138,35 +152,19 @@ def solver_captcha(apikey, sitekey, url, action, proxy):
         print(f"An error occurred: {e}")
         return None
 
-def send_token(token):
+def send_token_and_confirm(token, callback, submit_locator, success_locator):
     """
-    Sends the solved reCaptcha token to the page.
+    Passes the solved reCaptcha token to the callback of the page, presses the Check button
+    and prints the success message, all in one call to the browser.
 
     Args:
         token (str): The solved captcha token.
+        callback (str): The name of the callback function that receives the token.
+        submit_locator (str): The XPath locator of the check button.
+        success_locator (str): The XPath locator of the success message.
     """
-    script = f"window.verifyRecaptcha('{token}')"
-    browser.execute_script(script)
-    print('The token is sent')
-
-def click_check_button(locator):
-    """
-    Clicks the captcha check button.
-
-    Args:
-        locator (str): The XPath locator of the check button.
-    """
-    get_element(locator).click()
-    print("Pressed the Check button")
-
-def final_message(locator):
-    """
-    Retrieves and prints the final success message.
-
-    Args:
-        locator (str): The XPath locator of the success message.
-    """
-    message = get_element(locator).text
+    message = apply_token(browser, token, success_locator, callback=callback, submit_locator=submit_locator)
+    print("The token is sent and the Check button pressed")
     print(message)
 
 
@@ -174,8 +172,10 @@ def final_message(locator):
 
 chrome_options = setup_proxy(proxy)
 
-with webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options) as browser:
-    browser.get(url)
+with webdriver.Chrome(service=Service(chromedriver_path()), options=chrome_options) as browser, \
+        timed_job("recaptcha-v3"):
+    with stage("navigate"):
+        browser.get(url)
     print("Started")
 
     # Get captcha parameters
@@ -185,14 +185,8 @@ with webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=
     token = solver_captcha(apikey, sitekey, url, action, proxy)
 
     if token:
-        # Send the token
-        send_token(token)
-
-        # Click the check button
-        click_check_button(submit_button_captcha_locator)
-
-        # Get the final success message
-        final_message(success_message_locator)
+        # Send the token, click the check button and get the final success message
+        send_token_and_confirm(token, callback_function, submit_button_captcha_locator, success_message_locator)
 
         browser.implicitly_wait(5)
         print("Finished")
@@ -1,17 +1,25 @@
 import os
 import time
+import sys
+from pathlib import Path
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from twocaptcha import TwoCaptcha
+
+# Allow running this script from any working directory by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.chromedriver import chromedriver_path
+from utilities.demo_server import demo_url
+from utilities.solver_client import get_solver
+from utilities.timing import stage, timed_job
+from utilities.waits import wait_for_element
 
 
 # CONFIGURATION
 
-url = "https://2captcha.com/demo/text"
+url = demo_url("https://2captcha.com/demo/text")
 
 
 # LOCATORS
@@ -29,11 +37,12 @@ def get_element(browser, locator):
 
     This helper can be copied and reused in other projects that use Selenium.
     """
-    return WebDriverWait(browser, 30).until(EC.element_to_be_clickable((By.XPATH, locator)))
+    return wait_for_element(browser, locator)
 
 
 # ACTIONS
 
+@stage("extract")
 def get_captcha_question(browser, locator):
     """
     Extracts the captcha question text from the specified element.
@@ -58,7 +67,7 @@ def solver_captcha(question, apikey):
     Returns:
         str: Captcha solution code, if successful, otherwise None
     """
-    solver = TwoCaptcha(apikey)
+    solver = get_solver(apikey)
     try:
         result = solver.text(question)
         print(f"Captcha solved. Code: {result['code']}")
@@ -67,6 +76,7 @@ def solver_captcha(question, apikey):
         print(f"An error occurred: {e}")
         return None
 
+@stage("inject")
 def send_answer(browser, locator, answer):
     """
     Inputs the captcha answer into the specified input field.
@@ -80,6 +90,7 @@ def send_answer(browser, locator, answer):
     input_element.send_keys(answer)
     print("Entering the answer to captcha")
 
+@stage("inject")
 def click_check_button(browser, locator):
     """
     Clicks the check button on a web page
@@ -92,6 +103,7 @@ def click_check_button(browser, locator):
     button.click()
     print("Pressed the Check button")
 
+@stage("confirm")
 def final_message(browser, locator):
     """
     Retrieves and prints the final success message.
@@ -103,6 +115,7 @@ def final_message(browser, locator):
     print(message)
 
 
+@timed_job("text")
 def main():
     """
     Runs the demo flow for solving a text captcha using 2Captcha.
@@ -115,9 +128,10 @@ def main():
         raise RuntimeError("Set APIKEY_2CAPTCHA environment variable")
 
     # Automatically closes the browser after block execution completes
-    with webdriver.Chrome(service=Service(ChromeDriverManager().install())) as browser:
+    with webdriver.Chrome(service=Service(chromedriver_path())) as browser:
         # Go to page with captcha
-        browser.get(url)
+        with stage("navigate"):
+            browser.get(url)
         print("Started")
 
         # Get the text of the captcha question
@@ -0,0 +1,203 @@
+import json
+import os
+import heapq
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from utilities.files import atomic_write, file_lock, lock_path
+from utilities.image_preprocessing import decode_image
+
+
+# File with the cached answers, shared by all examples and processes
+CACHE_FILE = Path(os.getenv(
+    "ANSWER_CACHE_FILE",
+    Path.home() / ".cache" / "captcha-solver-selenium-examples" / "captcha_answers.json",
+))
+
+# Hashes that differ in at most this many of their 64 bits are considered the same image.
+# Exact matches only: on text and click captchas one changed glyph changes the answer, and
+# different demo captchas already came within 4 bits of each other.
+DEFAULT_THRESHOLD = 0
+
+
+def image_hash(image):
+    """
+    Returns the 64-bit difference hash (dHash) of an image.
+
+    The image is reduced to 9x8 grayscale pixels and every bit tells whether a pixel is
+    brighter than its right neighbour. Re-encoding, small scaling differences and noise
+    change only a few bits, so the same captcha captured twice gets a close hash.
+
+    Args:
+        image (str): Base64 image or data URL.
+    Returns:
+        int: The hash.
+    """
+    small = Image.fromarray(decode_image(image)).resize((9, 8), Image.BILINEAR)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+# int.bit_count is available from Python 3.10
+_popcount = getattr(int, "bit_count", lambda value: bin(value).count("1"))
+
+
+def hash_distance(first, second):
+    """Returns the number of bits in which two image hashes differ."""
+    return _popcount(first ^ second)
+
+
+class AnswerCache:
+    """
+    Caches captcha answers by a perceptual hash of the captcha image, persisted to a JSON file.
+
+    Some sites reuse a small set of captcha images. A captured image with the same hash as a
+    cached one is answered from the cache, without a solve. When the page rejects a cached
+    answer, call `invalidate` so the image is solved again next time. The least recently
+    used answers are dropped when there are more than `max_entries`.
+
+    A hash is not the image: two different captchas can get the same or a close hash, and
+    a cache hit then submits the answer of another image. With the default exact match
+    this is rare. A `threshold` above 0 also matches re-encoded or slightly scaled captures
+    of the same image, but makes false hits much more likely: a text or click captcha whose
+    one glyph changed can differ in only a few bits. Raise it only for sites whose images
+    are known to repeat, and keep `invalidate` on rejected answers in any case.
+
+    Example:
+        cache = AnswerCache()
+        key = image_hash(image)
+        code = cache.get('normal', key)
+        if code is None:
+            code = solver_captcha(image, apikey)
+            cache.put('normal', key, code)
+
+    Args:
+        path (Path): The JSON file with the cache. None to keep the cache in memory only.
+        max_entries (int): Maximum number of cached answers.
+        threshold (int): Maximum number of differing hash bits of the same image; 0 for exact matches.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_entries=1000, threshold=DEFAULT_THRESHOLD):
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        # (captcha type, hash) -> [answer, last used time]
+        self._entries = self._load()
+        # Hits since the last write, merged into the file on the next `put` or `invalidate`
+        self._used = {}
+
+    def get(self, captcha_type, key):
+        """
+        Returns the cached answer for the image.
+
+        Args:
+            captcha_type (str): Type of the captcha, e.g. "normal" or "coordinates".
+            key (int): Hash of the image from `image_hash`.
+        Returns:
+            str: The answer, or None if no close enough image is cached.
+        """
+        with self._lock:
+            match = self._find(captcha_type, key)
+            if match is None:
+                return None
+            entry = self._entries[match]
+            entry[1] = self._used[match] = time.time()
+            return entry[0]
+
+    def put(self, captcha_type, key, answer):
+        """
+        Stores the answer to the image.
+
+        Args:
+            captcha_type (str): Type of the captcha.
+            key (int): Hash of the image.
+            answer (str): The answer.
+        """
+        def update(entries):
+            entries[(captcha_type, key)] = [answer, time.time()]
+
+        self._update(update)
+
+    def invalidate(self, captcha_type, key):
+        """
+        Drops the cached answers of the image, e.g. after the page rejected one.
+
+        Args:
+            captcha_type (str): Type of the captcha.
+            key (int): Hash of the image.
+        """
+        def update(entries):
+            for entry in [entry for entry in entries if self._matches(entry, captcha_type, key)]:
+                del entries[entry]
+
+        self._update(update)
+
+    def _matches(self, entry, captcha_type, key):
+        return entry[0] == captcha_type and hash_distance(entry[1], key) <= self.threshold
+
+    def _find(self, captcha_type, key):
+        # Exact hashes are found without a scan; near ones by the Hamming distance
+        if (captcha_type, key) in self._entries:
+            return (captcha_type, key)
+        if self.threshold <= 0:
+            return None
+        best, best_distance = None, self.threshold + 1
+        for entry in self._entries:
+            if entry[0] == captcha_type:
+                distance = hash_distance(entry[1], key)
+                if distance < best_distance:
+                    best, best_distance = entry, distance
+        return best
+
+    def _load(self):
+        entries = {}
+        if self.path is None:
+            return entries
+        try:
+            with open(self.path, encoding="utf-8") as cache_file:
+                records = json.load(cache_file)
+            for record in records:
+                # Files written before the last used time was stored have three fields
+                captcha_type, key, answer = record[:3]
+                used = float(record[3]) if len(record) > 3 else 0.0
+                entries[(captcha_type, int(key, 16))] = [answer, used]
+        except (OSError, ValueError, TypeError):
+            pass
+        return entries
+
+    def _update(self, update):
+        with self._lock:
+            if self.path is None:
+                self._apply(update)
+                return
+            # The file lock keeps other processes from writing between the read and the rename
+            with file_lock(lock_path(self.path)):
+                # Re-read the file, so answers cached or invalidated by other processes are kept
+                self._entries = self._load()
+                self._apply(update)
+                self._save()
+
+    def _apply(self, update):
+        # Hits are only kept in memory until now; the file may have an older last used time
+        for entry, used in self._used.items():
+            if entry in self._entries:
+                self._entries[entry][1] = max(self._entries[entry][1], used)
+        self._used = {}
+        update(self._entries)
+        excess = len(self._entries) - self.max_entries
+        if excess > 0:
+            # Drops the least recently used answers
+            for entry in heapq.nsmallest(excess, self._entries, key=lambda entry: self._entries[entry][1]):
+                del self._entries[entry]
+
+    def _save(self):
+        records = [[captcha_type, f"{key:016x}", answer, round(used, 3)]
+                   for (captcha_type, key), (answer, used) in self._entries.items()]
+        with atomic_write(self.path) as cache_file:
+            json.dump(records, cache_file)
@@ -0,0 +1,155 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+
+from twocaptcha import NetworkException, TimeoutException
+
+from utilities.metrics import IN_FLIGHT, observe_solve
+from utilities.poll_schedule import captcha_type
+from utilities.solver_client import build_request
+from utilities.timing import stage
+
+
+class AsyncSolver:
+    """
+    Solves captchas from asyncio code without blocking the event loop.
+
+    Submitting a captcha and each poll for its answer are short HTTP requests; they run in
+    a small thread pool through the wrapped (pooled) solver. The time between polls is spent
+    in `asyncio.sleep`, so hundreds of outstanding solves do not hold any thread.
+
+    Args:
+        solver (TwoCaptcha): The solver used to talk to the API, e.g. `get_solver(apikey)`.
+        executor (Executor): Executor for the HTTP requests. A pool of 32 threads by default.
+        max_in_flight (int): Maximum number of captchas submitted and not yet answered.
+        polling_interval (float): Seconds between polls. By default the answers are polled on the
+            solver's `PollSchedule`, or at the solver's interval if it has none.
+    """
+
+    def __init__(self, solver, executor=None, max_in_flight=500, polling_interval=None):
+        self.solver = solver
+        self.executor = executor or ThreadPoolExecutor(max_workers=32, thread_name_prefix='solver')
+        self.polling_interval = polling_interval or solver.polling_interval
+        self.schedule = None if polling_interval else getattr(solver, 'schedule', None)
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+    def _submit(self, method, args, kwargs):
+        params, timeout = build_request(self.solver, method, *args, **kwargs)
+        type_ = captcha_type(params)
+        try:
+            captcha_id = self.solver.send(**params)
+        except Exception as e:
+            observe_solve(type_, 0.0, e)
+            raise
+        return captcha_id, timeout, type_
+
+    async def solve(self, method, *args, **kwargs):
+        """
+        Submits a captcha and waits for its answer.
+
+        Args:
+            method (str): Name of the `TwoCaptcha` method, e.g. "recaptcha" or "normal".
+            *args, **kwargs: Arguments of that method.
+        Returns:
+            dict: {'captchaId': ..., 'code': ...}, as returned by `TwoCaptcha` methods.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._in_flight:
+            # The executor threads do not see the job of this task, so the stages are timed here
+            with stage('submit'):
+                captcha_id, timeout, type_ = await loop.run_in_executor(
+                    self.executor, self._submit, method, args, kwargs)
+            started = loop.time()
+            IN_FLIGHT.inc(path='async')
+            try:
+                with stage('poll'):
+                    code = await self.wait_result(captcha_id, timeout, type_)
+            except Exception as e:
+                observe_solve(type_, loop.time() - started, e)
+                raise
+            finally:
+                IN_FLIGHT.dec(path='async')
+            observe_solve(type_, loop.time() - started)
+        return {'captchaId': captcha_id, 'code': code}
+
+    async def wait_result(self, captcha_id, timeout, type_=None):
+        """
+        Polls the answer of a submitted captcha until it is ready or `timeout` seconds pass.
+
+        With a schedule, the polls follow the schedule of the captcha type `type_` and the
+        solve time is recorded.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        missed_at = 0.0
+        use_schedule = self.schedule is not None and type_ is not None
+        delays = self.schedule.delays(type_) if use_schedule else None
+        while loop.time() - started < timeout:
+            delay = next(delays) if use_schedule else self.polling_interval
+            await asyncio.sleep(min(delay, max(0.0, timeout - (loop.time() - started))))
+            try:
+                code = await loop.run_in_executor(self.executor, self.solver.get_result, captcha_id)
+            except NetworkException:
+                # CAPCHA_NOT_READY
+                missed_at = loop.time() - started
+                continue
+            if use_schedule:
+                self.schedule.record(type_, (missed_at + loop.time() - started) / 2)
+            return code
+        raise TimeoutException(f'timeout {timeout} exceeded')
+
+
+class BrowserSession:
+    """
+    A WebDriver instance driven from asyncio code.
+
+    WebDriver calls block and a driver must not be used from two threads at once, so every
+    session owns a single worker thread that runs its calls one after another. Sessions are
+    taken from a `BrowserPool` with `checkout_session()`.
+    """
+
+    def __init__(self, browser):
+        self.browser = browser
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='browser')
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs one of the blocking helpers, called as `func(browser, *args, **kwargs)`.
+
+        Example:
+            sitekey = await session.run(get_sitekey, sitekey_locator)
+        """
+        loop = asyncio.get_running_loop()
+        # The helper runs in the context of the calling task, so its stages are timed in the task's job
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, partial(context.run, func, self.browser, *args, **kwargs))
+
+    async def get(self, url):
+        """Opens the URL in the session's browser, timed as the "navigate" stage of the current job."""
+        loop = asyncio.get_running_loop()
+        with stage('navigate'):
+            await loop.run_in_executor(self._executor, self.browser.get, url)
+
+
+@asynccontextmanager
+async def checkout_session(pool, timeout=None):
+    """
+    Takes a browser from a `BrowserPool` as a `BrowserSession` and returns it after the block.
+
+    Example:
+        async with checkout_session(pool) as session:
+            await session.get(url)
+    """
+    loop = asyncio.get_running_loop()
+    browser = await loop.run_in_executor(None, pool.acquire, timeout)
+    session = BrowserSession(browser)
+    healthy = False
+    try:
+        yield session
+        healthy = True
+    finally:
+        # Released from the session thread, after every call of the job has finished
+        await loop.run_in_executor(session._executor, partial(pool.release, browser, healthy=healthy))
+        session._executor.shutdown(wait=False)
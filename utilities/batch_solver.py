@@ -0,0 +1,326 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from twocaptcha import ApiException, NetworkException, TimeoutException
+
+from utilities.metrics import API_REQUESTS, IN_FLIGHT, observe_solve
+from utilities.poll_schedule import captcha_type
+from utilities.solver_client import build_request
+from utilities.timing import current_job, record
+
+# Maximum number of captcha ids in one res.php?action=get&ids= request
+MAX_BATCH_SIZE = 100
+
+
+class _Pending:
+    """A submitted captcha waiting for its answer."""
+
+    def __init__(self, future, type_, submitted, deadline, delays, job=None):
+        self.future = future
+        self.job = job
+        self.type = type_
+        self.submitted = submitted
+        self.deadline = deadline
+        self.delays = delays
+        self.next_poll = submitted + next(delays)
+        self.missed_at = submitted
+
+
+class BatchSolver:
+    """
+    Solves many captchas at once and polls their answers in grouped requests.
+
+    Every `TwoCaptcha` call polls res.php once per captcha id and interval, so 500 concurrent
+    solves send 500 polling requests per interval. The batch solver submits captchas from a
+    small thread pool and a single poller thread asks for the answers of up to `batch_size`
+    ids in one `res.php?action=get&ids=...` request. Each answer is delivered to the
+    `Future` of the caller that submitted the captcha.
+
+    Example:
+        batch = BatchSolver(get_solver(apikey))
+        futures = [batch.submit('recaptcha', sitekey=sitekey, url=url) for url in urls]
+        tokens = [future.result()['code'] for future in futures]
+        batch.close()
+
+    Args:
+        solver (TwoCaptcha): The solver used to talk to the API, e.g. `get_solver(apikey)`.
+        polling_interval (float): Seconds between polls of a captcha. By default the answers are polled
+            on the solver's `PollSchedule`, or at the solver's interval if it has none.
+        batch_size (int): Maximum number of ids per polling request.
+        submit_workers (int): Number of threads submitting captchas.
+    """
+
+    def __init__(self, solver, polling_interval=None, batch_size=MAX_BATCH_SIZE, submit_workers=16):
+        self.solver = solver
+        self.polling_interval = polling_interval or solver.polling_interval
+        self.schedule = None if polling_interval else getattr(solver, 'schedule', None)
+        # Polls due within this many seconds are sent together
+        self.coalesce_window = self.polling_interval if self.schedule is None else self.schedule.min_interval
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=submit_workers, thread_name_prefix='batch-submit')
+
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._closed = False
+
+        # Statistics
+        self._submitted = 0
+        self._solved = 0
+        self._failed = 0
+        self._poll_requests = 0
+
+        self._poller = threading.Thread(target=self._poll_loop, name='batch-poller', daemon=True)
+        self._poller.start()
+
+    def submit(self, method, *args, **kwargs):
+        """
+        Submits a captcha and returns at once.
+
+        Args:
+            method (str): Name of the `TwoCaptcha` method, e.g. "recaptcha" or "normal".
+            *args, **kwargs: Arguments of that method.
+        Returns:
+            Future: Resolves to {'captchaId': ..., 'code': ...}, as returned by `TwoCaptcha` methods.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The batch solver is closed")
+        future = Future()
+        # The submit runs in the timing job of the caller
+        context = contextvars.copy_context()
+        self._executor.submit(context.run, self._send, future, method, args, kwargs)
+        return future
+
+    def solve(self, method, *args, **kwargs):
+        """
+        Submits a captcha and blocks until its answer is ready, like the `TwoCaptcha` methods.
+        """
+        return self.submit(method, *args, **kwargs).result()
+
+    async def solve_async(self, method, *args, **kwargs):
+        """
+        Submits a captcha and waits for its answer without blocking the event loop.
+        """
+        return await asyncio.wrap_future(self.submit(method, *args, **kwargs))
+
+    def stats(self):
+        """
+        Returns counters of the batch solver.
+
+        Returns:
+            dict: Submitted, solved and failed captchas, captchas waiting for an answer and
+                the number of polling requests sent.
+        """
+        with self._condition:
+            return {
+                'submitted': self._submitted,
+                'solved': self._solved,
+                'failed': self._failed,
+                'pending': len(self._pending),
+                'poll_requests': self._poll_requests,
+            }
+
+    def close(self):
+        """
+        Stops polling. Captchas still waiting for an answer fail with RuntimeError.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._executor.shutdown(wait=True)
+        self._poller.join()
+
+        with self._condition:
+            pending, self._pending = self._pending, {}
+            self._failed += len(pending)
+        for item in pending.values():
+            error = RuntimeError("The batch solver was closed")
+            IN_FLIGHT.dec(path='batch')
+            observe_solve(item.type, time.monotonic() - item.submitted, error)
+            item.future.set_exception(error)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _send(self, future, method, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            return
+        type_ = None
+        try:
+            params, timeout = build_request(self.solver, method, *args, **kwargs)
+            type_ = captcha_type(params)
+            captcha_id = self.solver.send(**params)
+        except Exception as e:
+            with self._condition:
+                self._failed += 1
+            observe_solve(type_ or method, 0.0, e)
+            future.set_exception(e)
+            return
+
+        now = time.monotonic()
+        with self._condition:
+            self._pending[captcha_id] = _Pending(future, type_, now, now + timeout, self._delays(type_),
+                                                 current_job())
+            self._submitted += 1
+            self._condition.notify_all()
+        IN_FLIGHT.inc(path='batch')
+
+    def _delays(self, type_):
+        if self.schedule is not None:
+            return self.schedule.delays(type_)
+        return iter(lambda: self.polling_interval, None)
+
+    def _poll_loop(self):
+        while True:
+            with self._condition:
+                waited = self._wait_for_due_ids()
+                if waited is None:
+                    return
+            due, expired = waited
+
+            # Futures run their callbacks here, so they are resolved outside the lock
+            now = time.monotonic()
+            for captcha_id, item in expired:
+                error = TimeoutException(f'timeout exceeded for captcha {captcha_id}')
+                IN_FLIGHT.dec(path='batch')
+                observe_solve(item.type, now - item.submitted, error)
+                if not item.future.done():
+                    item.future.set_exception(error)
+
+            for start in range(0, len(due), self.batch_size):
+                batch = due[start:start + self.batch_size]
+                try:
+                    self._poll(batch)
+                except Exception as e:
+                    # The poller thread must survive, or no pending captcha would be polled again
+                    self._fail(batch, e)
+
+    def _wait_for_due_ids(self):
+        """
+        Waits until some ids are due for a poll or past their deadline. Holds the lock.
+
+        Returns:
+            tuple: The ids to poll and the (id, item) pairs that timed out, already removed
+            from the pending ones; their futures are left to the caller. None once closed.
+        """
+        while not self._closed:
+            now = time.monotonic()
+            expired = []
+            for captcha_id, item in list(self._pending.items()):
+                if now >= item.deadline:
+                    del self._pending[captcha_id]
+                    self._failed += 1
+                    expired.append((captcha_id, item))
+
+            due = []
+            next_poll = min((item.next_poll for item in self._pending.values()), default=None)
+            if next_poll is not None and next_poll <= now:
+                # Ids that would be due before the next poll join this one, so captchas submitted
+                # at different times share the same requests instead of each starting its own
+                horizon = now + self.coalesce_window
+                due = [captcha_id for captcha_id, item in self._pending.items() if item.next_poll <= horizon]
+            if due or expired:
+                return due, expired
+
+            self._condition.wait(None if next_poll is None else next_poll - now)
+        return None
+
+    def _poll(self, ids):
+        try:
+            answers = self._get_answers(ids)
+        except (NetworkException, ApiException, requests.RequestException):
+            # Transient failure of the whole request: the ids are polled again next interval
+            answers = ['CAPCHA_NOT_READY'] * len(ids)
+        except Exception as e:
+            # Unexpected response: the captchas fail now instead of at their timeout
+            self._fail(ids, e)
+            return
+
+        polled_at = time.monotonic()
+        resolved, solve_times, poll_times = [], [], []
+        with self._condition:
+            for captcha_id, answer in zip(ids, answers):
+                item = self._pending.get(captcha_id)
+                if item is None:
+                    continue
+                if answer == 'CAPCHA_NOT_READY':
+                    item.missed_at = polled_at
+                    item.next_poll = polled_at + next(item.delays)
+                    continue
+                del self._pending[captcha_id]
+                if answer.startswith('ERROR'):
+                    self._failed += 1
+                else:
+                    self._solved += 1
+                    solve_times.append((item.type, (item.missed_at + polled_at) / 2 - item.submitted))
+                resolved.append((item, captcha_id, answer))
+                if item.job is not None:
+                    poll_times.append((item.job, polled_at - item.submitted, not answer.startswith('ERROR')))
+
+        if self.schedule is not None:
+            for type_, seconds in solve_times:
+                self.schedule.record(type_, seconds)
+        for job, seconds, ok in poll_times:
+            record('poll', seconds, job, ok)
+
+        # Futures run their callbacks here, so they are resolved outside the lock
+        for item, captcha_id, answer in resolved:
+            IN_FLIGHT.dec(path='batch')
+            if answer.startswith('ERROR'):
+                error = ApiException(answer)
+                observe_solve(item.type, polled_at - item.submitted, error)
+                item.future.set_exception(error)
+            else:
+                observe_solve(item.type, polled_at - item.submitted)
+                item.future.set_result({'captchaId': captcha_id, 'code': answer})
+
+    def _fail(self, ids, error):
+        """Fails the captchas of `ids` that are still pending with `error`."""
+        now = time.monotonic()
+        with self._condition:
+            failed = [self._pending.pop(captcha_id) for captcha_id in ids if captcha_id in self._pending]
+            self._failed += len(failed)
+        for item in failed:
+            IN_FLIGHT.dec(path='batch')
+            observe_solve(item.type, now - item.submitted, error)
+            if not item.future.done():
+                item.future.set_exception(error)
+
+    def _get_answers(self, ids):
+        """
+        Fetches the answers of `ids` in one request.
+
+        Returns:
+            list: One entry per id: the answer, "CAPCHA_NOT_READY" or an "ERROR_..." code.
+        """
+        client = self.solver.api_client
+        session = getattr(client, 'session', requests)
+        base_url = getattr(client, 'base_url', 'https://' + client.post_url)
+        params = {'key': self.solver.API_KEY, 'action': 'get', 'ids': ','.join(ids)}
+
+        with self._condition:
+            self._poll_requests += 1
+        API_REQUESTS.inc(endpoint='res.php')
+        # The response lists answers and error codes together, so res() of the client,
+        # which raises on any "ERROR" in the response, is not used
+        resp = session.get(base_url + '/res.php', params=params, timeout=getattr(client, 'timeout', 30))
+        if resp.status_code != 200:
+            raise NetworkException(f'bad response: {resp.status_code}')
+
+        text = resp.content.decode('utf-8')
+        answers = text.split('|')
+        if len(answers) == len(ids) + 1 and answers[0] == 'OK':
+            answers = answers[1:]
+        if len(answers) == len(ids):
+            return answers
+        if text.startswith('ERROR'):
+            # An error of the whole request, e.g. a wrong API key
+            return [text] * len(ids)
+        raise ApiException(f'cannot recognize response {text}')
@@ -0,0 +1,325 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from utilities.metrics import BROWSER_CHECKOUT_WAIT, BROWSER_CHECKOUTS, BROWSERS_IN_USE, BROWSERS_REPLACED
+
+
+# Origins of a tab: the page and every resource it loaded, including the captcha iframes
+_ORIGINS_SCRIPT = """
+const origins = new Set([location.origin]);
+for (const entry of performance.getEntriesByType('resource')) {
+    try { origins.add(new URL(entry.name).origin); } catch (e) {}
+}
+return Array.from(origins);
+"""
+
+class _PooledBrowser:
+    """A browser owned by the pool and its bookkeeping."""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.uses = 0
+        self.checked_at = time.monotonic()
+
+
+class BrowserPool:
+    """
+    Keeps warm browser sessions and hands them out to the example flows.
+
+    Starting Chrome takes seconds and hundreds of MB, so instead of starting a browser for
+    every job the pool keeps `size` browsers running. Between jobs a browser is reset:
+    extra tabs are closed, cookies, the HTTP cache and all storage (local and session
+    storage, IndexedDB, cache storage, service workers) of the visited origins are cleared
+    and the browser is parked on about:blank. The visited origins are those of the open
+    tabs, of the resources they loaded and of the cookies. Browsers that fail a reset or a
+    health check are replaced with new ones.
+
+    Example:
+        pool = BrowserPool(lambda: webdriver.Chrome(service=Service(driver_path)), size=4)
+        with pool.checkout() as browser:
+            browser.get(url)
+            ...
+        print(pool.metrics())
+
+    Args:
+        factory (callable): Starts a new browser, e.g. `lambda: webdriver.Chrome(...)`.
+        size (int): Number of browsers kept in the pool.
+        health_check_interval (float): Seconds after which an idle browser is checked again before use.
+        max_uses (int): Restart a browser after that many jobs. None to never restart.
+    """
+
+    def __init__(self, factory, size=4, health_check_interval=60, max_uses=None):
+        self.factory = factory
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.max_uses = max_uses
+
+        self._idle = deque()
+        self._items_by_browser = {}
+        self._condition = threading.Condition()
+        self._in_use = 0
+        self._starting = 0
+        self._closed = False
+
+        # Metrics
+        self._created_at = time.monotonic()
+        self._busy_seconds = 0.0
+        self._busy_since = self._created_at
+        self._wait_times = deque(maxlen=1000)
+        self._checkouts = 0
+        self._replaced = 0
+
+    def warm(self):
+        """
+        Starts all missing browsers in parallel, so the first jobs do not wait for Chrome to start.
+        """
+        with self._condition:
+            missing = max(self.size - len(self._idle) - self._in_use - self._starting, 0)
+            self._starting += missing
+        if missing <= 0:
+            return
+        with ThreadPoolExecutor(max_workers=missing) as executor:
+            for _ in range(missing):
+                executor.submit(self._start_idle)
+
+    def acquire(self, timeout=None):
+        """
+        Takes a healthy browser from the pool, waiting for a free one if all are busy.
+
+        Args:
+            timeout (float): Maximum number of seconds to wait. None to wait forever.
+        Returns:
+            WebDriver: The browser. Return it with `release()`.
+        """
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        start_new = False
+
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Browser pool is closed")
+                if self._idle:
+                    item = self._idle.popleft()
+                    break
+                if len(self._idle) + self._in_use + self._starting < self.size:
+                    self._starting += 1
+                    start_new = True
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No browser became free within {timeout}s")
+                self._condition.wait(remaining)
+
+        try:
+            if start_new:
+                item = self._start()
+            elif not self._is_fresh(item) and not self._is_healthy(item):
+                item = self._replace(item)
+        except Exception:
+            # The slot is free again, another caller may retry starting a browser
+            with self._condition:
+                if start_new:
+                    self._starting -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            if start_new:
+                self._starting -= 1
+            self._update_busy()
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_times.append(time.monotonic() - started)
+            self._items_by_browser[id(item.browser)] = item
+        item.uses += 1
+        BROWSERS_IN_USE.inc()
+        BROWSER_CHECKOUTS.inc()
+        BROWSER_CHECKOUT_WAIT.observe(time.monotonic() - started)
+        return item.browser
+
+    def release(self, browser, healthy=True):
+        """
+        Resets the browser and returns it to the pool.
+
+        Args:
+            browser (WebDriver): A browser taken with `acquire()`.
+            healthy (bool): False if the job failed in a way that may have broken the browser;
+                the browser is then replaced instead of reused.
+        """
+        with self._condition:
+            item = self._items_by_browser.pop(id(browser))
+        BROWSERS_IN_USE.dec()
+        if not healthy or (self.max_uses and item.uses >= self.max_uses) or not self._reset(item):
+            try:
+                item = self._replace(item)
+            except Exception:
+                with self._condition:
+                    self._update_busy()
+                    self._in_use -= 1
+                    self._condition.notify()
+                raise
+
+        with self._condition:
+            self._update_busy()
+            self._in_use -= 1
+            if self._closed:
+                self._quit(item)
+            else:
+                self._idle.append(item)
+            self._condition.notify()
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """
+        Context manager that takes a browser from the pool and returns it after the block.
+
+        If the block raises, the browser is replaced, since its state is unknown.
+        """
+        browser = self.acquire(timeout)
+        healthy = False
+        try:
+            yield browser
+            healthy = True
+        finally:
+            self.release(browser, healthy=healthy)
+
+    def metrics(self):
+        """
+        Returns pool metrics.
+
+        Returns:
+            dict: `size`, `in_use`, `idle`, `checkouts`, `replaced`, `utilisation` (share of the
+            pool's browser time spent on jobs since the pool was created) and checkout wait time
+            percentiles in seconds (`wait_p50`, `wait_p95`, `wait_max`) over the last 1000 checkouts.
+        """
+        with self._condition:
+            self._update_busy()
+            elapsed = max(time.monotonic() - self._created_at, 1e-9)
+            waits = sorted(self._wait_times)
+            return {
+                'size': self.size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self._checkouts,
+                'replaced': self._replaced,
+                'utilisation': self._busy_seconds / (self.size * elapsed),
+                'wait_p50': _percentile(waits, 50),
+                'wait_p95': _percentile(waits, 95),
+                'wait_max': waits[-1] if waits else 0.0,
+            }
+
+    def close(self):
+        """Quits all idle browsers. Browsers in use are quit when they are released."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._condition.notify_all()
+        for item in idle:
+            self._quit(item)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Internals
+
+    def _start(self):
+        return _PooledBrowser(self.factory())
+
+    def _start_idle(self):
+        # The slot was reserved in `_starting` by the caller. It is handed over to the idle
+        # browser in the same locked block, so the pool never counts a browser twice or not at all.
+        try:
+            item = self._start()
+        except Exception:
+            with self._condition:
+                self._starting -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._starting -= 1
+            if self._closed:
+                self._quit(item)
+            else:
+                self._idle.append(item)
+            self._condition.notify()
+
+    def _replace(self, item):
+        self._quit(item)
+        with self._condition:
+            self._replaced += 1
+        BROWSERS_REPLACED.inc()
+        return self._start()
+
+    def _is_fresh(self, item):
+        return time.monotonic() - item.checked_at < self.health_check_interval
+
+    def _is_healthy(self, item):
+        try:
+            item.browser.execute_script("return 1")
+            item.checked_at = time.monotonic()
+            return True
+        except Exception:
+            return False
+
+    def _reset(self, item):
+        browser = item.browser
+        try:
+            # Collect the origins of every tab, then close every tab except the first one
+            handles = browser.window_handles
+            origins = set()
+            for handle in reversed(handles):
+                browser.switch_to.window(handle)
+                origins.update(browser.execute_script(_ORIGINS_SCRIPT) or [])
+                if handle != handles[0]:
+                    browser.close()
+
+            if hasattr(browser, 'execute_cdp_cmd'):
+                # Pages visited before the last one are known by their cookies
+                for cookie in browser.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', []):
+                    domain = cookie['domain'].lstrip('.')
+                    origins.update((f"https://{domain}", f"http://{domain}"))
+                for origin in sorted(origins):
+                    if origin.startswith(('http://', 'https://')):
+                        browser.execute_cdp_cmd('Storage.clearDataForOrigin',
+                                                {'origin': origin, 'storageTypes': 'all'})
+                browser.execute_cdp_cmd('Network.clearBrowserCookies', {})
+                browser.execute_cdp_cmd('Network.clearBrowserCache', {})
+            else:
+                # Without CDP only the storage of the last page can be cleared
+                browser.execute_script("""
+                    try { window.localStorage.clear(); } catch (e) {}
+                    try { window.sessionStorage.clear(); } catch (e) {}
+                """)
+                browser.delete_all_cookies()
+
+            browser.get('about:blank')
+            item.checked_at = time.monotonic()
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, item):
+        try:
+            item.browser.quit()
+        except Exception:
+            pass
+
+    def _update_busy(self):
+        # Integrates the number of busy browsers over time; called with the lock held
+        now = time.monotonic()
+        self._busy_seconds += self._in_use * (now - self._busy_since)
+        self._busy_since = now
+
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
@@ -0,0 +1,78 @@
+import os
+import shutil
+import sys
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from webdriver_manager.chrome import ChromeDriverManager
+from webdriver_manager.core.os_manager import ChromeType, OperationSystemManager
+
+from utilities.files import file_lock
+
+
+# Directory with one cached chromedriver per Chrome major version: <CACHE_DIR>/<major>/chromedriver
+CACHE_DIR = Path(os.getenv(
+    "CHROMEDRIVER_CACHE_DIR",
+    Path.home() / ".cache" / "captcha-solver-selenium-examples" / "chromedriver",
+))
+
+DRIVER_NAME = "chromedriver.exe" if sys.platform == "win32" else "chromedriver"
+
+
+@lru_cache(maxsize=None)
+def chrome_major_version(chrome_type=ChromeType.GOOGLE):
+    """
+    Returns the major version of the installed Chrome, read from the local installation.
+
+    Returns:
+        str: The major version (e.g. "126"), or None if Chrome was not found.
+    """
+    version = OperationSystemManager().get_browser_version_from_os(chrome_type)
+    return version.split(".")[0] if version else None
+
+
+def chromedriver_path(cache_dir=CACHE_DIR):
+    """
+    Returns the path to a chromedriver matching the installed Chrome.
+
+    Replaces `ChromeDriverManager().install()`, which looks up the driver version online on
+    every start. Drivers are cached per Chrome major version; when the cached driver exists
+    it is returned without any network I/O. Only the first start after a Chrome major update
+    downloads a driver (with webdriver-manager). The download is guarded by a lock file, so
+    many processes can start at once and only one of them downloads.
+
+    Args:
+        cache_dir (Path): The driver cache directory.
+    Returns:
+        str: Path to the chromedriver executable.
+    """
+    major = chrome_major_version()
+    if major is None:
+        # Chrome version unknown: let webdriver-manager resolve the driver
+        return ChromeDriverManager().install()
+
+    driver = Path(cache_dir) / major / DRIVER_NAME
+    if driver.is_file():
+        return str(driver)
+
+    driver.parent.mkdir(parents=True, exist_ok=True)
+    with file_lock(driver.parent / ".lock"):
+        # Another process may have finished the download while we waited for the lock
+        if driver.is_file():
+            return str(driver)
+
+        downloaded = ChromeDriverManager().install()
+
+        # Copy next to the target and rename, so the driver never appears half-written
+        fd, tmp_path = tempfile.mkstemp(dir=driver.parent, prefix=".chromedriver-")
+        os.close(fd)
+        try:
+            shutil.copy2(downloaded, tmp_path)
+            os.chmod(tmp_path, 0o755)
+            os.replace(tmp_path, driver)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    return str(driver)
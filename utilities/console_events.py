@@ -0,0 +1,73 @@
+import threading
+
+from selenium.webdriver.common.bidi.session import session_subscribe, session_unsubscribe
+
+
+class _LogEntryAdded:
+    """
+    The WebDriver BiDi `log.entryAdded` event, passed through as the raw event parameters.
+    """
+    event_class = "log.entryAdded"
+
+    @classmethod
+    def from_json(cls, json):
+        return json
+
+
+class ConsoleMessageWaiter:
+    """
+    Waits for a console message from the page, delivered by a WebDriver BiDi event.
+
+    Instead of sleeping and then reading the whole `browser.get_log("browser")` buffer, the
+    waiter subscribes to console events and wakes up as soon as a message containing `marker`
+    is logged. The browser must be started with BiDi enabled (`options.web_socket_url = True`).
+
+    Subscribe before triggering the page action, so the message cannot be missed:
+
+        with ConsoleMessageWaiter(browser, "intercepted-params:") as waiter:
+            browser.refresh()
+            message = waiter.wait(timeout=10)
+
+    Args:
+        browser (webdriver): The Selenium WebDriver instance.
+        marker (str): Text the wanted console message contains.
+    """
+
+    def __init__(self, browser, marker):
+        self.browser = browser
+        self.marker = marker
+        self.message = None
+        self._received = threading.Event()
+        self._connection = None
+        self._callback_id = None
+
+    def __enter__(self):
+        # The BiDi connection is opened by the driver on first use of `browser.script`
+        self._connection = self.browser.script.conn
+        self._callback_id = self._connection.add_callback(_LogEntryAdded, self._on_log_entry)
+        self._connection.execute(session_subscribe(_LogEntryAdded.event_class))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._connection.remove_callback(_LogEntryAdded, self._callback_id)
+        if not self._connection.callbacks.get(_LogEntryAdded.event_class):
+            self._connection.execute(session_unsubscribe(_LogEntryAdded.event_class))
+
+    def _on_log_entry(self, entry):
+        # Called from the websocket thread for every log entry of the page
+        text = entry.get("text") or ""
+        if entry.get("type") == "console" and self.marker in text and not self._received.is_set():
+            self.message = text[text.index(self.marker):]
+            self._received.set()
+
+    def wait(self, timeout):
+        """
+        Waits until the message is logged.
+
+        Args:
+            timeout (float): Maximum number of seconds to wait.
+        Returns:
+            str: The message, starting at `marker`, or None if it was not logged in time.
+        """
+        self._received.wait(timeout)
+        return self.message
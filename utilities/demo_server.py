@@ -0,0 +1,464 @@
+"""
+A local copy of the 2captcha.com/demo pages used by the examples.
+
+The pages have the same locators, sitekey attributes, `___grecaptcha_cfg` clients, Turnstile
+render calls, MTCaptcha configuration, captcha images and success messages as the demo pages,
+so the browser flows of the examples run against them without the internet. Submitted
+answers are checked by the server: any non-empty token or answer passes.
+
+    python utilities/demo_server.py --port 8081
+    DEMO_BASE_URL=http://127.0.0.1:8081/demo python examples/reCAPTCHA/recaptcha_v2.py
+
+Combine it with the mock API (`SERVER_2CAPTCHA`) to load-test the flows completely offline.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from PIL import Image, ImageDraw, ImageFont
+
+
+# URL prefix of the demo pages in the examples
+DEMO_URL = "https://2captcha.com/demo"
+
+# Set to e.g. "http://127.0.0.1:8081/demo" to open the demo pages on a local demo server
+DEMO_BASE_URL = os.getenv("DEMO_BASE_URL")
+
+DEFAULT_SITEKEYS = {
+    "recaptcha-v2": "6LfD3PIbAAAAAJs_eEHvoOl75_83eXSqpPSRFJ_u",
+    "recaptcha-v3": "6LfB5_IbAAAAAMCtsjEHEHKqcB9iQocwwxTiihJu",
+    "turnstile": "0x4AAAAAAAVrOwQWPlm3Bnr5",
+    "mtcaptcha": "MTPublic-KzqLY1cKH",
+}
+
+SUCCESS_MESSAGE = "Captcha is passed successfully!"
+ERROR_MESSAGE = "Captcha is not passed"
+
+TEXT_QUESTION = "If tomorrow is Saturday, what day is today?"
+
+
+def demo_url(url):
+    """
+    Returns the URL of a demo page on the demo server set by `DEMO_BASE_URL`.
+
+    Args:
+        url (str): URL of a 2captcha.com demo page, e.g. "https://2captcha.com/demo/normal".
+    Returns:
+        str: The same page under `DEMO_BASE_URL`, or `url` unchanged when it is not set.
+    """
+    if DEMO_BASE_URL and url.startswith(DEMO_URL):
+        return DEMO_BASE_URL.rstrip("/") + url[len(DEMO_URL):]
+    return url
+
+
+# Shared by all pages: sends the answer to the server and shows the result like the demo pages
+COMMON_SCRIPT = """
+function showResult(success) {
+    const message = document.createElement('p');
+    message.className = success ? '_successMessage_1ndnh_1' : '_errorMessage_1ndnh_1';
+    message.textContent = success ? %(success)s : %(error)s;
+    document.getElementById('result').replaceChildren(message);
+}
+function verify(answer) {
+    return fetch('%(base)s/api/verify', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({page: document.body.dataset.page, answer: answer || ''}),
+    }).then((response) => response.json()).then((result) => showResult(result.success));
+}
+function loadScript(src) {
+    // Widget scripts are loaded after a delay, like the third-party scripts of the demo pages
+    setTimeout(() => {
+        const script = document.createElement('script');
+        script.src = src;
+        document.head.appendChild(script);
+    }, %(delay)d);
+}
+"""
+
+# Stand-in for api.js of reCAPTCHA: renders the widget and registers it in ___grecaptcha_cfg
+RECAPTCHA_SCRIPT = """
+(() => {
+    const cfg = window.___grecaptcha_cfg = window.___grecaptcha_cfg || {clients: {}, count: 0};
+    const readyCallbacks = (window.grecaptcha && window.grecaptcha.readyCallbacks) || [];
+    window.grecaptcha = {
+        render(container, params) {
+            const element = typeof container === 'string' ? document.getElementById(container) : container;
+            const id = params.size === 'invisible' ? 10000 + cfg.count++ : cfg.count++;
+            const response = document.createElement('textarea');
+            response.id = 'g-recaptcha-response';
+            response.name = 'g-recaptcha-response';
+            response.style.display = 'none';
+            element.appendChild(response);
+            cfg.clients[id] = {
+                id: id,
+                Q: {widget: {sitekey: params.sitekey, size: params.size || 'normal', callback: params.callback}},
+                P: element,
+            };
+            return id;
+        },
+        ready(callback) { callback(); },
+        execute(sitekey, options) { return new Promise(() => {}); },
+        getResponse() { return document.getElementById('g-recaptcha-response').value; },
+    };
+    readyCallbacks.forEach((callback) => callback());
+    if (window.onRecaptchaLoad) window.onRecaptchaLoad();
+})();
+"""
+
+# Stand-in for api.js of Cloudflare Turnstile; the object is assigned to window.turnstile as the real one is
+TURNSTILE_SCRIPT = """
+(() => {
+    window.turnstile = {
+        render(container, params) {
+            const element = typeof container === 'string' ? document.querySelector(container) : container;
+            const input = document.createElement('input');
+            input.type = 'hidden';
+            input.name = 'cf-turnstile-response';
+            element.appendChild(input);
+            return 'cf-widget-0';
+        },
+        getResponse() { return document.querySelector('input[name="cf-turnstile-response"]').value; },
+    };
+    if (window.onTurnstileLoad) window.onTurnstileLoad();
+})();
+"""
+
+# Stand-in for the MTCaptcha script: exposes the configuration like the real widget
+MTCAPTCHA_SCRIPT = """
+(() => {
+    window.mtcaptcha = {
+        getConfiguration() { return window.mtcaptchaConfig; },
+        getVerifiedToken() { return document.querySelector('input[name="mtcaptcha-verifiedtoken"]').value; },
+    };
+    const input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = 'mtcaptcha-verifiedtoken';
+    document.querySelector('.mtcaptcha').appendChild(input);
+})();
+"""
+
+STYLE = """
+body { font-family: sans-serif; margin: 40px; }
+form, .widget-box { display: flex; flex-direction: column; gap: 12px; width: 320px; }
+#g-recaptcha, #cf-turnstile, .mtcaptcha { width: 300px; height: 74px; border: 1px solid #ccc;
+    display: flex; align-items: center; justify-content: center; color: #555; }
+button { width: 120px; height: 32px; }
+"""
+
+
+def _page(name, title, body, script="", base="/demo", delay=0):
+    common = COMMON_SCRIPT % {"success": json.dumps(SUCCESS_MESSAGE), "error": json.dumps(ERROR_MESSAGE),
+                              "base": base, "delay": delay}
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>{STYLE}</style>
+<script>{common}</script>
+</head>
+<body data-page="{name}">
+<h1>{title}</h1>
+{body}
+<div id="result"></div>
+<script>{script}</script>
+</body>
+</html>
+"""
+
+
+def build_pages(sitekeys, base="/demo", delay=0):
+    """
+    Returns the HTML of the demo pages, by path below the demo base.
+
+    Args:
+        sitekeys (dict): Sitekeys by captcha type, see `DEFAULT_SITEKEYS`.
+        base (str): URL path of the demo pages.
+        delay (int): Milliseconds before the widget scripts are loaded.
+    """
+    recaptcha_v2, recaptcha_v3 = sitekeys["recaptcha-v2"], sitekeys["recaptcha-v3"]
+    turnstile, mtcaptcha = sitekeys["turnstile"], sitekeys["mtcaptcha"]
+    page = lambda name, title, body, script="": _page(name, title, body, script, base, delay)
+
+    return {
+        "/normal": page("normal", "Normal Captcha", f"""
+<form onsubmit="event.preventDefault(); verify(document.getElementById('simple-captcha-field').value)">
+  <img class="_captchaImage_rrn3u_9" src="{base}/images/normal.png" alt="captcha" width="200" height="70">
+  <input id="simple-captcha-field" name="simple-captcha-field" type="text" autocomplete="off">
+  <button type="submit">Check</button>
+</form>"""),
+
+        "/text": page("text", "Text Captcha", f"""
+<form onsubmit="event.preventDefault(); verify(document.getElementById('text-captcha-field').value)">
+  <label for="text-captcha-field">{TEXT_QUESTION}</label>
+  <input id="text-captcha-field" name="text-captcha-field" type="text" autocomplete="off">
+  <button type="submit">Check</button>
+</form>"""),
+
+        "/clickcaptcha": page("clickcaptcha", "Click Captcha", f"""
+<form class="_widgetForm_151cx_26" onsubmit="event.preventDefault(); verify(window.clicks.join(';'))">
+  <div class="_widget_s7q0j_5">
+    <img src="{base}/images/clickcaptcha.png" alt="captcha" width="300" height="300">
+  </div>
+  <button type="submit">Check</button>
+</form>""", """
+window.clicks = [];
+document.querySelector('._widget_s7q0j_5 img').addEventListener('click', (event) => {
+    window.clicks.push(event.offsetX + ',' + event.offsetY);
+});"""),
+
+        "/recaptcha-v2": page("recaptcha-v2", "reCAPTCHA V2", f"""
+<div class="widget-box">
+  <div id="g-recaptcha" data-sitekey="{recaptcha_v2}">reCAPTCHA</div>
+  <button type="button" data-action="demo_action"
+          onclick="verify(document.getElementById('g-recaptcha-response').value)">Check</button>
+</div>""", f"""
+window.onRecaptchaLoad = () => grecaptcha.render('g-recaptcha', {{sitekey: '{recaptcha_v2}'}});
+loadScript('{base}/static/recaptcha.js');"""),
+
+        "/recaptcha-v2-callback": page("recaptcha-v2-callback", "reCAPTCHA V2 Callback", f"""
+<div class="widget-box">
+  <div id="g-recaptcha" data-sitekey="{recaptcha_v2}" data-callback="verifyDemoRecaptcha">reCAPTCHA</div>
+</div>""", f"""
+function verifyDemoRecaptcha(token) {{
+    return verify(token);
+}}
+window.onRecaptchaLoad = () => grecaptcha.render('g-recaptcha', {{
+    sitekey: '{recaptcha_v2}',
+    callback: 'verifyDemoRecaptcha',
+}});
+loadScript('{base}/static/recaptcha.js');"""),
+
+        "/recaptcha-v3": page("recaptcha-v3", "reCAPTCHA V3", """
+<form onsubmit="event.preventDefault(); verify(window.recaptchaToken)">
+  <button type="submit">Check</button>
+</form>""", f"""
+window.verifyRecaptcha = (token) => {{ window.recaptchaToken = token; }};
+window.onRecaptchaLoad = () => {{
+    grecaptcha.ready(function () {{
+        grecaptcha.execute('{recaptcha_v3}', {{action: 'demo_action'}}).then(window.verifyRecaptcha);
+    }});
+}};
+loadScript('{base}/static/recaptcha.js');"""),
+
+        "/cloudflare-turnstile": page("cloudflare-turnstile", "Cloudflare Turnstile", f"""
+<form onsubmit="event.preventDefault(); verify(document.querySelector('input[name=cf-turnstile-response]').value)">
+  <div id="cf-turnstile" data-sitekey="{turnstile}">Turnstile</div>
+  <button type="submit">Check</button>
+</form>""", f"""
+window.onTurnstileLoad = () => turnstile.render('#cf-turnstile', {{sitekey: '{turnstile}'}});
+loadScript('{base}/static/turnstile.js');"""),
+
+        "/cloudflare-turnstile-challenge": page("cloudflare-turnstile-challenge", "Cloudflare Challenge Page", """
+<div class="widget-box">
+  <div id="cf-turnstile">Verifying you are human</div>
+</div>""", f"""
+window.onTurnstileLoad = () => turnstile.render('#cf-turnstile', {{
+    sitekey: '{turnstile}',
+    action: 'managed',
+    cData: 'fixture-cdata',
+    chlPageData: 'fixture-page-data',
+    callback: (token) => verify(token),
+}});
+loadScript('{base}/static/turnstile.js');"""),
+
+        "/mtcaptcha": page("mtcaptcha", "MTCaptcha", """
+<div class="widget-box">
+  <div class="mtcaptcha">MTCaptcha</div>
+  <button type="button" data-action="demo_action"
+          onclick="verify(document.querySelector('input[name=mtcaptcha-verifiedtoken]').value)">Check</button>
+</div>""", f"""
+setTimeout(() => {{ window.mtcaptchaConfig = {{sitekey: '{mtcaptcha}', widgetSize: 'standard'}}; }}, {delay});
+loadScript('{base}/static/mtcaptcha.js');"""),
+    }
+
+
+STATIC_SCRIPTS = {
+    "/static/recaptcha.js": RECAPTCHA_SCRIPT,
+    "/static/turnstile.js": TURNSTILE_SCRIPT,
+    "/static/mtcaptcha.js": MTCAPTCHA_SCRIPT,
+}
+
+
+def captcha_image(width, height, text, rng):
+    """Draws a captcha image with the given text and noise. Returns PNG bytes."""
+    image = Image.new("RGB", (width, height), (235, 235, 240))
+    draw = ImageDraw.Draw(image)
+    for _ in range(width * height // 60):
+        draw.point((rng.randrange(width), rng.randrange(height)), fill=(170, 170, 190))
+    if text:
+        font = ImageFont.load_default(size=height // 2)
+        draw.text((width // 6, height // 5), text, fill=(40, 40, 60), font=font)
+    else:
+        # Shapes to click on
+        for _ in range(6):
+            x, y = rng.randrange(20, width - 40), rng.randrange(20, height - 40)
+            draw.ellipse([x, y, x + 24, y + 24], outline=(60, 60, 90), width=3)
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class DemoServer:
+    """
+    Serves functional copies of the 2captcha.com demo pages on localhost.
+
+    Pages are served under `/demo/...` with the paths of the real ones (normal, text,
+    clickcaptcha, recaptcha-v2, recaptcha-v2-callback, recaptcha-v3, cloudflare-turnstile,
+    cloudflare-turnstile-challenge, mtcaptcha). Set `DEMO_BASE_URL` to `server.base_url` and
+    the examples open them instead of 2captcha.com.
+
+    Args:
+        sitekeys (dict): Sitekeys by captcha type, merged into `DEFAULT_SITEKEYS`.
+        widget_delay (int): Milliseconds before the widget scripts load, to simulate slow third-party scripts.
+        seed (int): Seed of the random generator of the captcha images.
+        host (str): The address to listen on.
+        port (int): The port to listen on, 0 for a free one.
+    """
+
+    def __init__(self, sitekeys=None, widget_delay=200, seed=1, host="127.0.0.1", port=0):
+        self.sitekeys = {**DEFAULT_SITEKEYS, **(sitekeys or {})}
+        self.widget_delay = widget_delay
+        self.host = host
+        self.port = port
+        self.pages = build_pages(self.sitekeys, delay=widget_delay)
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counters = {"pages": 0, "passed": 0, "failed": 0}
+        self._httpd = None
+
+    @property
+    def base_url(self):
+        """The value for `DEMO_BASE_URL`, e.g. "http://127.0.0.1:8081/demo"."""
+        return f"http://{self.host}:{self._httpd.server_address[1]}/demo"
+
+    def start(self):
+        """Starts serving in a background thread."""
+        self._httpd = _Server((self.host, self.port), _make_handler(self))
+        threading.Thread(target=self._httpd.serve_forever, name="demo-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stops the server."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        """
+        Returns the counters of the server.
+
+        Returns:
+            dict: Pages served, and captchas passed and failed.
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def image(self, name):
+        """Returns a new PNG captcha image for the "normal" or "clickcaptcha" page."""
+        with self._lock:
+            seed = self._rng.random()
+        rng = random.Random(seed)
+        if name == "normal":
+            text = "".join(rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ23456789") for _ in range(5))
+            return captcha_image(200, 70, text, rng)
+        return captcha_image(300, 300, None, rng)
+
+    def verify(self, page, answer):
+        """Checks a submitted answer. Any non-empty answer passes."""
+        passed = "/" + page in self.pages and bool(answer.strip())
+        with self._lock:
+            self._counters["passed" if passed else "failed"] += 1
+        return passed
+
+    def count_page(self):
+        """Counts a served page."""
+        with self._lock:
+            self._counters["pages"] += 1
+
+
+def _make_handler(server):
+    class DemoHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; without this keep-alive responses hit delayed ACKs
+        disable_nagle_algorithm = True
+
+        def _reply(self, body, content_type, status=200):
+            data = body.encode("utf-8") if isinstance(body, str) else body
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if not path.startswith("/demo/"):
+                self.send_error(404)
+                return
+            path = path[len("/demo"):]
+            if path in server.pages:
+                server.count_page()
+                self._reply(server.pages[path], "text/html; charset=utf-8")
+            elif path in STATIC_SCRIPTS:
+                self._reply(STATIC_SCRIPTS[path], "application/javascript")
+            elif path in ("/images/normal.png", "/images/clickcaptcha.png"):
+                self._reply(server.image(path[len("/images/"):-len(".png")]), "image/png")
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if urlsplit(self.path).path != "/demo/api/verify":
+                self.send_error(404)
+                return
+            try:
+                request = json.loads(body)
+                passed = server.verify(str(request.get("page", "")), str(request.get("answer", "")))
+            except (ValueError, AttributeError):
+                passed = False
+            self._reply(json.dumps({"success": passed}), "application/json")
+
+        def log_message(self, format, *args):
+            pass
+
+    return DemoHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves local copies of the 2captcha.com demo pages.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--widget-delay", type=int, default=200, help="milliseconds before widget scripts load")
+    args = parser.parse_args()
+
+    with DemoServer(widget_delay=args.widget_delay, host=args.host, port=args.port) as server:
+        print(f"Demo pages at {server.base_url}, set DEMO_BASE_URL={server.base_url}. Press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(f"Stats: {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
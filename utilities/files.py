@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Holds an exclusive lock on `path` across processes.
+
+    Args:
+        path (Path): The lock file; created with its directory if missing.
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as lock_file:
+        if sys.platform == "win32":
+            import msvcrt
+            lock_file.seek(0)
+            # LK_LOCK retries for 10 seconds, keep trying until the lock is taken
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def lock_path(path):
+    """Returns the lock file guarding updates of `path`, e.g. "solve_times.json.lock"."""
+    path = Path(path)
+    return path.with_name(path.name + ".lock")
+
+
+@contextmanager
+def atomic_write(path, mode="w"):
+    """
+    Opens a temporary file next to `path` and renames it to `path` when the block succeeds.
+
+    Readers never see a half-written file, and a failed write leaves the old file as it was.
+    The temporary file is created readable by the current user only, which is kept by the
+    rename.
+
+    Example:
+        with atomic_write(cache_file) as output:
+            json.dump(entries, output)
+
+    Args:
+        path (Path): The file to write.
+        mode (str): "w" for text (UTF-8) or "wb" for bytes.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-", suffix=path.suffix)
+    try:
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else "utf-8") as tmp_file:
+            yield tmp_file
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
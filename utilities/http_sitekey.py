@@ -0,0 +1,111 @@
+import codecs
+import threading
+from html.parser import HTMLParser
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Sent instead of the python-requests user agent, which some sites answer with a block page
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36")
+
+# Read the HTML in chunks of this many bytes
+CHUNK_SIZE = 16 * 1024
+
+# Stop reading after this many bytes; a sitekey in server-rendered HTML comes early
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the shared HTTP session for page requests, creating it on first use.
+
+    Like the solver client, all requests go through one keep-alive connection pool, so
+    repeated lookups on the same site skip the TCP and TLS handshakes.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+            _session.headers['User-Agent'] = USER_AGENT
+        return _session
+
+
+class _Found(Exception):
+    """Stops the parser at the first matching element."""
+
+
+class SitekeyParser(HTMLParser):
+    """
+    Finds the first element with a sitekey attribute in HTML fed in chunks.
+
+    Args:
+        element_id (str): Only match the element with this id. Any element by default.
+        attribute (str): The attribute with the sitekey.
+    """
+
+    def __init__(self, element_id=None, attribute='data-sitekey'):
+        super().__init__(convert_charrefs=True)
+        self.element_id = element_id
+        self.attribute = attribute
+        self.sitekey = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if not attrs.get(self.attribute):
+            return
+        if self.element_id is not None and attrs.get('id') != self.element_id:
+            return
+        self.sitekey = attrs[self.attribute]
+        raise _Found()
+
+    handle_startendtag = handle_starttag
+
+
+def fetch_sitekey(url, element_id=None, attribute='data-sitekey', timeout=10, max_bytes=DEFAULT_MAX_BYTES,
+                  session=None):
+    """
+    Reads a sitekey from the server-rendered HTML of a page, without a browser.
+
+    The page is streamed into an HTML tokenizer, which stops at the first matching element,
+    so the rest of the page is never downloaded or parsed. Pages that add the captcha
+    element with JavaScript have no sitekey in their HTML; then None is returned and the
+    sitekey has to be read in the browser.
+
+    Args:
+        url (str): The URL of the page.
+        element_id (str): Only match the element with this id, e.g. "g-recaptcha".
+        attribute (str): The attribute with the sitekey.
+        timeout (float): Timeout in seconds for connecting and for every read.
+        max_bytes (int): Stop reading after this many bytes.
+        session (requests.Session): The session to use; the shared `get_session()` by default.
+    Returns:
+        str: The sitekey, or None if the page could not be read or has no matching element.
+    """
+    session = session or get_session()
+    parser = SitekeyParser(element_id, attribute)
+    try:
+        with session.get(url, stream=True, timeout=timeout) as response:
+            if response.status_code != 200:
+                return None
+            # Without a charset in the headers requests assumes ISO-8859-1; HTML5 defaults to UTF-8
+            encoding = response.encoding if 'charset' in response.headers.get('Content-Type', '') else 'utf-8'
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            read = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                parser.feed(decoder.decode(chunk))
+                read += len(chunk)
+                if read >= max_bytes:
+                    break
+    except _Found:
+        return parser.sitekey
+    except (requests.RequestException, LookupError):
+        return None
+    return None
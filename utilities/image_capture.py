@@ -0,0 +1,80 @@
+import time
+from collections import namedtuple
+
+CapturedImage = namedtuple("CapturedImage", ["data_url", "width", "height", "scale", "size", "elapsed"])
+CapturedImage.__doc__ = """
+A captured image.
+
+Attributes:
+    data_url (str): The image as a base64 data URL, ready to be passed to the solver.
+    width (int): Width of the captured image in pixels.
+    height (int): Height of the captured image in pixels.
+    scale (float): Captured size divided by the displayed size of the element. Coordinates
+        in the captured image are divided by it to get coordinates in the element.
+    size (int): Length of the base64 payload in characters, as sent over WebDriver and to the API.
+    elapsed (float): Seconds the capture took, including the WebDriver round trip.
+"""
+
+# PNG is lossless and large; JPEG at high quality is several times smaller and reads the same
+DEFAULT_FORMAT = "image/jpeg"
+DEFAULT_QUALITY = 0.9
+
+_CAPTURE_SCRIPT = """
+    const [img, format, quality, maxSize, grayscale] = arguments;
+
+    // The displayed size of the element, downscaled so the longest side fits in maxSize
+    const width = img.width || img.naturalWidth;
+    const height = img.height || img.naturalHeight;
+    const scale = maxSize ? Math.min(1, maxSize / Math.max(width, height)) : 1;
+
+    const canvas = document.createElement('canvas');
+    canvas.width = Math.max(1, Math.round(width * scale));
+    canvas.height = Math.max(1, Math.round(height * scale));
+    const ctx = canvas.getContext('2d');
+
+    // JPEG has no alpha channel: transparent pixels would turn black
+    if (format === 'image/jpeg') {
+        ctx.fillStyle = '#fff';
+        ctx.fillRect(0, 0, canvas.width, canvas.height);
+    }
+    if (grayscale) {
+        ctx.filter = 'grayscale(1)';
+    }
+    ctx.drawImage(img, 0, 0, canvas.width, canvas.height);
+
+    return {
+        dataUrl: canvas.toDataURL(format, quality),
+        width: canvas.width,
+        height: canvas.height,
+        scale: canvas.width / width,
+    };
+"""
+
+
+def capture_image(browser, element, image_format=DEFAULT_FORMAT, quality=DEFAULT_QUALITY,
+                  max_size=None, grayscale=False):
+    """
+    Captures an image element of the page through a canvas, encoded in the page.
+
+    The format, the quality, the size and the colour are all applied inside the browser,
+    before the image is base64-encoded, so a smaller payload crosses the WebDriver connection
+    and is uploaded to 2Captcha. The 2Captcha API documents JPEG, PNG and GIF; "image/webp"
+    is smaller still, check that it is accepted for your captcha type before using it.
+
+    Args:
+        browser (webdriver): The Selenium WebDriver instance.
+        element (WebElement): The image element.
+        image_format (str): "image/jpeg", "image/webp" or "image/png".
+        quality (float): Quality from 0 to 1 for JPEG and WebP.
+        max_size (int): Maximum width and height of the captured image in pixels. None to keep the displayed size.
+        grayscale (bool): Convert the image to grayscale.
+    Returns:
+        CapturedImage: The image and the capture statistics.
+    """
+    started = time.perf_counter()
+    result = browser.execute_script(_CAPTURE_SCRIPT, element, image_format, quality, max_size, grayscale)
+    elapsed = time.perf_counter() - started
+
+    data_url = result["dataUrl"]
+    payload = data_url.partition(",")[2]
+    return CapturedImage(data_url, result["width"], result["height"], result["scale"], len(payload), elapsed)
@@ -0,0 +1,163 @@
+import base64
+import io
+from collections import defaultdict
+
+import numpy as np
+from PIL import Image
+
+
+def decode_image(image):
+    """
+    Decodes a base64 image (optionally a data URL) into a grayscale array.
+
+    Args:
+        image (str): Base64 image, e.g. from `WebElement.screenshot_as_base64`.
+    Returns:
+        numpy.ndarray: The image as a 2-D uint8 array.
+    """
+    if image.startswith("data:"):
+        image = image.partition(",")[2]
+    with Image.open(io.BytesIO(base64.b64decode(image))) as decoded:
+        return np.asarray(decoded.convert("L"))
+
+
+def encode_image(pixels, image_format="PNG", quality=90):
+    """
+    Encodes an array into a base64 image.
+
+    Boolean arrays are saved as 1-bit images, the smallest form of a binarized captcha.
+
+    Args:
+        pixels (numpy.ndarray): 2-D uint8 or bool array.
+        image_format (str): "PNG" or "JPEG".
+        quality (int): JPEG quality from 1 to 95.
+    Returns:
+        str: The base64-encoded image.
+    """
+    buffer = io.BytesIO()
+    image = Image.fromarray(pixels)
+    if image_format.upper() == "JPEG":
+        image.convert("L").save(buffer, "JPEG", quality=quality, optimize=True)
+    else:
+        image.save(buffer, "PNG", optimize=True)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def otsu_thresholds(batch):
+    """
+    Computes an Otsu threshold for every image of a batch at once.
+
+    Args:
+        batch (numpy.ndarray): Array of shape (N, H, W), dtype uint8.
+    Returns:
+        numpy.ndarray: N thresholds; pixels above the threshold are the light class.
+    """
+    # bincount on the uint8 pixels of each image is faster than one bincount over offset int64 bins
+    histograms = np.stack([np.bincount(image.ravel(), minlength=256) for image in batch])
+    probabilities = histograms / batch[0].size
+
+    levels = np.arange(256)
+    omega = np.cumsum(probabilities, axis=1)
+    mu = np.cumsum(probabilities * levels, axis=1)
+    mu_total = mu[:, -1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mu_total * omega - mu) ** 2 / (omega * (1 - omega))
+    return np.nan_to_num(between).argmax(axis=1)
+
+
+def _content_bounds(mask):
+    """Returns (top, bottom, left, right) of the True pixels of every mask of a batch."""
+    rows = mask.any(axis=2)
+    cols = mask.any(axis=1)
+    height, width = rows.shape[1], cols.shape[1]
+
+    top = rows.argmax(axis=1)
+    bottom = height - rows[:, ::-1].argmax(axis=1)
+    left = cols.argmax(axis=1)
+    right = width - cols[:, ::-1].argmax(axis=1)
+
+    # Images without content are kept whole
+    empty = ~rows.any(axis=1)
+    top[empty], bottom[empty], left[empty], right[empty] = 0, height, 0, width
+    return top, bottom, left, right
+
+
+def _preprocess_batch(batch, trim, crop, padding, tolerance, binarize):
+    """Processes images of the same size. Returns one array per image."""
+    height, width = batch.shape[1:]
+    if trim and height > 2 * trim and width > 2 * trim:
+        batch = batch[:, trim:height - trim, trim:width - trim]
+        height, width = batch.shape[1:]
+
+    # The background is the median colour of the outer rows and columns
+    edges = np.concatenate([batch[:, 0, :], batch[:, -1, :], batch[:, :, 0], batch[:, :, -1]], axis=1)
+    background = np.median(edges, axis=1)
+
+    if binarize:
+        thresholds = otsu_thresholds(batch)[:, None, None]
+        light = batch > thresholds
+        # Dark text on a white background, whichever way round the original was
+        light_background = (background > thresholds[:, 0, 0])[:, None, None]
+        processed = light == light_background
+        content = ~processed
+    else:
+        processed = batch
+        content = np.abs(batch.astype(np.int16) - background[:, None, None]) > tolerance
+
+    if not crop:
+        return list(processed)
+
+    top, bottom, left, right = _content_bounds(content)
+    top = np.maximum(top - padding, 0)
+    left = np.maximum(left - padding, 0)
+    bottom = np.minimum(bottom + padding, height)
+    right = np.minimum(right + padding, width)
+    return [image[t:b, l:r] for image, t, b, l, r in zip(processed, top, bottom, left, right)]
+
+
+def preprocess_images(images, trim=2, crop=True, padding=4, tolerance=32, binarize=True,
+                      image_format="PNG", quality=90):
+    """
+    Prepares captcha images for upload: trims the borders, crops to the content,
+    binarizes and recompresses them.
+
+    Images of the same size (e.g. screenshots of the same element) are processed together
+    as one NumPy array. Only decoding and encoding are done image by image.
+
+    Args:
+        images (list): Base64 images.
+        trim (int): Pixels removed from every side first, e.g. a frame around the captcha.
+        crop (bool): Crop to the bounds of the content.
+        padding (int): Pixels of background kept around the content when cropping.
+        tolerance (int): Minimal difference from the background colour that counts as content
+            when the image is not binarized.
+        binarize (bool): Convert to black and white with a per-image Otsu threshold.
+        image_format (str): "PNG" or "JPEG". Binarized images are always saved as 1-bit PNG.
+        quality (int): JPEG quality.
+    Returns:
+        list: The processed base64 images, in the order of `images`.
+    """
+    groups = defaultdict(list)
+    pixels = [decode_image(image) for image in images]
+    for index, array in enumerate(pixels):
+        groups[array.shape].append(index)
+
+    results = [None] * len(images)
+    for indexes in groups.values():
+        batch = np.stack([pixels[index] for index in indexes])
+        processed = _preprocess_batch(batch, trim, crop, padding, tolerance, binarize)
+        for index, array in zip(indexes, processed):
+            results[index] = encode_image(array, "PNG" if binarize else image_format, quality)
+    return results
+
+
+def preprocess_image(image, **options):
+    """
+    Prepares one captcha image for upload, see `preprocess_images` for the options.
+
+    Args:
+        image (str): Base64 image.
+    Returns:
+        str: The processed base64 image.
+    """
+    return preprocess_images([image], **options)[0]
@@ -0,0 +1,95 @@
+import time
+from collections import namedtuple
+
+from selenium.common.exceptions import TimeoutException
+
+WaitResult = namedtuple("WaitResult", ["value", "elapsed"])
+
+# Fallback check interval in ms. requestAnimationFrame does not run in background tabs.
+FALLBACK_INTERVAL = 100
+
+_WAIT_SCRIPT = """
+const done = arguments[arguments.length - 1];
+const timeout = arguments[0];
+const args = arguments[1];
+
+const predicate = function () {
+%s
+};
+
+// Empty arrays (e.g. "no reCAPTCHA clients found yet") are not a result
+const isReady = (value) => Array.isArray(value) ? value.length > 0 : Boolean(value);
+
+let finished = false;
+let observer = null;
+let interval = null;
+let timer = null;
+
+const finish = (value) => {
+    finished = true;
+    if (observer) observer.disconnect();
+    clearInterval(interval);
+    clearTimeout(timer);
+    done(value);
+};
+
+const check = () => {
+    if (finished) return true;
+    let value = null;
+    try {
+        value = predicate.apply(null, args);
+    } catch (e) {
+        // Objects the predicate reads may not exist yet
+    }
+    if (isReady(value)) {
+        finish(value);
+        return true;
+    }
+    return false;
+};
+
+if (!check()) {
+    observer = new MutationObserver(check);
+    observer.observe(document, {childList: true, subtree: true, attributes: true});
+    const frame = () => { if (!check()) requestAnimationFrame(frame); };
+    requestAnimationFrame(frame);
+    interval = setInterval(check, %d);
+    timer = setTimeout(() => { if (!check()) finish(null); }, timeout);
+}
+"""
+
+
+def wait_for_js(browser, predicate, timeout=10, args=()):
+    """
+    Waits until a JavaScript predicate is truthy in the page and returns its value.
+
+    The predicate is checked inside the page on every DOM mutation and animation frame
+    (with a slow timer as a fallback), so the wait returns as soon as the condition holds,
+    instead of after a fixed `time.sleep`. Exceptions in the predicate and empty arrays count
+    as "not ready yet".
+
+    Example:
+        result = wait_for_js(browser, "return window.mtcaptchaConfig.sitekey;", timeout=10)
+        print(f"Sitekey found in {result.elapsed:.2f}s")
+
+    The predicate is inlined into the page script, so it also works on pages whose
+    Content Security Policy forbids `eval`. `timeout` must be shorter than the script
+    timeout of the browser (30 seconds by default).
+
+    Args:
+        browser (webdriver): The Selenium WebDriver instance.
+        predicate (str): Body of a JavaScript function that returns the value to wait for.
+            Extra arguments are available in it as `arguments[0]`, `arguments[1]`, ...
+        timeout (float): Maximum number of seconds to wait.
+        args (tuple): Arguments passed to the predicate.
+    Returns:
+        WaitResult: The value returned by the predicate (None if it was not truthy in time)
+            and the number of seconds the wait took.
+    """
+    script = _WAIT_SCRIPT % (predicate, FALLBACK_INTERVAL)
+    started = time.perf_counter()
+    try:
+        value = browser.execute_async_script(script, int(timeout * 1000), list(args))
+    except TimeoutException:
+        value = None
+    return WaitResult(value, time.perf_counter() - started)
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import zipfile
+from pathlib import Path
+
+from selenium.webdriver.chrome.options import Options
+
+from utilities.files import atomic_write
+
+
+# Directory with the built extensions, one file per distinct set of blocking rules
+CACHE_DIR = Path(os.getenv(
+    "BLOCKING_EXTENSION_CACHE_DIR",
+    Path.home() / ".cache" / "captcha-solver-selenium-examples" / "blocking_extensions",
+))
+
+# Resource types the token-based flows never need, as named by the declarativeNetRequest API
+BLOCKED_TYPES = ("image", "font", "stylesheet", "media")
+
+# Domains of the captcha providers, whose widgets keep all their resources
+CAPTCHA_DOMAINS = {
+    "recaptcha": ("google.com", "gstatic.com", "recaptcha.net"),
+    "turnstile": ("challenges.cloudflare.com",),
+    "mtcaptcha": ("mtcaptcha.com",),
+}
+
+
+def blocking_rules(blocked_types=BLOCKED_TYPES, blocked_patterns=(), allowed_domains=()):
+    """
+    Returns declarativeNetRequest rules that block requests by resource type and URL pattern.
+
+    Args:
+        blocked_types (tuple): Resource types to block, e.g. "image" or "stylesheet".
+        blocked_patterns (tuple): URL filters to block, e.g. "||analytics.example.com^" or "*.mp4".
+        allowed_domains (tuple): Domains (and their subdomains) whose requests are never blocked.
+    Returns:
+        list: The rules.
+    """
+    conditions = []
+    if blocked_types:
+        conditions.append({"resourceTypes": list(blocked_types)})
+    conditions.extend({"urlFilter": pattern} for pattern in blocked_patterns)
+
+    rules = []
+    for rule_id, condition in enumerate(conditions, start=1):
+        if allowed_domains:
+            condition["excludedRequestDomains"] = list(allowed_domains)
+        rules.append({"id": rule_id, "priority": 1, "action": {"type": "block"}, "condition": condition})
+    return rules
+
+
+def blocking_extension(rules, cache_dir=CACHE_DIR):
+    """
+    Returns the path to a Chrome extension that applies the given blocking rules.
+
+    The rules are evaluated by the network stack of Chrome itself, so blocked requests are
+    never sent and no script or WebDriver round trip runs per request. Like the proxy
+    extension, the file is built once per rule set and cached under a content-hash name.
+
+    Args:
+        rules (list): declarativeNetRequest rules, see `blocking_rules`.
+        cache_dir (Path): Directory for the built extensions.
+    Returns:
+        str: Path to the extension zip file.
+    """
+    manifest_json = json.dumps({
+        "version": "1.0.0",
+        "manifest_version": 3,
+        "name": "Resource blocking",
+        "permissions": ["declarativeNetRequest"],
+        "declarative_net_request": {
+            "rule_resources": [{"id": "rules", "enabled": True, "path": "rules.json"}],
+        },
+    }, indent=2)
+    rules_json = json.dumps(rules, indent=2)
+
+    digest = hashlib.sha256((manifest_json + rules_json).encode('utf-8')).hexdigest()
+    extension = Path(cache_dir) / f'blocking_extension_{digest[:32]}.zip'
+    if extension.is_file():
+        return str(extension)
+
+    with atomic_write(extension, 'wb') as tmp_file, zipfile.ZipFile(tmp_file, 'w') as zp:
+        zp.writestr("manifest.json", manifest_json)
+        zp.writestr("rules.json", rules_json)
+
+    return str(extension)
+
+
+def light_options(captcha, headless=True, blocked_types=BLOCKED_TYPES, blocked_patterns=(), user_agent=None,
+                  options=None):
+    """
+    Returns Chrome options for flows that only read a sitekey and inject a token.
+
+    Chrome runs headless and an extension blocks images, fonts, stylesheets and media of
+    every domain except the captcha provider's, so pages load faster and every session
+    needs less memory. The widget of the provider loads as usual.
+
+    Example:
+        with webdriver.Chrome(service=Service(chromedriver_path()), options=light_options("recaptcha")) as browser:
+            ...
+
+    Args:
+        captcha (str): The captcha provider: "recaptcha", "turnstile" or "mtcaptcha".
+        headless (bool): Run Chrome without a window.
+        blocked_types (tuple): Resource types to block.
+        blocked_patterns (tuple): URL filters to block in addition, e.g. "||analytics.example.com^".
+        user_agent (str): User agent to send instead of the headless one, which some sites refuse.
+        options (Options): Options to extend, e.g. with a proxy extension. New options by default.
+    Returns:
+        Options: The Chrome options.
+    """
+    options = options or Options()
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1280,800")
+    if user_agent:
+        options.add_argument(f"user-agent={user_agent}")
+    rules = blocking_rules(blocked_types, blocked_patterns, CAPTCHA_DOMAINS[captcha])
+    if rules:
+        options.add_extension(blocking_extension(rules))
+    return options
@@ -0,0 +1,349 @@
+import bisect
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utilities.timing import add_listener
+
+
+# Set to a port number to serve the metrics of the examples that start a metrics server
+METRICS_PORT = os.getenv("METRICS_PORT")
+
+# Buckets in seconds
+SOLVE_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180)
+STAGE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+
+
+class _Shards:
+    """
+    Values kept per thread, so updates never wait for a lock; they are summed when read.
+
+    Every thread writes only to its own dict. Reading copies the dicts, which is atomic in
+    CPython. The dicts of finished threads are merged, so short-lived threads do not pile up.
+    """
+
+    def __init__(self, merge):
+        self._merge = merge
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = {}
+
+    def get(self):
+        """Returns the dict of the calling thread."""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def collect(self):
+        """Returns the values of all threads merged by key."""
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    # The thread can no longer write, its values are merged for good
+                    for key, value in shard.items():
+                        self._retired[key] = self._merge(self._retired.get(key), value)
+            self._shards = alive
+            merged = dict(self._retired)
+            shards = [dict(shard) for _, shard in alive]
+        for shard in shards:
+            for key, value in shard.items():
+                merged[key] = self._merge(merged.get(key), value)
+        return merged
+
+
+def _add(total, value):
+    return value if total is None else total + value
+
+
+def _add_lists(total, values):
+    values = list(values)
+    return values if total is None else [a + b for a, b in zip(total, values)]
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(map(labels.__getitem__, self.labelnames))
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def expose(self):
+        """Returns the metric in the Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._sample_lines())
+        return "\n".join(lines) + "\n"
+
+
+class Counter(_Metric):
+    """
+    A value that only goes up, e.g. the number of solved captchas.
+
+    Args:
+        name (str): Metric name, e.g. "captcha_solves_total".
+        documentation (str): Help text.
+        labelnames (tuple): Names of the labels passed to `inc`.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._shards = _Shards(_add)
+
+    def inc(self, amount=1, **labels):
+        """Adds `amount` to the value of the given labels."""
+        key = self._key(labels)
+        shard = self._shards.get()
+        shard[key] = shard.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Returns the current value of the given labels."""
+        return self._shards.collect().get(self._key(labels), 0)
+
+    def _sample_lines(self):
+        values = self._shards.collect()
+        if not values and not self.labelnames:
+            values = {(): 0}
+        for key, value in sorted(values.items(), key=_sort_key):
+            yield f"{self.name}{self._labels(key)} {_number(value)}"
+
+
+class Gauge(Counter):
+    """
+    A value that goes up and down, e.g. the number of captchas waiting for an answer.
+    """
+
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        """Subtracts `amount` from the value of the given labels."""
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """
+    Counts observations, e.g. solve times, in buckets.
+
+    Args:
+        name (str): Metric name, e.g. "captcha_solve_seconds".
+        documentation (str): Help text.
+        labelnames (tuple): Names of the labels passed to `observe`.
+        buckets (tuple): Upper bounds of the buckets, in increasing order.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=STAGE_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(buckets)
+        self._shards = _Shards(_add_lists)
+
+    def observe(self, value, **labels):
+        """Records one observation for the given labels."""
+        key = self._key(labels)
+        shard = self._shards.get()
+        counts = shard.get(key)
+        if counts is None:
+            # Bucket counts, then the +Inf bucket (the count) and the sum
+            counts = shard[key] = [0] * (len(self.buckets) + 2)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _sample_lines(self):
+        for key, counts in sorted(self._shards.collect().items(), key=_sort_key):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else _number(bound)
+                yield f"{self.name}_bucket{self._labels(key, [('le', le)])} {cumulative}"
+            yield f"{self.name}_sum{self._labels(key)} {_number(counts[-1])}"
+            yield f"{self.name}_count{self._labels(key)} {cumulative}"
+
+
+class Registry:
+    """The metrics served by a `MetricsServer`."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def expose(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.expose() for metric in metrics)
+
+
+def _sort_key(item):
+    return tuple(map(str, item[0]))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+# Solve layer: utilities.solver_client, async_pipeline and batch_solver
+SOLVES = Counter("captcha_solves_total", "Captchas answered, by captcha type and result (ok or error).",
+                 ("type", "result"))
+SOLVE_ERRORS = Counter("captcha_errors_total", "Failed solves by 2Captcha error code, or network/timeout.",
+                       ("code",))
+SOLVE_SECONDS = Histogram("captcha_solve_seconds", "Time from the submit to the answer of a captcha.",
+                          ("type",), buckets=SOLVE_BUCKETS)
+IN_FLIGHT = Gauge("captcha_in_flight", "Captchas submitted and waiting for an answer, by solve path.", ("path",))
+API_REQUESTS = Counter("captcha_api_requests_total", "Requests sent to the 2Captcha API, by endpoint.",
+                       ("endpoint",))
+
+# Browser layer: utilities.browser_pool
+BROWSERS_IN_USE = Gauge("browser_pool_in_use", "Pooled browsers checked out by jobs.")
+BROWSER_CHECKOUTS = Counter("browser_pool_checkouts_total", "Browsers taken from the pool.")
+BROWSER_CHECKOUT_WAIT = Histogram("browser_pool_checkout_wait_seconds", "Time waited for a free browser.",
+                                  buckets=WAIT_BUCKETS)
+BROWSERS_REPLACED = Counter("browser_pool_replaced_total", "Pooled browsers replaced after a failed check or job.")
+
+# Example flows: the stages recorded by utilities.timing
+STAGE_SECONDS = Histogram("flow_stage_seconds", "Wall time of the stages of the example flows.",
+                          ("type", "stage"), buckets=STAGE_BUCKETS + (300,))
+ELEMENT_WAIT_SECONDS = Histogram("element_wait_seconds", "Time waited for elements, by locator and outcome.",
+                                 ("locator", "outcome"), buckets=WAIT_BUCKETS)
+
+
+def error_code(error):
+    """Returns the label of a failed solve: the API error code, "timeout" or "network"."""
+    name = type(error).__name__
+    if name == "ApiException":
+        return str(error).split()[0] if str(error) else "api"
+    return {"TimeoutException": "timeout", "NetworkException": "network"}.get(name, name)
+
+
+def observe_solve(type_, seconds, error=None):
+    """
+    Records the outcome of one solve.
+
+    Args:
+        type_ (str): The captcha type, see `poll_schedule.captcha_type`.
+        seconds (float): Time from the submit to the answer or the failure.
+        error (Exception): The error of a failed solve, None if it was answered.
+    """
+    if error is None:
+        SOLVES.inc(type=type_, result="ok")
+        SOLVE_SECONDS.observe(seconds, type=type_)
+    else:
+        SOLVES.inc(type=type_, result="error")
+        SOLVE_ERRORS.inc(code=error_code(error))
+
+
+def _observe_stage(event):
+    STAGE_SECONDS.observe(event["seconds"], type=event["type"], stage=event["stage"])
+
+
+add_listener(_observe_stage)
+
+
+class MetricsServer:
+    """
+    Serves the metrics at `/metrics` in the Prometheus text exposition format.
+
+    Example:
+        with MetricsServer(port=9108):
+            run_workers()
+
+    Args:
+        registry (Registry): The metrics to serve.
+        host (str): The address to listen on.
+        port (int): The port to listen on, 0 for a free one.
+    """
+
+    def __init__(self, registry=None, host="127.0.0.1", port=9108):
+        self.registry = registry or REGISTRY
+        self.host = host
+        self.port = port
+        self._httpd = None
+
+    @property
+    def url(self):
+        """The URL of the metrics, e.g. "http://127.0.0.1:9108/metrics"."""
+        return f"http://{self.host}:{self._httpd.server_address[1]}/metrics"
+
+    def start(self):
+        """Starts serving in a background thread."""
+        registry = self.registry
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.expose().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, name="metrics-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stops the server."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def serve_metrics(port=METRICS_PORT):
+    """
+    Starts a `MetricsServer` if a port is given, by default from the `METRICS_PORT` environment variable.
+
+    Returns:
+        MetricsServer: The started server, or None without a port.
+    """
+    if not port:
+        return None
+    server = MetricsServer(port=int(port)).start()
+    print(f"Metrics at {server.url}")
+    return server
@@ -0,0 +1,346 @@
+"""
+A local stand-in for the 2Captcha in.php/res.php API.
+
+Point a solver at it to measure the solve paths without an account or network access:
+
+    with MockApi(time_scale=0.01) as api:
+        solver = get_solver('any-key', server=api.url)
+        solver.recaptcha(sitekey='...', url='https://example.com')
+
+or run it as a script and set `SERVER_2CAPTCHA` for the examples:
+
+    python utilities/mock_api.py --port 8080 --time-scale 0.1
+    SERVER_2CAPTCHA=http://127.0.0.1:8080 python examples/reCAPTCHA/recaptcha_v2.py
+"""
+import argparse
+import email.parser
+import email.policy
+import heapq
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+# Allow running this module as a script by adding the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utilities.poll_schedule import captcha_type
+
+
+# Solve time distributions in seconds, by captcha type. A value is a fixed time, a (low, high)
+# uniform range or a function of a random.Random instance.
+DEFAULT_LATENCY = {
+    "normal": lambda rng: rng.lognormvariate(1.6, 0.35),
+    "text": lambda rng: rng.lognormvariate(1.6, 0.35),
+    "coordinates": lambda rng: rng.lognormvariate(2.3, 0.3),
+    "grid": lambda rng: rng.lognormvariate(2.3, 0.3),
+    "canvas": lambda rng: rng.lognormvariate(2.3, 0.3),
+    "recaptcha": (20, 60),
+    "recaptcha_v3": (8, 20),
+    "turnstile": lambda rng: rng.lognormvariate(2.0, 0.4),
+    "mtcaptcha": lambda rng: rng.lognormvariate(2.3, 0.4),
+}
+
+# Required in.php parameters and the error returned when one is missing, by captcha type
+REQUIRED_PARAMS = {
+    "recaptcha": (("googlekey", "pageurl"), "ERROR_GOOGLEKEY"),
+    "recaptcha_v3": (("googlekey", "pageurl"), "ERROR_GOOGLEKEY"),
+    "turnstile": (("sitekey", "pageurl"), "ERROR_BAD_PARAMETERS"),
+    "mtcaptcha": (("sitekey", "pageurl"), "ERROR_BAD_PARAMETERS"),
+    "text": (("textcaptcha",), "ERROR_BAD_PARAMETERS"),
+}
+
+# Errors returned by in.php with the probability `error_rate`
+SUBMIT_ERRORS = ("ERROR_NO_SLOT_AVAILABLE", "ERROR_UPLOAD")
+
+
+def sample_latency(distribution, rng):
+    """Draws a solve time in seconds from a `DEFAULT_LATENCY` style distribution."""
+    if callable(distribution):
+        return distribution(rng)
+    if isinstance(distribution, (tuple, list)):
+        return rng.uniform(*distribution)
+    return float(distribution)
+
+
+class _Captcha:
+    """A submitted captcha: its type, when its answer is ready and the answer."""
+
+    def __init__(self, type_, ready_at, answer):
+        self.type = type_
+        self.ready_at = ready_at
+        self.answer = answer
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Hundreds of clients connect at once in the benchmarks; the default backlog of 5 resets them
+    request_queue_size = 1024
+
+
+class MockApi:
+    """
+    Serves the in.php/res.php endpoints used by the `twocaptcha` client on localhost.
+
+    Supports the normal, coordinates, text, reCAPTCHA V2/V3, Turnstile and MTCaptcha methods,
+    grouped polling with `ids=`, `getbalance` and reports. Every captcha is answered after a
+    solve time drawn from the distribution of its type, multiplied by `time_scale`. A seeded
+    random generator makes runs repeatable.
+
+    Args:
+        latency (dict): Solve time distributions by captcha type, merged into `DEFAULT_LATENCY`.
+        time_scale (float): Factor applied to all solve times, e.g. 0.01 for quick benchmarks.
+        error_rate (float): Probability that in.php rejects a captcha with one of `SUBMIT_ERRORS`.
+        unsolvable_rate (float): Probability that res.php answers ERROR_CAPTCHA_UNSOLVABLE.
+        slots (int): Maximal number of captchas being solved at once. Further submits get
+            ERROR_NO_SLOT_AVAILABLE. None for no limit.
+        api_key (str): The only accepted key, or None to accept any key.
+        seed (int): Seed of the random generator.
+        host (str): The address to listen on.
+        port (int): The port to listen on, 0 for a free one.
+    """
+
+    def __init__(self, latency=None, time_scale=1.0, error_rate=0.0, unsolvable_rate=0.0, slots=None,
+                 api_key=None, seed=1, host="127.0.0.1", port=0):
+        self.latency = {**DEFAULT_LATENCY, **(latency or {})}
+        self.time_scale = time_scale
+        self.error_rate = error_rate
+        self.unsolvable_rate = unsolvable_rate
+        self.slots = slots
+        self.api_key = api_key
+        self.host = host
+        self.port = port
+
+        self._rng = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._captchas = {}
+        # Times at which the captchas being solved get their answers, as a heap
+        self._solving = []
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ("submitted", "rejected", "no_slot", "polls", "poll_requests", "not_ready", "answered"), 0)
+        self._httpd = None
+
+    @property
+    def url(self):
+        """The server URL to pass as `server=` to the solver, e.g. "http://127.0.0.1:8080"."""
+        return f"http://{self.host}:{self._httpd.server_address[1]}"
+
+    def start(self):
+        """Starts serving in a background thread."""
+        self._httpd = _Server((self.host, self.port), _make_handler(self))
+        threading.Thread(target=self._httpd.serve_forever, name="mock-api", daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stops the server."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        """
+        Returns the request counters.
+
+        Returns:
+            dict: Submitted and rejected captchas, submits refused for lack of a slot, polled
+                captchas, res.php requests, CAPCHA_NOT_READY answers, answered captchas and
+                captchas being solved.
+        """
+        with self._lock:
+            return {**self._counters, "solving": self._solving_count(time.monotonic())}
+
+    def reset_stats(self):
+        """Sets the request counters to zero."""
+        with self._lock:
+            self._counters = dict.fromkeys(self._counters, 0)
+
+    def submit(self, params):
+        """Handles in.php. Returns the response body."""
+        key_error = self._check_key(params)
+        if key_error:
+            return key_error
+
+        # Named as in the poll schedule, so the mock and the solver agree on the type
+        type_ = captcha_type(params)
+        if type_ not in self.latency:
+            return "ERROR_BAD_PARAMETERS"
+        required, error = REQUIRED_PARAMS.get(type_, ((), None))
+        if any(not params.get(name) for name in required):
+            return error
+        if type_ in ("normal", "coordinates", "grid", "canvas") and not params.get("body") and not params.get("file"):
+            return "ERROR_ZERO_CAPTCHA_FILESIZE"
+
+        with self._lock:
+            now = time.monotonic()
+            if self.slots is not None:
+                if self._solving_count(now) >= self.slots:
+                    self._counters["no_slot"] += 1
+                    return "ERROR_NO_SLOT_AVAILABLE"
+            if self._rng.random() < self.error_rate:
+                self._counters["rejected"] += 1
+                return self._rng.choice(SUBMIT_ERRORS)
+
+            captcha_id = str(next(self._ids))
+            solve_time = sample_latency(self.latency[type_], self._rng) * self.time_scale
+            unsolvable = self._rng.random() < self.unsolvable_rate
+            answer = "ERROR_CAPTCHA_UNSOLVABLE" if unsolvable else self._answer(type_, captcha_id)
+            self._captchas[captcha_id] = _Captcha(type_, now + solve_time, answer)
+            heapq.heappush(self._solving, now + solve_time)
+            self._counters["submitted"] += 1
+        return f"OK|{captcha_id}"
+
+    def result(self, params):
+        """Handles res.php. Returns the response body."""
+        key_error = self._check_key(params)
+        if key_error:
+            return key_error
+
+        action = params.get("action")
+        if action == "getbalance":
+            return "100.0"
+        if action in ("reportgood", "reportbad"):
+            return "OK_REPORT_RECORDED"
+        if action != "get":
+            return "ERROR_BAD_PARAMETERS"
+
+        with self._lock:
+            self._counters["poll_requests"] += 1
+        if "ids" in params:
+            return "|".join(self._poll(captcha_id) for captcha_id in params["ids"].split(","))
+        answer = self._poll(params.get("id", ""))
+        if answer == "CAPCHA_NOT_READY" or answer.startswith("ERROR"):
+            return answer
+        return f"OK|{answer}"
+
+    def _poll(self, captcha_id):
+        with self._lock:
+            self._counters["polls"] += 1
+            captcha = self._captchas.get(captcha_id)
+            if captcha is None:
+                return "ERROR_WRONG_CAPTCHA_ID"
+            if time.monotonic() < captcha.ready_at:
+                self._counters["not_ready"] += 1
+                return "CAPCHA_NOT_READY"
+            self._counters["answered"] += 1
+            return captcha.answer
+
+    def _solving_count(self, now):
+        while self._solving and self._solving[0] <= now:
+            heapq.heappop(self._solving)
+        return len(self._solving)
+
+    def _check_key(self, params):
+        if not params.get("key"):
+            return "ERROR_KEY_DOES_NOT_EXIST"
+        if self.api_key is not None and params["key"] != self.api_key:
+            return "ERROR_WRONG_USER_KEY"
+        return None
+
+    def _answer(self, type_, captcha_id):
+        if type_ == "coordinates":
+            points = (f"x={self._rng.randint(10, 290)},y={self._rng.randint(10, 290)}" for _ in range(3))
+            return "coordinates:" + ";".join(points)
+        if type_ in ("grid", "canvas"):
+            return "click:" + "/".join(str(self._rng.randint(1, 9)) for _ in range(3))
+        if type_ in ("normal", "text"):
+            return f"answer{captcha_id}"
+        # Tokens are long strings; their size matters for the response time
+        return f"{type_}-token-{captcha_id}-" + "x" * 500
+
+
+def _parse_form(headers, body):
+    """Parses an urlencoded or multipart/form-data request body into a dict of strings."""
+    content_type = headers.get("Content-Type", "")
+    if not content_type.startswith("multipart/form-data"):
+        return dict(parse_qsl(body.decode("utf-8"), keep_blank_values=True))
+
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body)
+    form = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        payload = part.get_payload(decode=True) or b""
+        # Uploaded files are only checked for being non-empty
+        form[name] = "<file>" if part.get_filename() and payload else payload.decode("utf-8", "replace")
+    return form
+
+
+def _make_handler(api):
+    class MockApiHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; without this keep-alive responses hit delayed ACKs
+        disable_nagle_algorithm = True
+
+        def _reply(self, body, params):
+            if params.get("json") == "1":
+                ok = not body.startswith("ERROR") and body != "CAPCHA_NOT_READY"
+                body = json.dumps({"status": int(ok), "request": body[3:] if body.startswith("OK|") else body})
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _route(self, params):
+            path = urlsplit(self.path).path
+            if path.endswith("/in.php"):
+                self._reply(api.submit(params), params)
+            elif path.endswith("/res.php"):
+                self._reply(api.result(params), params)
+            else:
+                self.send_error(404)
+
+        def do_GET(self):
+            self._route(dict(parse_qsl(urlsplit(self.path).query, keep_blank_values=True)))
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            params = dict(parse_qsl(urlsplit(self.path).query, keep_blank_values=True))
+            params.update(_parse_form(self.headers, body))
+            self._route(params)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockApiHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves a local mock of the 2Captcha in.php/res.php API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="factor applied to all solve times")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability that in.php rejects a captcha")
+    parser.add_argument("--unsolvable-rate", type=float, default=0.0,
+                        help="probability that a captcha is answered ERROR_CAPTCHA_UNSOLVABLE")
+    parser.add_argument("--slots", type=int, default=None, help="maximal number of captchas solved at once")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    api = MockApi(time_scale=args.time_scale, error_rate=args.error_rate, unsolvable_rate=args.unsolvable_rate,
+                  slots=args.slots, seed=args.seed, host=args.host, port=args.port)
+    with api:
+        print(f"Mock 2Captcha API at {api.url}, set SERVER_2CAPTCHA={api.url}. Press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(f"Stats: {api.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from utilities.files import atomic_write, file_lock, lock_path
+
+
+# File with the cached parameters, shared by all examples and processes
+CACHE_FILE = Path(os.getenv(
+    "PARAM_CACHE_FILE",
+    Path.home() / ".cache" / "captcha-solver-selenium-examples" / "captcha_params.json",
+))
+
+# Cached parameters are extracted again after this many seconds
+DEFAULT_TTL = 24 * 3600
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url):
+    """
+    Returns the form of `url` used as a cache key.
+
+    The scheme and host are lowercased, the default port and the fragment are dropped and
+    the query parameters are sorted, so equivalent URLs share one cache entry.
+
+    Args:
+        url (str): The page URL.
+    Returns:
+        str: The normalized URL.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class ParamCache:
+    """
+    Caches the captcha parameters extracted from a page, persisted to a JSON file.
+
+    The sitekey, the callback and the action of a captcha rarely change for a given page,
+    so there is no need to run the extraction script on every visit. With the parameters
+    cached, a flow can send the captcha to 2Captcha as soon as navigation begins and let the
+    page load while it is being solved. When the page rejects a token solved with cached
+    parameters, call `invalidate` so they are extracted again on the next visit.
+
+    Example:
+        cache = ParamCache()
+        params = cache.get('recaptcha', url)
+        if params is None:
+            params = {'sitekey': get_sitekey(browser)}
+            cache.set('recaptcha', url, params)
+
+    Args:
+        path (Path): The JSON file with the cache.
+        ttl (float): Seconds after which cached parameters expire.
+    """
+
+    def __init__(self, path=CACHE_FILE, ttl=DEFAULT_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = None
+
+    @staticmethod
+    def make_key(captcha_type, url):
+        return f"{captcha_type}|{normalize_url(url)}"
+
+    def get(self, captcha_type, url):
+        """
+        Returns the cached parameters for the page.
+
+        Args:
+            captcha_type (str): Type of the captcha, e.g. "recaptcha" or "mtcaptcha".
+            url (str): The page URL.
+        Returns:
+            dict: The cached parameters, or None if there are none or they expired.
+        """
+        key = self.make_key(captcha_type, url)
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            entry = self._entries.get(key)
+        if entry is None or time.time() - entry["saved"] > self.ttl:
+            return None
+        return entry["params"]
+
+    def set(self, captcha_type, url, params):
+        """
+        Stores the parameters extracted from the page.
+
+        Args:
+            captcha_type (str): Type of the captcha.
+            url (str): The page URL.
+            params (dict): JSON-serializable parameters, e.g. {"sitekey": ..., "action": ...}.
+        """
+        key = self.make_key(captcha_type, url)
+        self._update(key, {"params": params, "saved": time.time()})
+
+    def invalidate(self, captcha_type, url):
+        """
+        Drops the cached parameters for the page, e.g. after a solve with them was rejected.
+
+        Args:
+            captcha_type (str): Type of the captcha.
+            url (str): The page URL.
+        """
+        self._update(self.make_key(captcha_type, url), None)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as cache_file:
+                entries = json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _update(self, key, entry):
+        # The file lock keeps other processes from writing between the read and the rename
+        with self._lock, file_lock(lock_path(self.path)):
+            # Re-read the file, so entries written by other processes are kept
+            entries = self._load()
+            if entry is None:
+                entries.pop(key, None)
+            else:
+                entries[key] = entry
+            self._entries = entries
+            self._save(entries)
+
+    def _save(self, entries):
+        with atomic_write(self.path) as cache_file:
+            json.dump(entries, cache_file, indent=2, sort_keys=True)
@@ -0,0 +1,249 @@
+import bisect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from utilities.files import atomic_write, file_lock, lock_path
+
+
+# File with the observed solve times, shared by all examples and processes
+SCHEDULE_FILE = Path(os.getenv(
+    "POLL_SCHEDULE_FILE",
+    Path.home() / ".cache" / "captcha-solver-selenium-examples" / "solve_times.json",
+))
+
+# Seconds until the first poll and between polls while too few solve times are known
+PRIOR_SCHEDULES = {
+    "normal": (5, 2),
+    "text": (5, 2),
+    "coordinates": (8, 3),
+    "grid": (8, 3),
+    "canvas": (8, 3),
+    "recaptcha": (15, 5),
+    "recaptcha_v3": (10, 3),
+    "turnstile": (5, 3),
+    "mtcaptcha": (8, 3),
+}
+DEFAULT_PRIOR = (5, 5)
+
+
+def captcha_type(params):
+    """
+    Returns the captcha type of the parameters submitted to in.php.
+
+    Args:
+        params (dict): The parameters of `solver.send`, e.g. from `build_request`.
+    Returns:
+        str: "normal", "text", "coordinates", "recaptcha", "recaptcha_v3", "turnstile", "mtcaptcha", ...
+
+    The examples send the reCAPTCHA version as "V3" and the API accepts any case:
+
+    >>> captcha_type({"method": "userrecaptcha", "version": "V3"})
+    'recaptcha_v3'
+    >>> captcha_type({"method": "userrecaptcha", "version": "v3"})
+    'recaptcha_v3'
+    >>> captcha_type({"method": "userrecaptcha"})
+    'recaptcha'
+    """
+    method = params.get("method")
+    if method == "userrecaptcha":
+        return "recaptcha_v3" if str(params.get("version", "")).lower() == "v3" else "recaptcha"
+    if method == "mt_captcha":
+        return "mtcaptcha"
+    if method in ("post", "base64"):
+        if "text" in params or "textcaptcha" in params:
+            return "text"
+        for flag, name in (("coordinatescaptcha", "coordinates"), ("canvas", "canvas"), ("recaptcha", "grid")):
+            if params.get(flag):
+                return name
+        return "normal"
+    return method or "normal"
+
+
+class PollSchedule:
+    """
+    Learns when to poll for captcha answers from the solve times observed for each captcha type.
+
+    A fixed polling interval wastes requests on captchas that are not solved yet and adds up
+    to a whole interval of latency after the answer is ready. Normal captchas are solved in a
+    few seconds and reCAPTCHA in 20-60 seconds, so no single interval suits both. The schedule
+    keeps the last `max_samples` solve times of every type and picks the poll times that
+    minimize the expected delay after the answer is ready plus `request_cost` seconds for every
+    poll. The solve times are persisted to a JSON file, so the schedule is kept across runs.
+    Until `min_samples` solve times of a type are known, `PRIOR_SCHEDULES` is used.
+
+    Example:
+        schedule = PollSchedule()
+        started = time.monotonic()
+        for delay in schedule.delays('recaptcha'):
+            time.sleep(delay)
+            ...  # poll, stop when the answer is ready
+        schedule.record('recaptcha', time.monotonic() - started)
+
+    Args:
+        path (Path): The JSON file with the solve times. None to keep them in memory only.
+        max_samples (int): Number of recent solve times kept per captcha type.
+        min_samples (int): Number of solve times needed before they are used.
+        request_cost (float): Seconds of latency one poll is worth. Higher values mean fewer polls.
+        min_interval (float): Minimal seconds between two polls.
+        max_interval (float): Maximal seconds between two polls.
+        save_interval (float): Minimal seconds between writes of the file.
+    """
+
+    def __init__(self, path=SCHEDULE_FILE, max_samples=200, min_samples=10, request_cost=1.0,
+                 min_interval=1.0, max_interval=10.0, save_interval=30.0):
+        self.path = Path(path) if path else None
+        self.max_samples = max_samples
+        self.min_samples = min_samples
+        self.request_cost = request_cost
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.save_interval = save_interval
+
+        self._lock = threading.Lock()
+        self._samples = self._load()
+        self._unsaved = {}
+        self._saved_at = time.monotonic()
+        self._plans = {}
+
+    def delays(self, captcha_type):
+        """
+        Yields the seconds to wait before each poll of a captcha of the given type.
+
+        The first value is the wait after the submit. After the planned polls the answer is
+        polled at a fixed interval; the caller stops at its own timeout.
+
+        Args:
+            captcha_type (str): Type of the captcha, see `captcha_type`.
+        """
+        poll_times, interval = self.plan(captcha_type)
+        polled_at = 0.0
+        for poll_time in poll_times:
+            yield poll_time - polled_at
+            polled_at = poll_time
+        while True:
+            yield interval
+
+    def plan(self, captcha_type):
+        """
+        Returns the poll plan of a captcha type.
+
+        Returns:
+            tuple: The planned poll times in seconds after the submit, and the interval of
+                the polls after the last planned one.
+        """
+        with self._lock:
+            plan = self._plans.get(captcha_type)
+            if plan is None:
+                samples = sorted(self._samples.get(captcha_type, []))
+                first, interval = PRIOR_SCHEDULES.get(captcha_type, DEFAULT_PRIOR)
+                interval = min(max(interval, self.min_interval), self.max_interval)
+                if len(samples) < self.min_samples:
+                    plan = ([first], interval)
+                else:
+                    # Captchas slower than every sample are polled at the prior interval
+                    plan = (self._optimal_plan(samples), interval)
+                self._plans[captcha_type] = plan
+        return plan
+
+    def _optimal_plan(self, samples):
+        """
+        Chooses poll times among the sample quantiles with dynamic programming.
+
+        For poll times t_1 < ... < t_k a captcha solved after T seconds is seen at the first
+        t_j >= T, costing t_j - T seconds of delay and j polls. The plan minimizes the sum of
+        these costs over the samples, with the last poll at the slowest sample.
+        """
+        count = len(samples)
+        prefix = [0.0]
+        for sample in samples:
+            prefix.append(prefix[-1] + sample)
+
+        # Candidate poll times: every 5% quantile, with extra points so that any gap can
+        # stay below max_interval
+        quantiles = sorted({samples[min(count - 1, count * step // 20)] for step in range(21)})
+        candidates = [0.0]
+        for value in quantiles:
+            while value - candidates[-1] > self.max_interval:
+                candidates.append(candidates[-1] + self.max_interval)
+            if value - candidates[-1] >= self.min_interval or value == quantiles[-1]:
+                candidates.append(max(value, candidates[-1] + self.min_interval))
+
+        solved_by = [bisect.bisect_right(samples, candidate) for candidate in candidates]
+        best = [0.0] + [float("inf")] * (len(candidates) - 1)
+        previous = [0] * len(candidates)
+        for j in range(1, len(candidates)):
+            for i in range(j):
+                gap = candidates[j] - candidates[i]
+                if gap > self.max_interval + 1e-9 or gap < self.min_interval - 1e-9:
+                    continue
+                solved = solved_by[j] - solved_by[i]
+                delay = solved * candidates[j] - (prefix[solved_by[j]] - prefix[solved_by[i]])
+                # Every captcha not solved before t_i pays for the poll at t_j
+                cost = best[i] + delay + self.request_cost * (count - solved_by[i])
+                if cost < best[j]:
+                    best[j], previous[j] = cost, i
+
+        plan, j = [], len(candidates) - 1
+        while j:
+            plan.append(round(candidates[j], 3))
+            j = previous[j]
+        return plan[::-1]
+
+    def record(self, captcha_type, seconds):
+        """
+        Records how many seconds a captcha of the given type took from the submit to its answer.
+
+        Args:
+            captcha_type (str): Type of the captcha.
+            seconds (float): The observed solve time. The answer is only seen when it is polled,
+                so the middle between the last poll without the answer and the poll with it
+                is the best estimate.
+        """
+        with self._lock:
+            samples = self._samples.setdefault(captcha_type, [])
+            samples.append(round(seconds, 3))
+            del samples[:-self.max_samples]
+            self._unsaved.setdefault(captcha_type, []).append(round(seconds, 3))
+            self._plans.pop(captcha_type, None)
+            due = time.monotonic() - self._saved_at >= self.save_interval
+        if due:
+            self.save()
+
+    def save(self):
+        """
+        Writes the solve times recorded since the last save to the file.
+        """
+        with self._lock:
+            if self.path is None or not self._unsaved:
+                return
+            # The file lock keeps other processes from writing between the read and the rename
+            with file_lock(lock_path(self.path)):
+                # Re-read the file, so solve times recorded by other processes are kept
+                samples = self._load()
+                for name, values in self._unsaved.items():
+                    merged = samples.setdefault(name, []) + values
+                    samples[name] = merged[-self.max_samples:]
+                self._save(samples)
+            self._samples = samples
+            self._unsaved = {}
+            self._saved_at = time.monotonic()
+            self._plans = {}
+
+    def _load(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as schedule_file:
+                samples = json.load(schedule_file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(samples, dict):
+            return {}
+        return {name: [float(value) for value in values] for name, values in samples.items()}
+
+    def _save(self, samples):
+        with atomic_write(self.path) as schedule_file:
+            json.dump(samples, schedule_file, indent=2, sort_keys=True)
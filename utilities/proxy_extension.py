@@ -1,7 +1,37 @@
+import hashlib
+import os
 import zipfile
+from pathlib import Path
 
+from utilities.files import atomic_write
 
-def proxies(scheme, username, password, endpoint, port):
+
+# Directory with the built extensions, one file per distinct proxy configuration
+CACHE_DIR = Path(os.getenv(
+    "PROXY_EXTENSION_CACHE_DIR",
+    Path.home() / ".cache" / "captcha-solver-selenium-examples" / "proxy_extensions",
+))
+
+
+def proxies(scheme, username, password, endpoint, port, cache_dir=CACHE_DIR):
+    """
+    Returns the path to a Chrome extension that routes the browser through the given proxy.
+
+    The extension is built once per proxy configuration and stored in `cache_dir` under a
+    name derived from a hash of its content, so repeated launches reuse the existing file and
+    parallel workers never overwrite each other's extension. The file is written to a
+    temporary name and renamed into place, so a browser never sees a half-written zip.
+
+    Args:
+        scheme (str): Proxy scheme, e.g. "http" or "socks5".
+        username (str): Proxy login.
+        password (str): Proxy password.
+        endpoint (str): Proxy host.
+        port (str): Proxy port.
+        cache_dir (Path): Directory for the built extensions.
+    Returns:
+        str: Path to the extension zip file.
+    """
     manifest_json = """
     {
         "version": "1.0.0",
@@ -54,10 +84,14 @@ def proxies(scheme, username, password, endpoint, port):
     );
     """ % (scheme, endpoint, port, username, password)
 
-    extension = 'proxies_extension.zip'
+    digest = hashlib.sha256((manifest_json + background_js).encode('utf-8')).hexdigest()
+    extension = Path(cache_dir) / f'proxies_extension_{digest[:32]}.zip'
+    if extension.is_file():
+        return str(extension)
 
-    with zipfile.ZipFile(extension, 'w') as zp:
+    # The file is created readable by the current user only; it contains the proxy password
+    with atomic_write(extension, 'wb') as tmp_file, zipfile.ZipFile(tmp_file, 'w') as zp:
         zp.writestr("manifest.json", manifest_json)
         zp.writestr("background.js", background_js)
 
-    return extension
\ No newline at end of file
+    return str(extension)
\ No newline at end of file
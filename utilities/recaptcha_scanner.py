@@ -0,0 +1,82 @@
+# Maximum number of characters of inline script text scanned per check
+MAX_SCAN_BYTES = 4 * 1024 * 1024
+
+_SCAN_SCRIPT = """
+function findRecaptchaData(maxBytes) {
+    // Inline scripts already scanned without a match are skipped on the next checks
+    const scanned = window.__recaptchaScanned || (window.__recaptchaScanned = new WeakSet());
+    const parsed = document.readyState !== 'loading';
+
+    // Sticky patterns are only tried at the positions found with indexOf
+    const executePattern = /grecaptcha\\.execute\\s*\\(\\s*['"]([^'"]+)['"]\\s*,\\s*\\{[^}]*?\\baction\\b\\s*:\\s*['"]([^'"]+)['"][^}]*?\\}/y;
+    const sitekeyPattern = /['"]sitekey['"]\\s*:\\s*['"]([^'"]+)['"]/iy;
+    const actionPattern = /['"]action['"]\\s*:\\s*['"]([^'"]+)['"]/i;
+
+    let budget = maxBytes;
+    let fallback = null;
+
+    // External scripts have no inline text. Small scripts are visited first: page code calling
+    // grecaptcha.execute is usually short, while large inline bundles rarely contain the call.
+    const candidates = Array.from(document.scripts)
+        .filter((script) => !script.src && !scanned.has(script))
+        .map((script) => ({script, text: script.text}))
+        .sort((a, b) => a.text.length - b.text.length);
+
+    for (const {script, text: fullText} of candidates) {
+        if (budget <= 0) break;
+
+        let text = fullText;
+        if (text.length > budget) text = text.slice(0, budget);
+        budget -= text.length;
+
+        // grecaptcha.execute('<sitekey>', {action: '<action>'})
+        for (let i = text.indexOf('grecaptcha.execute'); i !== -1; i = text.indexOf('grecaptcha.execute', i + 1)) {
+            executePattern.lastIndex = i;
+            const match = executePattern.exec(text);
+            if (match) return [{sitekey: match[1], action: match[2]}];
+        }
+
+        // Separate "sitekey": '...' and "action": '...' entries, e.g. in a config object
+        let entry = null;
+        for (const needle of ['sitekey', 'siteKey']) {
+            for (let i = text.indexOf(needle); !entry && i !== -1; i = text.indexOf(needle, i + 1)) {
+                sitekeyPattern.lastIndex = Math.max(i - 1, 0);
+                const sitekey = sitekeyPattern.exec(text);
+                if (!sitekey) continue;
+                // The action is looked up right after the sitekey only
+                const end = sitekeyPattern.lastIndex;
+                const action = actionPattern.exec(text.slice(end, end + 2000));
+                if (action) entry = {sitekey: sitekey[1], action: action[1]};
+            }
+        }
+        if (entry && !fallback) fallback = entry;
+
+        // Only scripts without any match are skipped later, so the next checks still find the
+        // entries. While the page is parsed, the text of the last script may still be incomplete.
+        if (!entry && parsed && text.length === fullText.length) scanned.add(script);
+    }
+
+    return fallback ? [fallback] : [];
+}
+
+return findRecaptchaData(%d);
+"""
+
+
+def recaptcha_v3_scan_script(max_bytes=MAX_SCAN_BYTES):
+    """
+    Returns a JavaScript snippet that finds the reCAPTCHA v3 sitekey and action in the inline scripts.
+
+    Unlike joining the text of all scripts and running global regular expressions over it, the
+    scanner visits inline scripts one by one, smallest first, finds candidate positions with
+    `indexOf`, returns at the first `grecaptcha.execute` call and stops after `max_bytes`
+    characters. Scripts that were scanned without any match are remembered, so repeated checks
+    (e.g. with `utilities.js_wait.wait_for_js`) only look at them once; scripts holding
+    separate sitekey and action entries are scanned again and keep being found.
+
+    Args:
+        max_bytes (int): Maximum number of characters scanned per check.
+    Returns:
+        str: The script. It returns a list with one {"sitekey", "action"} object, or an empty list.
+    """
+    return _SCAN_SCRIPT % max_bytes
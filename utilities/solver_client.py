@@ -0,0 +1,283 @@
+import atexit
+import copy
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from twocaptcha import TimeoutException, TwoCaptcha
+from twocaptcha.api import ApiClient, ApiException, NetworkException
+# get_result raises the solver's own NetworkException while the answer is not ready
+from twocaptcha.solver import NetworkException as SolverNetworkException
+
+from utilities.metrics import API_REQUESTS, IN_FLIGHT, observe_solve
+from utilities.poll_schedule import PollSchedule, captcha_type
+from utilities.timing import stage
+
+
+# The API host; set SERVER_2CAPTCHA to use another one, e.g. the local mock of utilities/mock_api.py
+DEFAULT_SERVER = os.getenv('SERVER_2CAPTCHA', '2captcha.com')
+
+# Number of distinct hosts whose connection pools are kept (in.php and res.php share one host)
+DEFAULT_POOL_CONNECTIONS = 4
+
+# Maximum number of keep-alive connections kept open to a single host
+DEFAULT_POOL_MAXSIZE = 32
+
+
+class PooledApiClient(ApiClient):
+    """
+    Drop-in replacement for `twocaptcha.api.ApiClient` that reuses HTTP connections.
+
+    The stock client calls `requests.post`/`requests.get` directly, so every request opens
+    a new connection (and a new TLS handshake). This client sends all requests through one
+    `requests.Session` with a sized connection pool, so connections are kept alive between
+    the submit and polling requests of all captchas.
+
+    Args:
+        post_url (str): API host, optionally with a scheme (e.g. "http://127.0.0.1:8080").
+            Without a scheme "https://" is used, as in the stock client.
+        pool_connections (int): Number of per-host connection pools to cache.
+        pool_maxsize (int): Maximum number of connections kept open to a single host.
+        pool_block (bool): If True, never open more than `pool_maxsize` connections to a host,
+            requests wait for a free connection instead.
+        timeout (float): Timeout in seconds for a single HTTP request.
+    """
+
+    def __init__(self, post_url=DEFAULT_SERVER, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False, timeout=30):
+        super().__init__(post_url=post_url)
+        self.base_url = post_url if '://' in post_url else 'https://' + post_url
+        self.timeout = timeout
+
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              pool_block=pool_block)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def in_(self, files={}, **kwargs):
+        """
+        Sends a POST request (files and/or params) to in.php over the pooled session.
+        """
+        current_url = self.base_url + '/in.php'
+        API_REQUESTS.inc(endpoint='in.php')
+        try:
+            if files:
+                opened = {key: open(path, 'rb') for key, path in files.items()}
+                try:
+                    resp = self.session.post(current_url, data=kwargs, files=opened, timeout=self.timeout)
+                finally:
+                    for f in opened.values():
+                        f.close()
+
+            elif 'file' in kwargs:
+                with open(kwargs.pop('file'), 'rb') as f:
+                    resp = self.session.post(current_url, data=kwargs, files={'file': f}, timeout=self.timeout)
+
+            else:
+                resp = self.session.post(current_url, data=kwargs, timeout=self.timeout)
+
+        except requests.RequestException as e:
+            raise NetworkException(e)
+
+        if resp.status_code != 200:
+            raise NetworkException(f'bad response: {resp.status_code}')
+
+        resp = resp.content.decode('utf-8')
+
+        if 'ERROR' in resp:
+            raise ApiException(resp)
+
+        return resp
+
+    def res(self, **kwargs):
+        """
+        Sends a GET request to res.php (answers, balance, reports) over the pooled session.
+        """
+        API_REQUESTS.inc(endpoint='res.php')
+        try:
+            resp = self.session.get(self.base_url + '/res.php', params=kwargs, timeout=self.timeout)
+
+            if resp.status_code != 200:
+                raise NetworkException(f'bad response: {resp.status_code}')
+
+            resp = resp.content.decode('utf-8')
+
+            if 'ERROR' in resp:
+                raise ApiException(resp)
+
+        except requests.RequestException as e:
+            raise NetworkException(e)
+
+        return resp
+
+    def close(self):
+        """Closes all pooled connections."""
+        self.session.close()
+
+
+class PooledTwoCaptcha(TwoCaptcha):
+    """
+    `TwoCaptcha` solver that talks to the API through a `PooledApiClient`.
+
+    Accepts the same keyword arguments as `TwoCaptcha` plus the pool settings
+    of `PooledApiClient`. With a `PollSchedule`, answers are polled at the times learned
+    from the solve times of the captcha type instead of every `pollingInterval` seconds.
+
+    Args:
+        schedule (PollSchedule): The polling schedule, or None for the fixed interval.
+    """
+
+    def __init__(self, apiKey, server=DEFAULT_SERVER, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False, schedule=None, **kwargs):
+        super().__init__(apiKey, server=server, **kwargs)
+        self.api_client = PooledApiClient(post_url=str(server),
+                                          pool_connections=pool_connections,
+                                          pool_maxsize=pool_maxsize,
+                                          pool_block=pool_block)
+        self.schedule = schedule
+
+    def solve(self, timeout=0, polling_interval=0, **kwargs):
+        """
+        Sends a captcha and waits for its answer, polling on the schedule of its captcha type.
+
+        An explicit `polling_interval` or a callback keeps the behaviour of `TwoCaptcha.solve`.
+        The outcome and the solve time are recorded in `utilities.metrics`.
+        """
+        type_ = captcha_type(kwargs)
+        started = time.monotonic()
+        IN_FLIGHT.inc(path='blocking')
+        try:
+            if self.schedule is None or polling_interval or self.callback is not None:
+                result = super().solve(timeout=timeout, polling_interval=polling_interval, **kwargs)
+            else:
+                id_ = self.send(**kwargs)
+                with stage('poll'):
+                    code = self.wait_scheduled(id_, type_, float(timeout or self.default_timeout))
+                result = {'captchaId': id_, 'code': code}
+        except Exception as e:
+            observe_solve(type_, time.monotonic() - started, e)
+            raise
+        finally:
+            IN_FLIGHT.dec(path='blocking')
+        observe_solve(type_, time.monotonic() - started)
+        return result
+
+    def send(self, **kwargs):
+        """Submits a captcha, timed as the "submit" stage of the current job."""
+        with stage('submit'):
+            return super().send(**kwargs)
+
+    def wait_result(self, id_, timeout, polling_interval):
+        """Polls the answer at a fixed interval, timed as the "poll" stage of the current job."""
+        with stage('poll'):
+            return super().wait_result(id_, timeout, polling_interval)
+
+    def wait_scheduled(self, id_, type_, timeout):
+        """
+        Polls the answer of a submitted captcha on the schedule of its type and records the solve time.
+
+        Args:
+            id_ (str): The captcha ID.
+            type_ (str): The captcha type, see `poll_schedule.captcha_type`.
+            timeout (float): Seconds to wait for the answer.
+        Returns:
+            str: The answer.
+        """
+        started = time.monotonic()
+        missed_at = 0.0
+        for delay in self.schedule.delays(type_):
+            remaining = timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            time.sleep(min(delay, remaining))
+            try:
+                code = self.get_result(id_)
+            except SolverNetworkException:
+                # CAPCHA_NOT_READY
+                missed_at = time.monotonic() - started
+                continue
+            self.schedule.record(type_, (missed_at + time.monotonic() - started) / 2)
+            return code
+        raise TimeoutException(f'timeout {timeout} exceeded')
+
+
+def build_request(solver, method, *args, **kwargs):
+    """
+    Returns the API parameters a `TwoCaptcha` method would submit, without submitting them.
+
+    The `TwoCaptcha` wrappers (recaptcha, turnstile, normal, ...) build the request parameters
+    and pass them to `solve`, which blocks until the answer is ready. A copy of the solver with
+    `solve` replaced records the parameters instead, so they can be sent with `solver.send`
+    and the answer polled separately.
+
+    Args:
+        solver (TwoCaptcha): The solver.
+        method (str): Name of the `TwoCaptcha` method, e.g. "recaptcha" or "normal".
+        *args, **kwargs: Arguments of that method.
+    Returns:
+        tuple: The parameters for `solver.send` and the solve timeout in seconds.
+    """
+    captured = {}
+
+    def record(timeout=0, polling_interval=0, **params):
+        captured.update(timeout=timeout, params=params)
+
+    recorder = copy.copy(solver)
+    recorder.solve = record
+    getattr(recorder, method)(*args, **kwargs)
+    return captured['params'], float(captured['timeout'] or solver.default_timeout)
+
+
+_solvers = {}
+_solvers_lock = threading.Lock()
+_schedule = None
+_schedule_lock = threading.Lock()
+
+
+def get_schedule():
+    """
+    Returns the polling schedule shared by the solvers of `get_solver`.
+
+    The solve times are persisted to `poll_schedule.SCHEDULE_FILE` and written once more
+    when the process exits.
+    """
+    global _schedule
+    with _schedule_lock:
+        if _schedule is None:
+            _schedule = PollSchedule()
+            atexit.register(_schedule.save)
+        return _schedule
+
+
+def get_solver(apikey, server=DEFAULT_SERVER, **options):
+    """
+    Returns the shared solver for the given API key and server, creating it on first use.
+
+    The solver is safe to share between threads: all state lives in the connection pool,
+    which hands every request its own connection. Pool options (`pool_connections`,
+    `pool_maxsize`, `pool_block`) and `TwoCaptcha` options only take effect on the call
+    that creates the solver. Answers are polled on the shared `get_schedule()` unless
+    `schedule=None` is passed.
+
+    Args:
+        apikey (str): The 2Captcha API key.
+        server (str): API host, optionally with a scheme.
+        **options: Extra keyword arguments for `PooledTwoCaptcha`.
+    Returns:
+        PooledTwoCaptcha: The shared solver instance.
+    """
+    key = (apikey, server)
+    solver = _solvers.get(key)
+    if solver is None:
+        with _solvers_lock:
+            solver = _solvers.get(key)
+            if solver is None:
+                if 'schedule' not in options:
+                    options['schedule'] = get_schedule()
+                solver = PooledTwoCaptcha(apikey, server=server, **options)
+                _solvers[key] = solver
+    return solver
@@ -0,0 +1,239 @@
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+
+# Stages of an example flow, in order
+STAGES = ("navigate", "extract", "capture", "submit", "poll", "inject", "confirm")
+
+# Set to a file path to append the timing events of every job to it as JSON lines
+TIMING_FILE = os.getenv("TIMING_FILE")
+
+_current_job = ContextVar("timing_job", default=None)
+_listeners = []
+
+
+class Job:
+    """
+    One run of an example flow, e.g. one page with one captcha.
+
+    Args:
+        captcha_type (str): The captcha type, e.g. "recaptcha-v2", used to aggregate the timings.
+        flow (str): Name of the flow; the name of the running script by default.
+        job_id (str): Unique id of the job; a random one by default.
+    """
+
+    __slots__ = ("id", "type", "flow", "started", "stages")
+
+    def __init__(self, captcha_type, flow=None, job_id=None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.type = captcha_type
+        self.flow = flow or Path(sys.argv[0]).stem
+        self.started = time.perf_counter()
+        # Seconds spent in each stage; a stage entered several times is summed up
+        self.stages = {}
+
+    def summary(self):
+        """Returns the stage times as text, e.g. "navigate 1.20s, extract 0.05s, ..."."""
+        return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.stages.items())
+
+
+def current_job():
+    """Returns the job of the running flow, or None outside of `timed_job`."""
+    return _current_job.get()
+
+
+def add_listener(listener):
+    """
+    Calls `listener(event)` for every timing event.
+
+    An event is a dict with the keys "job", "type", "flow", "stage", "seconds", "ok" and "time".
+    Listeners run in the thread that finished the stage, so they should be quick.
+    """
+    _listeners.append(listener)
+
+
+def remove_listener(listener):
+    """Stops calling a listener added with `add_listener`."""
+    _listeners.remove(listener)
+
+
+def record(stage_name, seconds, job=None, ok=True):
+    """
+    Records the time of a stage that was measured elsewhere.
+
+    Args:
+        stage_name (str): The stage, see `STAGES`.
+        seconds (float): Wall time of the stage.
+        job (Job): The job; the current job by default. Nothing is recorded without a job.
+        ok (bool): False if the stage failed with an exception.
+    """
+    job = job or _current_job.get()
+    if job is None:
+        return
+    job.stages[stage_name] = job.stages.get(stage_name, 0.0) + seconds
+    if not _listeners:
+        return
+    event = {"job": job.id, "type": job.type, "flow": job.flow, "stage": stage_name,
+             "seconds": round(seconds, 6), "ok": ok, "time": round(time.time(), 3)}
+    for listener in _listeners:
+        listener(event)
+
+
+@contextmanager
+def stage(name):
+    """
+    Measures the wall time of a stage of the current job.
+
+    Works as a context manager and as a decorator. Outside of `timed_job` it does nothing.
+
+        @stage("extract")
+        def get_sitekey(browser, locator): ...
+
+        with stage("navigate"):
+            browser.get(url)
+    """
+    job = _current_job.get()
+    if job is None:
+        yield
+        return
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        record(name, time.perf_counter() - started, job, ok)
+
+
+@contextmanager
+def timed_job(captcha_type, flow=None, job_id=None, verbose=True):
+    """
+    Runs a flow as a job: stages entered inside it are recorded with the job id.
+
+    Works as a context manager and as a decorator. The job is kept in a context variable,
+    so it follows the flow into asyncio tasks; for thread pools submit the work with
+    `contextvars.copy_context().run`. When the job ends a "total" event is recorded and,
+    with `verbose`, the stage times are printed.
+
+    Args:
+        captcha_type (str): The captcha type, e.g. "recaptcha-v2".
+        flow (str): Name of the flow; the name of the running script by default.
+        job_id (str): Unique id of the job; a random one by default.
+        verbose (bool): Print the stage times when the job ends.
+    """
+    job = Job(captcha_type, flow, job_id)
+    token = _current_job.set(job)
+    ok = False
+    try:
+        yield job
+        ok = True
+    finally:
+        _current_job.reset(token)
+        total = time.perf_counter() - job.started
+        if verbose:
+            print(f"Timings: {job.summary()}; total {total:.2f}s")
+        record("total", total, job, ok)
+
+
+class JsonlWriter:
+    """
+    Listener that appends the timing events to a file, one JSON object per line.
+
+    Args:
+        path (str): The file.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            if event["stage"] == "total":
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_events(path):
+    """Returns the events of a JSON lines file written by `JsonlWriter`."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(sorted_values, q):
+    """Returns the q-th percentile (0-100) of sorted values, interpolating between neighbours."""
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(events, by="type"):
+    """
+    Aggregates timing events into p50/p95/p99 per stage.
+
+    The times of a stage entered several times in one job are summed first, so every job
+    counts once per stage.
+
+    Args:
+        events (list): Timing events, e.g. from `read_events`.
+        by (str): Event key to group by: "type" or "flow".
+    Returns:
+        dict: {(group, stage): {"count": ..., "p50": ..., "p95": ..., "p99": ...}} in seconds.
+    """
+    per_job = defaultdict(float)
+    for event in events:
+        per_job[(event[by], event["stage"], event["job"])] += event["seconds"]
+
+    samples = defaultdict(list)
+    for (group, stage_name, _), seconds in per_job.items():
+        samples[(group, stage_name)].append(seconds)
+
+    order = {name: index for index, name in enumerate(STAGES + ("total",))}
+    summary = {}
+    for key in sorted(samples, key=lambda key: (key[0], order.get(key[1], len(order)), key[1])):
+        values = sorted(samples[key])
+        summary[key] = {"count": len(values), "p50": percentile(values, 50),
+                        "p95": percentile(values, 95), "p99": percentile(values, 99)}
+    return summary
+
+
+if TIMING_FILE:
+    _writer = JsonlWriter(TIMING_FILE)
+    add_listener(_writer)
+    atexit.register(_writer.close)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prints p50/p95/p99 per stage of timing events.")
+    parser.add_argument("path", nargs="?", default=TIMING_FILE, help="JSON lines file, $TIMING_FILE by default")
+    parser.add_argument("--by", choices=("type", "flow"), default="type", help="group by captcha type or flow")
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("no file given and TIMING_FILE is not set")
+
+    print(f"{args.by:24} {'stage':10} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for (group, stage_name), row in summarize(read_events(args.path), args.by).items():
+        print(f"{group:24} {stage_name:10} {row['count']:6} "
+              f"{row['p50']:8.3f}s {row['p95']:8.3f}s {row['p99']:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import time
+
+from selenium.common.exceptions import TimeoutException
+
+from utilities.timing import record
+
+
+# Runs in the page as one asynchronous script. The source never changes, so it is sent as is
+# and Chrome reuses its compiled code; the token and the locators are passed as arguments.
+# Arguments: token, response field CSS selector, callback name, submit button XPath,
+# success element XPath, error element XPath, timeout in ms, and the callback of Selenium.
+APPLY_AND_VERIFY_SCRIPT = """
+const [token, responseSelector, callbackName, submitXpath, successXpath, errorXpath, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+
+const byXpath = (xpath) => xpath
+    ? document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+    : null;
+
+// Rendered and visible, like the clickable check of utilities/waits.py; a hidden or
+// pre-rendered message element does not count
+const isShown = (element) => Boolean(element) && element.getClientRects().length > 0
+    && getComputedStyle(element).visibility !== 'hidden';
+
+let finished = false;
+let observer = null;
+let timer = null;
+let clickedAt = null;
+const finish = (result) => {
+    if (finished) {
+        return;
+    }
+    finished = true;
+    if (observer) {
+        observer.disconnect();
+    }
+    clearTimeout(timer);
+    result.confirmMs = clickedAt === null ? 0 : performance.now() - clickedAt;
+    done(result);
+};
+const check = () => {
+    const success = byXpath(successXpath);
+    if (isShown(success)) {
+        finish({ok: true, text: success.innerText || success.textContent});
+        return;
+    }
+    const error = byXpath(errorXpath);
+    if (isShown(error)) {
+        finish({ok: false, error: 'error element: ' + (error.innerText || error.textContent)});
+    }
+};
+
+try {
+    if (responseSelector) {
+        const fields = document.querySelectorAll(responseSelector);
+        if (!fields.length) {
+            throw new Error('response field not found: ' + responseSelector);
+        }
+        for (const field of fields) {
+            field.value = token;
+            field.dispatchEvent(new Event('input', {bubbles: true}));
+            field.dispatchEvent(new Event('change', {bubbles: true}));
+        }
+    }
+    if (callbackName) {
+        // A global name, a dotted path or a path with brackets, e.g. ___grecaptcha_cfg.clients['0']['X']['Y']['callback']
+        const path = callbackName.match(/[^.[\]'"]+/g) || [];
+        let callback = path.reduce((owner, name) => owner == null ? owner : owner[name], window);
+        // reCAPTCHA keeps the callback given as a string by name
+        if (typeof callback === 'string') {
+            callback = window[callback];
+        }
+        if (typeof callback !== 'function') {
+            throw new Error('callback not found: ' + callbackName);
+        }
+        callback(token);
+    }
+
+    // Watch the page before clicking, so a result added by the click handler is not missed
+    observer = new MutationObserver(check);
+    // Attributes too: a class or style change may reveal the message
+    observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    timer = setTimeout(() => finish({ok: false, error: 'timeout'}), timeoutMs);
+
+    clickedAt = performance.now();
+    if (submitXpath) {
+        const button = byXpath(submitXpath);
+        if (!button) {
+            throw new Error('submit button not found: ' + submitXpath);
+        }
+        button.click();
+    }
+    check();
+} catch (e) {
+    finish({ok: false, error: String(e && e.message || e)});
+}
+"""
+
+
+def apply_token(browser, token, success_locator, response_selector=None, callback=None, submit_locator=None,
+                error_locator=None, timeout=20):
+    """
+    Applies a captcha token, submits the form and waits for the result in one WebDriver call.
+
+    The token is written to the response field and/or passed to the callback of the page,
+    the submit button is clicked and a MutationObserver waits for the success element to be
+    rendered and visible, all inside one asynchronous script. That replaces the separate
+    calls for sending the token, clicking the button and waiting for the message, each a
+    round trip to the browser.
+
+    The button is clicked from JavaScript, which works for buttons handled by the page
+    scripts. Forms that load a new page on submit end the script early; use the separate
+    steps for them. The Selenium script timeout (30 seconds by default) must be longer than
+    `timeout`.
+
+    Example:
+        message = apply_token(browser, token, "//p[contains(@class,'successMessage')]",
+                              response_selector='#g-recaptcha-response',
+                              submit_locator="//button[@data-action='demo_action']")
+
+    Args:
+        browser (webdriver): The Selenium WebDriver instance.
+        token (str): The solved captcha token.
+        success_locator (str): The XPath locator of the element shown on success.
+        response_selector (str): The CSS selector of the response field(s), None to skip.
+        callback (str): The name of the callback function of the page, e.g. "verifyDemoRecaptcha",
+            or its path, e.g. "___grecaptcha_cfg.clients['0']['X']['Y']['callback']"; None to skip.
+        submit_locator (str): The XPath locator of the submit button, None to not click.
+        error_locator (str): The XPath locator of an element shown on failure, to stop waiting early.
+        timeout (float): Seconds to wait for the success element.
+    Returns:
+        str: The text of the success element.
+    Raises:
+        TimeoutException: The success element did not appear in time, or the error element did.
+        ValueError: The response field, callback or submit button was not found.
+    """
+    started = time.perf_counter()
+    result = browser.execute_async_script(APPLY_AND_VERIFY_SCRIPT, token, response_selector, callback,
+                                          submit_locator, success_locator, error_locator, int(timeout * 1000))
+
+    # The page measured the wait after the click; the rest of the call is applying the token
+    confirm_seconds = result.get('confirmMs', 0) / 1000
+    record("inject", max(time.perf_counter() - started - confirm_seconds, 0.0))
+    record("confirm", confirm_seconds, ok=result['ok'])
+
+    if result['ok']:
+        return result['text']
+    error = result['error']
+    if error == 'timeout' or error.startswith('error element'):
+        raise TimeoutException(f"No success element after applying the token: {error}")
+    raise ValueError(error)
@@ -0,0 +1,246 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from twocaptcha import TimeoutException
+
+
+# Seconds a solved token stays usable after the answer is received.
+# reCAPTCHA tokens expire 120s after they are issued, Turnstile tokens after 300s.
+TOKEN_TTL = {
+    'recaptcha': 110,
+    'turnstile': 290,
+    'mtcaptcha': 110,
+}
+
+# Consecutive failed solves after which a key is no longer refilled and get() raises the
+# last error instead of waiting; every new get() gives the key one more try
+MAX_FAILURES = 3
+
+# Solver method used to prefetch every captcha type
+SOLVER_METHODS = {
+    'recaptcha': 'recaptcha',
+    'turnstile': 'turnstile',
+    'mtcaptcha': 'mtcaptcha',
+}
+
+
+class _KeyState:
+    """Tokens, in-flight solves and usage history of one pool key."""
+
+    def __init__(self, params):
+        self.params = params
+        self.created = time.monotonic()
+        self.tokens = deque()  # (expires_at, token), oldest first
+        self.in_flight = 0
+        self.taken = deque()  # times of get() calls within the rate window
+        self.solve_time = 30.0  # moving average of solve durations in seconds
+        self.failures = 0
+        self.last_error = None  # exception of the last failed solve
+
+
+class TokenPool:
+    """
+    Keeps pre-solved tokens for token based captchas (reCAPTCHA, Turnstile, MTCaptcha).
+
+    For a given page the captcha parameters are static, so the token can be solved before
+    it is needed. The pool solves tokens in the background for every key it has been asked
+    for, drops tokens when they expire and sizes each key to its observed consumption rate:
+    enough tokens are kept to cover the rate for one solve time, but never more than can
+    be used before they expire. A key that gets no `get()` call for `rate_window` seconds
+    is no longer refilled and is dropped once its tokens are gone, so idle keys cost nothing.
+
+    Args:
+        solver (TwoCaptcha): The solver used to prefetch tokens, e.g. `get_solver(apikey)`.
+        min_size (int): Tokens kept for every key that was used within `rate_window`.
+        max_size (int): Maximum number of tokens (ready and in flight) per key.
+        workers (int): Maximum number of solves running at the same time.
+        rate_window (float): Seconds of history used to measure the consumption rate.
+        min_lifetime (float): A token is only handed out if it is valid for at least that many seconds.
+    """
+
+    def __init__(self, solver, min_size=1, max_size=20, workers=8, rate_window=300, min_lifetime=15):
+        self.solver = solver
+        self.min_size = min_size
+        self.max_size = max_size
+        self.rate_window = rate_window
+        self.min_lifetime = min_lifetime
+
+        self._keys = {}
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='token-pool')
+        self._closed = False
+        self._supervisor = threading.Thread(target=self._supervise, name='token-pool-supervisor', daemon=True)
+        self._supervisor.start()
+
+    @staticmethod
+    def make_key(captcha_type, sitekey, url, action=None, proxy=None):
+        """
+        Returns the pool key for the given captcha parameters.
+
+        Args:
+            captcha_type (str): "recaptcha", "turnstile" or "mtcaptcha".
+            sitekey (str): The sitekey of the captcha.
+            url (str): The URL of the page with the captcha.
+            action (str): The action parameter, if the captcha uses one.
+            proxy (dict): Proxy settings used for solving, as in the `proxy` examples.
+        """
+        if captcha_type not in TOKEN_TTL:
+            raise ValueError(f"Unsupported captcha type: {captcha_type}")
+        proxy_key = (proxy['type'], proxy['uri']) if proxy else None
+        return captcha_type, sitekey, url, action, proxy_key
+
+    def get(self, captcha_type, sitekey, url, action=None, proxy=None, timeout=180):
+        """
+        Takes a valid token from the pool, waiting for one to be solved if none is ready.
+
+        The first call for a key starts prefetching tokens for it.
+
+        Args:
+            captcha_type (str): "recaptcha", "turnstile" or "mtcaptcha".
+            sitekey (str): The sitekey of the captcha.
+            url (str): The URL of the page with the captcha.
+            action (str): The action parameter, if the captcha uses one.
+            proxy (dict): Proxy settings used for solving.
+            timeout (float): Maximum number of seconds to wait for a token.
+        Returns:
+            str: The solved captcha token.
+        Raises:
+            Exception: The error of the last solve, after `MAX_FAILURES` solves of the key
+                failed in a row and no other solve is running (e.g. `ApiException` for
+                ERROR_ZERO_BALANCE or a wrong sitekey).
+            TimeoutException: No token within `timeout`; chained to the last solve error, if any.
+            RuntimeError: The pool is closed, or was closed while waiting.
+        """
+        key = self.make_key(captcha_type, sitekey, url, action, proxy)
+        deadline = time.monotonic() + timeout
+
+        with self._condition:
+            state = self._keys.get(key)
+            if state is None:
+                state = self._keys[key] = _KeyState({
+                    'sitekey': sitekey, 'url': url, 'action': action, 'proxy': proxy,
+                })
+            state.taken.append(time.monotonic())
+            if state.failures >= MAX_FAILURES:
+                state.failures = MAX_FAILURES - 1
+            self._refill(key, state)
+
+            while True:
+                if self._closed:
+                    raise RuntimeError('TokenPool is closed')
+                token = self._pop_token(state)
+                if token is not None:
+                    return token
+                if state.failures >= MAX_FAILURES and state.in_flight == 0:
+                    raise state.last_error
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutException(f'no token within {timeout}s') from state.last_error
+                self._condition.wait(min(remaining, 1.0))
+                self._refill(key, state)
+
+    def stats(self):
+        """
+        Returns the number of ready and in-flight tokens and the target size of every key.
+        """
+        with self._condition:
+            return {
+                key: {'ready': len(state.tokens), 'in_flight': state.in_flight, 'target': self._target(key, state)}
+                for key, state in self._keys.items()
+            }
+
+    def close(self):
+        """
+        Stops prefetching. Solves already running are finished but their tokens are dropped.
+        Waiting and later `get()` calls raise `RuntimeError`.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _pop_token(self, state):
+        now = time.monotonic()
+        while state.tokens:
+            expires_at, token = state.tokens.popleft()
+            if expires_at - now >= self.min_lifetime:
+                return token
+        return None
+
+    def _target(self, key, state):
+        now = time.monotonic()
+        while state.taken and now - state.taken[0] > self.rate_window:
+            state.taken.popleft()
+        # Measure over the key's age so a single early request does not look like a burst
+        window = min(self.rate_window, max(now - state.created, 60.0))
+        if not state.taken:
+            # No token was asked for within the rate window: stop buying tokens for the key
+            return 0
+        rate = len(state.taken) / window  # tokens per second
+
+        ttl = TOKEN_TTL[key[0]]
+        # Tokens needed to cover the consumption during one solve, plus one spare
+        wanted = math.ceil(rate * state.solve_time) + 1
+        # More tokens than are consumed within a token lifetime would expire unused
+        useful = max(1, math.floor(rate * (ttl - self.min_lifetime)))
+        return max(self.min_size, min(wanted, useful, self.max_size))
+
+    def _refill(self, key, state):
+        if self._closed:
+            return
+        now = time.monotonic()
+        while state.tokens and state.tokens[0][0] - now < self.min_lifetime:
+            state.tokens.popleft()
+
+        if state.failures >= MAX_FAILURES:
+            # The solves keep failing, e.g. zero balance or a wrong sitekey; get() reports the error
+            return
+        missing = self._target(key, state) - len(state.tokens) - state.in_flight
+        # Back off after consecutive failures instead of retrying immediately
+        if state.failures:
+            missing = min(missing, 1) if state.in_flight == 0 else 0
+        for _ in range(max(missing, 0)):
+            state.in_flight += 1
+            self._executor.submit(self._solve, key, state)
+
+    def _solve(self, key, state):
+        captcha_type = key[0]
+        params = {name: value for name, value in state.params.items() if value is not None}
+        started = time.monotonic()
+        token = None
+        error = None
+        try:
+            result = getattr(self.solver, SOLVER_METHODS[captcha_type])(**params)
+            token = result['code']
+        except Exception as e:
+            print(f"An error occurred while prefetching a token: {e}")
+            error = e
+            time.sleep(min(2 ** state.failures, 60))
+
+        finished = time.monotonic()
+        with self._condition:
+            state.in_flight -= 1
+            if token is None:
+                state.failures += 1
+                state.last_error = error
+            else:
+                state.failures = 0
+                state.last_error = None
+                state.solve_time = 0.8 * state.solve_time + 0.2 * (finished - started)
+                state.tokens.append((finished + TOKEN_TTL[captcha_type], token))
+            self._condition.notify_all()
+
+    def _supervise(self):
+        while True:
+            with self._condition:
+                if self._closed:
+                    return
+                for key, state in list(self._keys.items()):
+                    self._refill(key, state)
+                    if not state.tokens and not state.in_flight and self._target(key, state) == 0:
+                        # Idle key: retired, a later get() starts it again
+                        del self._keys[key]
+                self._condition.wait(1.0)
@@ -0,0 +1,265 @@
+import os
+import threading
+import time
+from collections import deque
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.wait import WebDriverWait
+
+from utilities.metrics import ELEMENT_WAIT_SECONDS
+from utilities.timing import percentile
+
+
+# Seconds to wait for an element whose locator has no timeout of its own
+DEFAULT_TIMEOUT = float(os.getenv("WAIT_TIMEOUT", "30"))
+
+# Seconds between checks when the page cannot be watched with a script
+POLL_INTERVAL = 0.05
+
+# Elements that mean the awaited one will not appear, e.g. the message of a rejected answer
+ERROR_LOCATORS = ("//p[contains(@class,'errorMessage')]",)
+
+# Longest wait of one page script; stays under the script timeout of the browser (30 seconds by default)
+SCRIPT_WAIT_LIMIT = 20
+
+# Waits in the page until the element is clickable or an error element appears. The source
+# never changes; the locators are passed as arguments.
+_WATCH_SCRIPT = """
+const [xpath, errorXpaths, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+
+const find = (x) => document.evaluate(x, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+
+// Like element_to_be_clickable: rendered, visible and enabled
+const isClickable = (element) => Boolean(element) && !element.disabled && element.getClientRects().length > 0
+    && getComputedStyle(element).visibility !== 'hidden';
+
+let finished = false;
+let observer = null;
+let interval = null;
+let timer = null;
+
+const finish = (result) => {
+    finished = true;
+    if (observer) observer.disconnect();
+    clearInterval(interval);
+    clearTimeout(timer);
+    done(result);
+};
+
+const check = () => {
+    if (finished) return;
+    const element = find(xpath);
+    if (isClickable(element)) {
+        finish({element: element});
+        return;
+    }
+    for (const errorXpath of errorXpaths) {
+        const error = find(errorXpath);
+        if (error) {
+            finish({error: errorXpath, text: (error.innerText || error.textContent || '').trim()});
+            return;
+        }
+    }
+};
+
+check();
+if (!finished) {
+    observer = new MutationObserver(check);
+    observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    // Visibility can also change without a mutation, e.g. at the end of a CSS transition
+    interval = setInterval(check, 50);
+    timer = setTimeout(() => finish({}), timeoutMs);
+}
+"""
+
+
+class ErrorStateReached(TimeoutException):
+    """The page showed a known error element instead of the awaited element."""
+
+
+class Locator:
+    """
+    An XPath locator prepared once for all waits on it: its timeout and Selenium condition.
+    """
+
+    __slots__ = ("xpath", "timeout", "condition")
+
+    def __init__(self, xpath, timeout):
+        self.xpath = xpath
+        self.timeout = timeout
+        self.condition = EC.element_to_be_clickable((By.XPATH, xpath))
+
+
+class WaitEngine:
+    """
+    Waits for elements to become clickable, replacing `WebDriverWait(browser, 30)` in the examples.
+
+    By default the wait runs inside the page: one asynchronous script checks the locator on
+    every DOM mutation and returns the element as soon as it is clickable, instead of every
+    0.5 seconds. If the page cannot run the script (e.g. it navigates away during the wait),
+    the element is polled every `poll_interval` seconds for the rest of the timeout.
+
+    While waiting, the error locators are checked as well. If one of them matches, the wait
+    stops at once with `ErrorStateReached`, a `TimeoutException`, so a rejected answer does
+    not cost the full timeout and existing `except TimeoutException` blocks still apply.
+
+    Example:
+        waits = WaitEngine(timeouts={sitekey_locator: 10})
+        element = waits.get_element(browser, sitekey_locator)
+        print(waits.stats())
+
+    Args:
+        timeout (float): Seconds to wait for locators without a timeout of their own.
+        timeouts (dict): Timeouts in seconds by locator.
+        error_locators (tuple): XPath locators of elements that mean the wait cannot succeed.
+        poll_interval (float): Seconds between checks when polling.
+        event_driven (bool): Wait in the page; False to always poll.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, timeouts=None, error_locators=ERROR_LOCATORS,
+                 poll_interval=POLL_INTERVAL, event_driven=True):
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self.error_locators = list(error_locators)
+        self.poll_interval = poll_interval
+        self.event_driven = event_driven
+
+        self._locators = {}
+        self._lock = threading.Lock()
+        self._waits = {}
+
+    def set_timeout(self, locator, seconds):
+        """Sets the timeout in seconds for one locator."""
+        with self._lock:
+            self.timeouts[locator] = seconds
+            self._locators.pop(locator, None)
+
+    def compile(self, locator):
+        """Returns the prepared `Locator` for an XPath locator, preparing it on first use."""
+        compiled = self._locators.get(locator)
+        if compiled is None:
+            with self._lock:
+                compiled = self._locators[locator] = Locator(locator, self.timeouts.get(locator, self.timeout))
+        return compiled
+
+    def get_element(self, browser, locator, timeout=None):
+        """
+        Waits for the element specified by the locator to become clickable and returns it.
+
+        Args:
+            browser (webdriver): The Selenium WebDriver instance.
+            locator (str): XPATH locator to find an element on the page.
+            timeout (float): Seconds to wait; the timeout of the locator by default.
+        Returns:
+            WebElement: A web element that has become clickable.
+        Raises:
+            ErrorStateReached: An error element appeared first.
+            TimeoutException: The element did not become clickable in time.
+        """
+        compiled = self.compile(locator)
+        timeout = compiled.timeout if timeout is None else timeout
+        message = f"Element {locator} is not clickable after {timeout}s"
+        started = time.perf_counter()
+        deadline = started + timeout
+        outcome = "failed"
+        try:
+            if self.event_driven:
+                element = self._watch(browser, compiled, deadline, message)
+            else:
+                element = self._poll(browser, compiled, deadline, message)
+            outcome = "ok"
+            return element
+        except ErrorStateReached:
+            outcome = "error_state"
+            raise
+        except TimeoutException:
+            outcome = "timeout"
+            raise
+        finally:
+            self._record(locator, time.perf_counter() - started, outcome)
+
+    def stats(self):
+        """
+        Returns wait statistics by locator.
+
+        Returns:
+            dict: For every locator `count`, `timeouts`, `error_states` and wait time
+            percentiles in seconds (`p50`, `p95`, `max`) over its last 1000 waits.
+        """
+        with self._lock:
+            items = [(locator, dict(entry), sorted(entry["seconds"])) for locator, entry in self._waits.items()]
+        stats = {}
+        for locator, entry, seconds in items:
+            stats[locator] = {
+                "count": entry["count"],
+                "timeouts": entry["timeouts"],
+                "error_states": entry["error_states"],
+                "p50": percentile(seconds, 50) if seconds else 0.0,
+                "p95": percentile(seconds, 95) if seconds else 0.0,
+                "max": seconds[-1] if seconds else 0.0,
+            }
+        return stats
+
+    # Internals
+
+    def _watch(self, browser, compiled, deadline, message):
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise TimeoutException(message)
+            try:
+                result = browser.execute_async_script(_WATCH_SCRIPT, compiled.xpath, self.error_locators,
+                                                      int(min(remaining, SCRIPT_WAIT_LIMIT) * 1000))
+            except WebDriverException:
+                return self._poll(browser, compiled, deadline, message)
+            if result.get("element") is not None:
+                return result["element"]
+            if "error" in result:
+                raise ErrorStateReached(f"Error element {result['error']} appeared while waiting for "
+                                        f"{compiled.xpath}: {result['text']}")
+
+    def _poll(self, browser, compiled, deadline, message):
+        def clickable_or_error(driver):
+            element = compiled.condition(driver)
+            if element:
+                return element
+            for xpath in self.error_locators:
+                errors = driver.find_elements(By.XPATH, xpath)
+                if errors:
+                    raise ErrorStateReached(f"Error element {xpath} appeared while waiting for "
+                                            f"{compiled.xpath}: {errors[0].text}")
+            return False
+
+        wait = WebDriverWait(browser, max(deadline - time.perf_counter(), 0), poll_frequency=self.poll_interval)
+        return wait.until(clickable_or_error, message)
+
+    def _record(self, locator, seconds, outcome):
+        with self._lock:
+            entry = self._waits.get(locator)
+            if entry is None:
+                entry = self._waits[locator] = {"count": 0, "timeouts": 0, "error_states": 0,
+                                                "seconds": deque(maxlen=1000)}
+            entry["count"] += 1
+            if outcome == "timeout":
+                entry["timeouts"] += 1
+            elif outcome == "error_state":
+                entry["error_states"] += 1
+            entry["seconds"].append(seconds)
+        ELEMENT_WAIT_SECONDS.observe(seconds, locator=locator, outcome=outcome)
+
+
+# The engine of the examples
+DEFAULT_ENGINE = WaitEngine()
+
+
+def wait_for_element(browser, locator, timeout=None):
+    """Waits for an element with the shared engine of the examples, see `WaitEngine.get_element`."""
+    return DEFAULT_ENGINE.get_element(browser, locator, timeout)
+
+
+def wait_stats():
+    """Returns the wait statistics of the shared engine, see `WaitEngine.stats`."""
+    return DEFAULT_ENGINE.stats()